@@ -38,7 +38,8 @@ from scipy.spatial.distance import cdist
 
 from puzzle.piece import Template
 from puzzle.piece import PieceStatus
-from scipy.signal import convolve2d
+from puzzle.piece import extractSides
+from puzzle.utils.pixelArena import PixelArena
 
 #===== Environment / Dependencies [Correspondences]
 #
@@ -81,6 +82,7 @@ class Board:
         # https://stackoverflow.com/a/40007169
         self.pieces = {}                # @< The puzzle pieces.
         self.id_count = 0               # @< Internal ID count for pieces (affects new ID assignments)
+        self._render = None             # @< Cached flat render arrays, see _renderArrays.
 
         if len(argv) == 1:
             if issubclass(type(argv[0]), Board):
@@ -220,6 +222,50 @@ class Board:
         self.pieces = {}
         self.id_count = 0
 
+    #============================= compact =============================
+    #
+    def compact(self, discardImage=False):
+        """!
+        @brief  Shrink the storage of all the puzzle pieces (see Template.compact).
+                Meant for boards that are mostly kept around, e.g., tracking history.
+
+        @param[in]  discardImage    Drop the background-inclusive piece images or not.
+        """
+
+        for piece in self.pieces.values():
+            piece.compact(discardImage)
+
+    #=========================== buildArena ============================
+    #
+    def buildArena(self, bind=True):
+        """!
+        @brief  Gather the pixels of all the pieces into one PixelArena.
+
+        The arena can be pickled as a few arrays or moved into shared memory
+        (PixelArena.toShared) for worker processes.
+
+        @param[in]  bind    Make the pieces use views into the arena.
+
+        @return     theArena    The arena.
+        """
+
+        return PixelArena.fromBoard(self, bind=bind)
+
+    #========================== extractSides ===========================
+    #
+    def extractSides(self, workers=None, lazy=False):
+        """!
+        @brief  Batched side extraction of the Regular pieces built with deferred
+                extraction (see puzzle.piece.extractSides).
+
+        @param[in]  workers     Number of processes (None: all cores, 1: in-process).
+        @param[in]  lazy        Only apply cached outputs, leave the rest on demand.
+
+        @return     nDone       Number of pieces whose sides got set.
+        """
+
+        return extractSides(self, workers=workers, lazy=lazy)
+
     # def getSubset(self, subset):
     #     """
     #     @brief  Return a new board consisting of a subset of pieces.
@@ -268,6 +314,27 @@ class Board:
         """
 
         # Based on the nearest points on the contours
+        pts_A = self.pieces[id_A].rLoc + Board.adjacencyPoints(self.pieces[id_A])
+        pts_B = self.pieces[id_B].rLoc + Board.adjacencyPoints(self.pieces[id_B])
+
+        dists = cdist(pts_A, pts_B, 'euclidean')
+
+        theFlag = dists.min() < tauAdj
+
+        return theFlag
+
+    #========================== adjacencyPoints ==========================
+    #
+    @staticmethod
+    def adjacencyPoints(piece):
+        """!
+        @brief  Contour points of a piece used by the adjacency test: the convex hull
+                points, or the convexity defect points, and midpoints between them.
+
+        @param[in]  piece   Puzzle piece instance.
+
+        @param[out] pts     Points (M x 2, (x,y)) relative to the piece location.
+        """
 
         # # Obtain the pts locations after subsampling
         # def obtain_sub_pts(piece, num_samples=500):
@@ -278,58 +345,47 @@ class Board:
         #     pts = pts[idx]
         #     return pts
 
-        # Obtain the pts locations after subsampling
-        def obtain_sub_pts(piece):
-            pts = []
-            cnt = piece.y.contour_pts
-            hull = cv2.convexHull(cnt, returnPoints=False)
-            defects = cv2.convexityDefects(cnt, hull)
-
-            if defects is not None:
-                for i in range(defects.shape[0]):
-                    s, e, f, d = defects[i, 0]
-
-                    start = cnt[s][0]
-                    end = cnt[e][0]
-                    far = cnt[f][0]
-
-                    # Debug only
-                    # start = tuple(cnt[s][0])
-                    # end = tuple(cnt[e][0])
-                    # far = tuple(cnt[f][0])
-                    # cv2.line(img, start, far, [0, 255, 0], 2)
-                    # cv2.line(img, far, end, [0, 255, 0], 2)
-                    # cv2.circle(img, far, 5, [0, 0, 255], -1)
-
-                    pts.append(start)
-                    pts.append(far)
-                    pts.append(end)
-                    if i > 0:
-                        pts.append(((start + far) / 2).astype('int'))
-                        pts.append(((far + end) / 2).astype('int'))
-
-                # Debug only
-                # cv2.imshow('demo',img)
-                # cv2.waitKey()
-            else:
-                for i in range(hull.shape[0]):
-                    pts.append(cnt[hull[i][0]][0])
-                    if i > 0:
-                        pts.append(((cnt[hull[i][0]][0] + cnt[hull[i - 1][0]][0]) / 2).astype('int'))
-
-            # Remove duplicates
-            pts = np.unique(pts, axis=0)
+        pts = []
+        cnt = piece.y.contour_pts
+        hull = cv2.convexHull(cnt, returnPoints=False)
+        defects = cv2.convexityDefects(cnt, hull)
 
-            return pts
+        if defects is not None:
+            for i in range(defects.shape[0]):
+                s, e, f, d = defects[i, 0]
 
-        pts_A = self.pieces[id_A].rLoc + obtain_sub_pts(self.pieces[id_A])
-        pts_B = self.pieces[id_B].rLoc + obtain_sub_pts(self.pieces[id_B])
+                start = cnt[s][0]
+                end = cnt[e][0]
+                far = cnt[f][0]
 
-        dists = cdist(pts_A, pts_B, 'euclidean')
+                # Debug only
+                # start = tuple(cnt[s][0])
+                # end = tuple(cnt[e][0])
+                # far = tuple(cnt[f][0])
+                # cv2.line(img, start, far, [0, 255, 0], 2)
+                # cv2.line(img, far, end, [0, 255, 0], 2)
+                # cv2.circle(img, far, 5, [0, 0, 255], -1)
+
+                pts.append(start)
+                pts.append(far)
+                pts.append(end)
+                if i > 0:
+                    pts.append(((start + far) / 2).astype('int'))
+                    pts.append(((far + end) / 2).astype('int'))
+
+            # Debug only
+            # cv2.imshow('demo',img)
+            # cv2.waitKey()
+        else:
+            for i in range(hull.shape[0]):
+                pts.append(cnt[hull[i][0]][0])
+                if i > 0:
+                    pts.append(((cnt[hull[i][0]][0] + cnt[hull[i - 1][0]][0]) / 2).astype('int'))
 
-        theFlag = dists.min() < tauAdj
+        # Remove duplicates
+        pts = np.unique(pts, axis=0)
 
-        return theFlag
+        return pts
 
     #============================= relabel =============================
     #
@@ -474,23 +530,12 @@ class Board:
             bbox = np.array([[float('inf'), float('inf')], [0, 0]])
 
             # piece is a puzzleTemplate instance, see template.py for details.
-            for key in self.pieces:
-                piece = self.pieces[key]
-
-                # top left coordinate
-                tl = piece.rLoc
+            # top left and bottom right coordinates of all pieces.
+            tl = np.array([piece.rLoc for piece in self.pieces.values()], dtype=float).reshape(-1, 2)
+            br = tl + np.array([piece.size() for piece in self.pieces.values()], dtype=float).reshape(-1, 2)
 
-                # bottom right coordinate
-                br = piece.rLoc + piece.size()
-
-                #print((piece.y.pcorner, piece.rLoc, piece.size(), tl, br))
-                #DEBUG VISUAL
-                #import ivapy.display_cv as display
-                #display.rgb(piece.y.image)
-                #display.wait()
-
-                bbox[0] = np.min([bbox[0], tl], axis=0)
-                bbox[1] = np.max([bbox[1], br], axis=0)
+            bbox[0] = np.minimum(bbox[0], tl.min(axis=0))
+            bbox[1] = np.maximum(bbox[1], br.max(axis=0))
 
             return bbox
 
@@ -516,6 +561,134 @@ class Board:
 
         return pLocs
 
+    #============================== locations ==============================
+    #
+    def locations(self):
+        """!
+        @brief  Table of the puzzle piece locations (rLoc), in board order.
+
+        @param[out] rLocs       Piece locations (N x 2, (x,y)).
+        """
+
+        return np.array([np.asarray(piece.rLoc).reshape(-1)[:2] for piece in self.pieces.values()],
+                        dtype=float).reshape(-1, 2)
+
+    #============================ setLocations =============================
+    #
+    def setLocations(self, rLocs):
+        """!
+        @brief  Place all the puzzle pieces at once, in board order.
+
+        Same as setPlacement on each piece (no offset, corner reference).
+
+        @param[in]  rLocs       Piece locations (N x 2, (x,y)).
+        """
+
+        for piece, rLoc in zip(self.pieces.values(), np.asarray(rLocs)):
+            piece.setPlacement(rLoc)
+
+    #=============================== permute ===============================
+    #
+    def permute(self, order, angles=None, theCache=None):
+        """!
+        @brief  Trade piece locations and IDs according to a permutation.
+
+        The piece at position ii (board order) takes the location and the ID of the
+        piece at position order[ii].  Pieces with a nonzero angle are rotated first,
+        so the box of the rotated piece is what gets placed.
+
+        @param[in]  order       Permutation of the board positions.
+        @param[in]  angles      Rotation angle per position [optional].
+        @param[in]  theCache    ParamRotationCache for the rotations [optional].
+
+        @param[out] idMap       The ground truth as a dict [oldId -> newId].
+        """
+
+        order = np.asarray(order, dtype=int)
+
+        rLocs = self.locations()[order]
+        pieceIDs = [piece.id for piece in self.pieces.values()]
+        newIDs = [pieceIDs[ii] for ii in order]
+
+        for ii, key in enumerate(list(self.pieces.keys())):
+            piece = self.pieces[key]
+
+            if angles is not None and angles[ii] != 0:
+                piece = piece.rotatePiece(angles[ii], theCache)
+                self.pieces[key] = piece
+
+            piece.setPlacement(rLocs[ii])
+            piece.id = newIDs[ii]
+
+        return dict(zip(pieceIDs, newIDs))
+
+    #============================= copyShared ==============================
+    #
+    def copyShared(self):
+        """!
+        @brief  Deep copy of the board that shares the pixel data of the pieces.
+
+        The pieces can be moved, relabelled or replaced (e.g., rotated) in the copy
+        without affecting the original.  Their image, mask and pixel arrays are not
+        duplicated, so they should not be written into in place.
+
+        @param[out] theBoard    The copy.
+        """
+
+        memo = {}
+        for piece in self.pieces.values():
+            for buffer in piece.y.pixelBuffers():
+                memo[id(buffer)] = buffer
+
+        # The render cache refers to the original pieces, it is not carried over.
+        theRender = getattr(self, '_render', None)
+        if theRender is not None:
+            memo[id(theRender)] = None
+
+        return deepcopy(self, memo)
+
+    #============================ graspLocations ===========================
+    #
+    def graspLocations(self, kernel_size=10):
+        """!
+        @brief      Grasp locations of all the puzzle pieces.
+
+        Same result as Template.getGraspLoc on each piece (whose gLoc is set).  The
+        in-mask offsets are kept with the render cache until the pieces or their
+        sources change, so only the corners are gathered again.  Pieces with
+        identical masks share one computation, see Template.getGraspLoc.
+
+        @param[in]  kernel_size     Suction cup footprint size or image.
+
+        @param[out] gLocs           A dict of puzzle piece id & grasp location (x,y).
+        """
+        cache  = self._renderCache()
+        pieces = cache['pieces']
+
+        # In-mask offsets (row, col), kept with the render cache until the pieces change.
+        if np.isscalar(kernel_size):
+            kernelKey = int(kernel_size)
+        else:
+            kernelKey = (np.shape(kernel_size), np.ascontiguousarray(kernel_size).tobytes())
+
+        offsets = cache['grasp'].get(kernelKey)
+        if offsets is None:
+            offsets = np.array([Template._graspOffset(piece.y.mask, kernel_size)
+                                for piece in pieces]).reshape(-1, 2)
+            cache['grasp'][kernelKey] = offsets
+
+        # The corners follow the placements, so they are always gathered.
+        pcorners = np.array([np.asarray(piece.y.pcorner).reshape(-1)[:2] for piece in pieces]
+                            ).reshape(-1, 2)
+        theLocs  = offsets[:, ::-1] + pcorners
+
+        gLocs = {}
+        for piece, gLoc in zip(pieces, theLocs):
+            piece.gLoc = gLoc
+            gLocs[piece.id] = gLoc
+
+        return gLocs
+
     #======================== fromImageAndLabels =======================
     #
     def fromImageAndLabels(self, theImage, theLabels):
@@ -525,6 +698,163 @@ class Board:
       for ii in range(1,1+lMax.astype(int)):
         self.addPiece(Template.buildFromFullMaskAndImage(theLabels == ii, theImage))
 
+    #=========================== renderSources ===========================
+    #
+    @staticmethod
+    def renderSources(pieces):
+        """!
+        @brief  The objects a rendering of pieces derives from, to tell when it is stale.
+
+        The objects themselves are held rather than their id(), which can be reused
+        once an object is freed (e.g., a template replaced by a rotation).
+
+        @param[in]  pieces      The pieces, in render order.
+
+        @param[out] sources     Tuple of (id, piece, template, rcoords, appear) per piece.
+        """
+
+        return tuple((piece.id, piece, piece.y, piece.y.rcoords, piece.y.appear) for piece in pieces)
+
+    @staticmethod
+    def sameSources(sourcesA, sourcesB):
+        """!
+        @brief  Whether two renderSources outputs refer to the same objects.
+        """
+
+        if sourcesA is None or sourcesB is None or len(sourcesA) != len(sourcesB):
+            return False
+
+        for srcA, srcB in zip(sourcesA, sourcesB):
+            if srcA[0] != srcB[0] or any(a is not b for a, b in zip(srcA[1:], srcB[1:])):
+                return False
+
+        return True
+
+    #============================ _renderCache ===========================
+    #
+    def _renderCache(self):
+        """!
+        @brief  The piece local render cache, renewed when its sources changed.
+
+        Holds the pieces, their sources (see renderSources), the sprite centroids,
+        and room for the derived layers ('layers', 'placed') and grasp offsets ('grasp').
+        """
+
+        pieces  = list(self.pieces.values())
+        sources = Board.renderSources(pieces)
+
+        # Older pickled boards have no cache.
+        cache = getattr(self, '_render', None)
+        if cache is None or not Board.sameSources(cache['sources'], sources):
+            cache = {'sources': sources, 'pieces': pieces, 'layers': {}, 'placed': {}, 'grasp': {}}
+
+            centroids = np.zeros((len(pieces), 2))
+            for ii, piece in enumerate(pieces):
+                if piece.y.rcoords.size > 0:
+                    centroids[ii] = piece.y.rcoords.mean(axis=1)
+            cache['centroids'] = centroids
+
+            self._render = cache
+
+        return cache
+
+    #=========================== _renderArrays ===========================
+    #
+    def _renderArrays(self, CONTOUR_DISPLAY=False):
+        """!
+        @brief  Flat render arrays of the board: all piece pixels in board coordinates,
+                their colors, and per piece data for labels and segmentation.
+
+        The piece local part (sprite coordinates, colors, contour pixels, centroids)
+        is cached until a piece is added, removed or has its source data replaced.
+        The board coordinates are cached until a piece moves.  When contours are on,
+        each piece's contour pixels (black) follow its own pixels, so one scatter
+        reproduces the piece by piece overwrite order of placeInImage.
+
+        @param[in]  CONTOUR_DISPLAY     Include the contour pixels or not.
+
+        @param[out] arrays              Dict with 'coords' (2 x M, (x;y)), 'colors' (M x 3),
+                                        'counts' (P, pixels per piece), 'centroids'
+                                        (P x 2, sprite coordinates), 'pieces' (P pieces).
+        """
+
+        cache  = self._renderCache()
+        pieces = cache['pieces']
+        rLocs  = np.array([np.asarray(piece.rLoc).reshape(-1)[:2] for piece in pieces],
+                          dtype=float).reshape(-1, 2).astype(int)
+
+        # Piece local layer, per contour option.
+        if CONTOUR_DISPLAY not in cache['layers']:
+            coords, colors, counts = [], [], []
+            for piece in pieces:
+                pCoords = [piece.y.rcoords.reshape(2, -1)]
+                pColors = [piece.y.appear.reshape(-1, 3)]
+
+                if CONTOUR_DISPLAY and np.ndim(piece.y.contour) == 2:
+                    cy, cx = np.nonzero(piece.y.contour)
+                    pCoords.append(np.vstack((cx, cy)))
+                    pColors.append(np.zeros((cx.size, 3), dtype=pColors[0].dtype))
+
+                pCoords = np.hstack(pCoords).astype(int)
+                coords.append(pCoords)
+                colors.append(np.vstack(pColors))
+                counts.append(pCoords.shape[1])
+
+            counts = np.array(counts, dtype=int)
+            cache['layers'][CONTOUR_DISPLAY] = (
+                np.hstack(coords) if coords else np.zeros((2, 0), dtype=int),
+                np.ascontiguousarray(np.vstack(colors)) if colors else np.zeros((0, 3), dtype='uint8'),
+                counts)
+            cache['placed'].pop(CONTOUR_DISPLAY, None)
+
+        coords, colors, counts = cache['layers'][CONTOUR_DISPLAY]
+
+        # Board coordinates, redone only when a piece moved.
+        placed = cache['placed'].get(CONTOUR_DISPLAY)
+        if placed is None or not np.array_equal(placed[0], rLocs):
+            placed = (rLocs, coords + np.repeat(rLocs.T, counts, axis=1))
+            cache['placed'][CONTOUR_DISPLAY] = placed
+
+        return {'coords': placed[1], 'colors': colors, 'counts': counts,
+                'centroids': cache['centroids'], 'pieces': pieces}
+
+    #============================ _paintPieces ===========================
+    #
+    def _paintPieces(self, theImage, offset=(0, 0), CONTOUR_DISPLAY=False):
+        """!
+        @brief  Paint all pieces into an image with a single scatter.  Same result as
+                calling placeInImage on each piece in board order.
+
+        @param[in]  theImage            Image to paint into (modified).
+        @param[in]  offset              Offset (x,y) added to the piece locations.
+        @param[in]  CONTOUR_DISPLAY     Draw the contours or not.
+
+        @param[out] arrays              The render arrays (see _renderArrays).
+        """
+
+        arrays = self._renderArrays(CONTOUR_DISPLAY)
+        if arrays['coords'].shape[1] == 0:
+            return arrays
+
+        xs = arrays['coords'][0] + int(offset[0])
+        ys = arrays['coords'][1] + int(offset[1])
+
+        colors = arrays['colors']
+
+        height, width = theImage.shape[:2]
+        if theImage.flags.c_contiguous and theImage.dtype == colors.dtype \
+                and theImage.ndim == 3 and theImage.shape[2] == colors.shape[1] \
+                and xs.min() >= 0 and xs.max() < width and ys.min() >= 0 and ys.max() < height:
+            # Flat scatter of whole pixels (viewed as single items), in board order.
+            # Only when in bounds, out of bounds keeps the 2D indexing behavior.
+            pixel  = np.dtype((np.void, colors.dtype.itemsize * colors.shape[1]))
+            pixels = theImage.reshape(height * width, -1).view(pixel).reshape(-1)
+            np.put(pixels, ys * width + xs, colors.view(pixel).reshape(-1))
+        else:
+            theImage[ys, xs, :] = colors
+
+        return arrays
+
     #============================= toImage =============================
     #
     def toImage(self, theImage=None, ID_DISPLAY=False, COLOR=(0, 0, 0),
@@ -578,23 +908,19 @@ class Board:
             #  theImage_enlarged = np.zeros((lengths[1]+1,lengths[0]+1,3))
 
             if True or theImage.shape[1] - lengths[0] >= 0 and theImage.shape[0] - lengths[1] >= 0:
-                for key in self.pieces:
-
-                    piece = self.pieces[key]
+                arrays = self._paintPieces(theImage_enlarged, offset=(abs(enlarge[0]), abs(enlarge[1])),
+                                           CONTOUR_DISPLAY=CONTOUR_DISPLAY)
 
-                    piece.placeInImage(theImage_enlarged, offset=(abs(enlarge[0]), abs(enlarge[1])),
-                                       CONTOUR_DISPLAY=CONTOUR_DISPLAY)
+                for piece, (xc, yc) in zip(arrays['pieces'], arrays['centroids']):
 
                     if ID_DISPLAY == True:
                         txt = str(piece.id)
                         font = cv2.FONT_HERSHEY_SIMPLEX
                         char_size = cv2.getTextSize(txt, font, 1, 1)[0]
 
-                        y, x = np.nonzero(piece.y.mask)
-
                         # @todo  This should be rLoc or y.pcorner?
-                        pos = (int(piece.rLoc[0] + np.mean(x)) - char_size[0] + abs(enlarge[0]),
-                               int(piece.rLoc[1] + np.mean(y)) + char_size[1] + abs(enlarge[1]))
+                        pos = (int(piece.rLoc[0] + xc) - char_size[0] + abs(enlarge[0]),
+                               int(piece.rLoc[1] + yc) + char_size[1] + abs(enlarge[1]))
 
                         font_scale = 1 #min((max(x) - min(x)), (max(y) - min(y))) / 30
                         cv2.putText(theImage_enlarged, str(piece.id), pos, font,
@@ -623,34 +949,32 @@ class Board:
 
             if BOUNDING_BOX:
                 # Just the exact bounding box size
-                theImage = np.full((lengths[1], lengths[0], 3), COLOR, dtype='uint8')
+                theImage = np.zeros((lengths[1], lengths[0], 3), dtype='uint8')
             else:
                 # The original (0,0) and outermost point size
-                theImage = np.full((bbox[1, 1], bbox[1, 0], 3), COLOR, dtype='uint8')
+                theImage = np.zeros((bbox[1, 1], bbox[1, 0], 3), dtype='uint8')
 
-            for key in self.pieces:
+            if np.any(COLOR):
+                theImage[:] = COLOR
 
-                piece = self.pieces[key]
+            if BOUNDING_BOX:
+                arrays = self._paintPieces(theImage, offset=-bbox[0], CONTOUR_DISPLAY=CONTOUR_DISPLAY)
+            else:
+                arrays = self._paintPieces(theImage, CONTOUR_DISPLAY=CONTOUR_DISPLAY)
 
-                if BOUNDING_BOX:
-                    piece.placeInImage(theImage, offset=-bbox[0], CONTOUR_DISPLAY=CONTOUR_DISPLAY)
-                else:
-                    piece.placeInImage(theImage, CONTOUR_DISPLAY=CONTOUR_DISPLAY)
+            for piece, (xc, yc) in zip(arrays['pieces'], arrays['centroids']):
 
                 if ID_DISPLAY == True:
                     txt = str(piece.id)
                     font = cv2.FONT_HERSHEY_SIMPLEX
                     char_size = cv2.getTextSize(txt, font, 0.15, 2)[0]
 
-                    y, x = np.nonzero(piece.y.mask)
-
                     if BOUNDING_BOX:
-                        print("bbox")
-                        pos = (int(piece.rLoc[0] - bbox[0][0] + np.mean(x)) - char_size[0],
-                               int(piece.rLoc[1] - bbox[0][1] + np.mean(y)) + char_size[1])
+                        pos = (int(piece.rLoc[0] - bbox[0][0] + xc) - char_size[0],
+                               int(piece.rLoc[1] - bbox[0][1] + yc) + char_size[1])
                     else:
-                        pos = (int(piece.y.pcorner[0] + np.mean(x)) - 3*char_size[0],
-                               int(piece.y.pcorner[1] + np.mean(y)) + char_size[1])
+                        pos = (int(piece.y.pcorner[0] + xc) - 3*char_size[0],
+                               int(piece.y.pcorner[1] + yc) + char_size[1])
 
                     font_scale = 1 #np.floor(min((max(x) - min(x)), (max(y) - min(y))) / 100)
                     cv2.putText(theImage, str(piece.id), pos, font,
@@ -699,10 +1023,10 @@ class Board:
         else:
             offset = np.zeros(2, dtype=int)
 
-        for piece in self.pieces.values():
-            rcoords = (offset.reshape(-1, 1) + piece.rLoc.reshape(-1, 1)
-                       + piece.y.rcoords).astype(int)
-            segmentation[rcoords[1], rcoords[0]] = piece.id
+        arrays = self._renderArrays(CONTOUR_DISPLAY=False)
+        rcoords = arrays['coords']
+        ids = np.repeat([piece.id for piece in arrays['pieces']], arrays['counts'])
+        segmentation[rcoords[1] + offset[1], rcoords[0] + offset[0]] = ids
 
         return renderedImage, segmentation
 
@@ -752,36 +1076,34 @@ class Board:
             # The original (0,0) and outermost point size
             theImage = np.full((int( S * bbox[1, 1]), int(S* bbox[1, 0]), 3), COLOR, dtype='uint8')
 
-        for key in self.pieces:
-
-            piece = self.pieces[key]
-            # piece.rLoc = piece.rLoc * expansion
-            # piece.y.rcoords = expansion * piece.y.rcoords
-            if BOUNDING_BOX:
-                piece.placeInImage(theImage, offset=-bbox[0], CONTOUR_DISPLAY=CONTOUR_DISPLAY)
-            else:
+        if BOUNDING_BOX:
+            arrays = self._paintPieces(theImage, offset=-bbox[0], CONTOUR_DISPLAY=CONTOUR_DISPLAY)
+        else:
+            for key in self.pieces:
+                # piece.rLoc = piece.rLoc * expansion
+                # piece.y.rcoords = expansion * piece.y.rcoords
+                piece = self.pieces[key]
                 rLoc = piece.rLoc
                 rLoc_rel = rLoc - C
                 rLoc_scaled = rLoc_rel * S
                 new_rLoc = rLoc_scaled + C
                 new_rLoc = np.round(new_rLoc).astype(int)
                 piece.rLoc = new_rLoc
-                piece.placeInImage(theImage, CONTOUR_DISPLAY=CONTOUR_DISPLAY)
+            arrays = self._paintPieces(theImage, CONTOUR_DISPLAY=CONTOUR_DISPLAY)
+
+        for piece, (xc, yc) in zip(arrays['pieces'], arrays['centroids']):
 
             if ID_DISPLAY == True:
                 txt = str(piece.id)
                 font = cv2.FONT_HERSHEY_SIMPLEX
                 char_size = cv2.getTextSize(txt, font, 0.15, 2)[0]
 
-                y, x = np.nonzero(piece.y.mask)
-
                 if BOUNDING_BOX:
-                    print("bbox")
-                    pos = (int(piece.rLoc[0] - bbox[0][0] + np.mean(x)) - char_size[0],
-                            int(piece.rLoc[1] - bbox[0][1] + np.mean(y)) + char_size[1])
+                    pos = (int(piece.rLoc[0] - bbox[0][0] + xc) - char_size[0],
+                            int(piece.rLoc[1] - bbox[0][1] + yc) + char_size[1])
                 else:
-                    pos = (int(piece.y.pcorner[0] + np.mean(x)) - 3*char_size[0],
-                            int(piece.y.pcorner[1] + np.mean(y)) + char_size[1])
+                    pos = (int(piece.y.pcorner[0] + xc) - 3*char_size[0],
+                            int(piece.y.pcorner[1] + yc) + char_size[1])
 
                 font_scale = 1 #np.floor(min((max(x) - min(x)), (max(y) - min(y))) / 100)
                 cv2.putText(theImage, str(piece.id), pos, font,
@@ -908,6 +1230,7 @@ class SolutionBoard(Board):
         super().__init__(*argv)
         # Dict containing solution piece key to zone mapping
         self.zones = {}
+        self._pixIndex = None   # @< Cached pixel index table, see _pixelIndexTable.
  
     #===================== addPieceFromMaskAndImage ====================
     #
@@ -926,49 +1249,15 @@ class SolutionBoard(Board):
         @param[in]  recordedBoard      The recorded board to create the partial board from.
         @param[in]  solutionStateMask  The mask indicating the solution state.
         """
-        # Implementation goes here
-
-        # Apply a convolution operation on solutionStateMask to get scores at
-        # each potential piece location.
-        boolean_mask = solutionStateMask != 0
-        solutionStateMask[boolean_mask] = 1
-        kernel = np.ones((5, 5), dtype=np.float32) / 25.0
-        convolved = convolve2d(solutionStateMask, kernel, mode='same')
-
 
         # For each piece in recordedBoard, check if its location
-        # corresponds to a low score in the convolved mask.
+        # corresponds to a low score in the box filtered mask.
         # If so, add it to the partial board.
+        keys, scores = recordedBoard.pieceScores(solutionStateMask)
 
-        for key in recordedBoard.pieces:
-            piece = recordedBoard.pieces[key]
-
-            # Check the score at centroid location
-            # can use bounding box center also
-            width, height = piece.size()
-            expected_cent = piece.y.pcorner + np.array([width, height]) / 2
-            centroid = piece.centroidLoc.astype(int)
-
-            
-            piece_locations = np.argwhere(piece.y.mask)
-            offset = np.array([piece.y.pcorner[1], piece.y.pcorner[0]])
-            piece_locations = piece_locations + offset
-            # print("Piece locations: ", piece_locations[:10])
-            # print("shape of convolved is ", convolved.shape)
-            rows = piece_locations[: ,0]
-            cols = piece_locations[:, 1]
-            # print("All scores are: ", convolved[rows, cols])
-            # print("aveage score is", np.mean(convolved[rows, cols]))
-                
-            # print("Piece locations for ")
-            # print(f'Expected centroid: {expected_cent} and actual {centroid}')
-
-            # Compute average score:
-            
-            score = np.mean(convolved[rows, cols])
-
+        for key, score in zip(keys, scores):
             if score < threshold:
-                self.addPiece(piece, ORIGINAL_ID=True)
+                self.addPiece(recordedBoard.pieces[key], ORIGINAL_ID=True)
                 self.zones[self.id_count-1] = recordedBoard.zones.get(key, 0)
     
     def createBoardByZone(self, recordedBoard, zone, checkStatus=None):
@@ -1011,38 +1300,88 @@ class SolutionBoard(Board):
         @param[in] threshold - threshold to determine if piece is present or not
         """
 
-        # Apply a convolution operation on solutionMask to get scores at
-        # each potential piece location.
-        boolean_mask = solutionMask != 0
-        solutionMask[boolean_mask] = 1
-        kernel = np.ones((5, 5), dtype=np.float32) / 25.0
-        convolved = convolve2d(solutionMask, kernel, mode='same')
-
-         # For each piece in recordedBoard, check if its location
-        # corresponds to a low score in the convolved mask.
-        # If so, add it to the partial board.
-
-        for key in self.pieces:
-            piece = self.pieces[key]
-
-            # Check the average score across the pixel locations
-            
-            piece_locations = np.argwhere(piece.y.mask)
-            offset = np.array([piece.y.pcorner[1], piece.y.pcorner[0]])
-            piece_locations = piece_locations + offset
-           
-            rows = piece_locations[: ,0]
-            cols = piece_locations[:, 1]
-            
-            
-            score = np.mean(convolved[rows, cols])
+        keys, scores = self.pieceScores(solutionMask)
 
+        for key, score in zip(keys, scores):
             if score < threshold:
                 self.pieces[key].setStatus(PieceStatus.GONE)
             else:
                 self.pieces[key].setStatus(PieceStatus.MEASURED)
-    
 
+    #=========================== pieceScores ===========================
+    #
+    def pieceScores(self, theMask):
+        """!
+        @brief  Score each piece by the average of the 5x5 box filtered (binarized)
+                mask over the piece pixels.
+
+        @param[in]  theMask     A boolean / int mask, in the frame of the board.
+
+        @param[out] keys        Piece keys.
+        @param[out] scores      Score per piece (nan for a piece with no pixel in the frame).
+        """
+
+        keys, flat, starts, counts = self._pixelIndexTable(theMask.shape)
+
+        scores = np.full(len(keys), np.nan)
+        if flat.size == 0:
+            return keys, scores
+
+        # Zero padded box filter, same as a 'same' convolution with a 5x5 mean kernel.
+        boxed = cv2.blur((theMask != 0).astype(np.float32), (5, 5),
+                         borderType=cv2.BORDER_CONSTANT)
+
+        # Pieces with no pixel are skipped so that reduceat sees increasing starts only.
+        valid = counts > 0
+        sums = np.add.reduceat(boxed.ravel()[flat], starts[valid])
+        scores[valid] = sums / counts[valid]
+
+        return keys, scores
+
+    #========================= _pixelIndexTable ========================
+    #
+    def _pixelIndexTable(self, shape):
+        """!
+        @brief  Flat indices of the piece pixels into a frame of the given shape.
+                Built once and reused while the pieces and their placements are the same.
+
+        @param[in]  shape   Frame shape.
+
+        @param[out] keys    Piece keys, in table order.
+        @param[out] flat    Concatenated flat pixel indices of the pieces.
+        @param[out] starts  Start of each piece in flat.
+        @param[out] counts  Pixel count of each piece.
+        """
+
+        rows, cols = shape[:2]
+
+        signature = (rows, cols) + tuple((key, tuple(piece.y.imshape), *np.asarray(piece.y.pcorner).tolist())
+                                         for key, piece in self.pieces.items())
+
+        # Boards loaded from older pickles have no cache yet.
+        cached = getattr(self, '_pixIndex', None)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        keys = list(self.pieces.keys())
+        chunks = []
+        for key in keys:
+            piece = self.pieces[key]
+            r, c = np.nonzero(piece.y.mask)
+            r = r + int(piece.y.pcorner[1])
+            c = c + int(piece.y.pcorner[0])
+
+            inFrame = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+            chunks.append(r[inFrame] * cols + c[inFrame])
+
+        counts = np.array([len(chunk) for chunk in chunks], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+        flat = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+
+        table = (keys, flat, starts, counts)
+        self._pixIndex = (signature, table)
+
+        return table
 
 
 #---------------------------------------------------------------------------
@@ -27,9 +27,11 @@ from dataclasses import dataclass
 # ===== Environment / Dependencies
 #
 import numpy as np
+from scipy.spatial.distance import cdist
 
 from puzzle.builder.arrangement import Arrangement, CfgArrangement
 from puzzle.board import Board
+from puzzle.utils.spatialIndex import SpatialGrid
 
 
 # ===== Helper Elements
@@ -101,47 +103,253 @@ class Adjacent(Arrangement):
     solution would be to the calibrated solution.
     """
 
-    def __init__(self, theBoard=[], theParams=CfgAdjacent()):
+    def __init__(self, theBoard=[], theParams=CfgAdjacent(), adjMat=None, lazy=False):
         """!
         @brief Constructor for the puzzle.builder.adjacent class.
 
+        Adjacency is stored sparsely, as the set of adjacent pieces of each piece
+        (by board key).  The dense adjMat is derived from it when asked for.
+
         Args:
             theBoard: The input board instance.
             theParams: The params.
+            adjMat: Known adjacency matrix (N x N bool). Skips processAdjacency if given.
+            lazy: Leave the adjacency pending until adjMat is first used.
         """
 
         super(Adjacent, self).__init__(theBoard, theParams)
 
-        if isinstance(theBoard, Board):
-            # Note that the Mat's index may not be the same as id in the piece dict.
-            # Have to be translated for further use.
-            self.adjMat = np.eye(theBoard.size()).astype('bool')
-        else:
+        if not isinstance(theBoard, Board):
             raise TypeError('Not initialized properly')
 
-        # Todo: May have problems if the pieces are not good
-        self.processAdjacency()
+        self._neighbors = None      # @< Key -> set of adjacent keys (None = pending).
+        self._adjIndex = None       # @< SpatialGrid of the piece boxes (None = to build).
+        self._adjPoints = {}        # @< Key -> (template, adjacency points), see Board.adjacencyPoints.
+        self._adjDense = None       # @< Cached (keys, dense adjacency matrix).
+
+        if adjMat is not None:
+            self.adjMat = adjMat
+        elif not lazy:
+            # Todo: May have problems if the pieces are not good
+            self.processAdjacency()
+
+    #============================== __setstate__ =============================
+    #
+    def __setstate__(self, state):
+        # Older pickles hold the dense matrices only.
+        adjMat = state.pop('adjMat', None)
+        state.pop('ilMat', None)
+
+        self.__dict__.update(state)
+        for name, value in (('_neighbors', None), ('_adjIndex', None), ('_adjPoints', {}),
+                            ('_adjDense', None)):
+            self.__dict__.setdefault(name, value)
+
+        if adjMat is not None:
+            self.adjMat = adjMat
+
+    #================================= adjMat ================================
+    #
+    @property
+    def adjMat(self):
+        """!
+        @brief  Dense adjacency matrix (N x N bool), in board order.
+
+        Built from the sparse adjacency, and kept until the adjacency or the pieces
+        change.  Pieces unknown to the adjacency (e.g., put in the pieces dict
+        directly) are only adjacent to themselves.
+        """
+
+        if self._neighbors is None:
+            self.processAdjacency()
+
+        keys = tuple(self.pieces.keys())
+        if self._adjDense is None or self._adjDense[0] != keys:
+            position = {key: ii for ii, key in enumerate(keys)}
+
+            rows, cols = [], []
+            for key, others in self._neighbors.items():
+                ii = position.get(key)
+                if ii is None:
+                    continue
+                for other in others:
+                    jj = position.get(other)
+                    if jj is not None:
+                        rows.append(ii)
+                        cols.append(jj)
+
+            theMat = np.eye(len(keys), dtype='bool')
+            theMat[rows, cols] = True
+            self._adjDense = (keys, theMat)
+
+        return self._adjDense[1]
 
+    @adjMat.setter
+    def adjMat(self, theMat):
+        theMat = np.asarray(theMat, dtype='bool')
+        keys = tuple(self.pieces.keys())
+
+        self._neighbors = {key: set() for key in keys}
+        for ii, jj in zip(*np.nonzero(theMat)):
+            if ii != jj:
+                self._neighbors[keys[ii]].add(keys[jj])
+
+        self._adjIndex = None
+        self._adjDense = (keys, theMat)
+
+    #=============================== neighbors ===============================
+    #
+    def neighbors(self, id):
+        """!
+        @brief  Keys of the pieces adjacent to a piece (itself excluded).
+
+        @param[in]  id          Key of the piece.
+
+        @param[out] theKeys     Set of keys.
+        """
+
+        if self._neighbors is None:
+            self.processAdjacency()
+
+        return set(self._neighbors.get(id, ()))
+
+    #============================ processAdjacency ===========================
+    #
     def processAdjacency(self):
         """!
         @brief  Process the solution board and determine what pieces are
                 adjacent or "close enough." It will determine the adjacency
                 matrix.
 
-        Assume that adjacent matrix has been instantiated and what is
-        needed is to populate its values with the correct ones.
+        Only pairs of pieces whose bounding boxes are within tauAdj of each other
+        get tested, the candidates come from a spatial index of the boxes.
         """
 
-        # Reset
-        self.adjMat[:,:] = np.eye(self.size()).astype('bool')
+        self._buildIndex()
 
-        pieceKeysList = list(self.pieces.keys())
+        keys = list(self.pieces.keys())
+        position = {key: ii for ii, key in enumerate(keys)}
 
-        for ii in range(self.size()):
-            for jj in range(ii + 1, self.size()):
-                if self.testAdjacent(pieceKeysList[ii], pieceKeysList[jj], self.params.tauAdj):
-                    self.adjMat[ii, jj] = True
-                    self.adjMat[jj, ii] = True
+        self._neighbors = {key: set() for key in keys}
+        for key in keys:
+            for other in self._adjIndex.query(self._pieceBox(key), self.params.tauAdj):
+                if position[other] > position[key] and self._testAdjacentCached(key, other):
+                    self._neighbors[key].add(other)
+                    self._neighbors[other].add(key)
+
+        self._adjDense = None
+
+    #============================ updateAdjacency ============================
+    #
+    def updateAdjacency(self, ids):
+        """!
+        @brief  Recompute the adjacency of some pieces only, e.g., after they moved.
+
+        Pending adjacency is left as is, it gets fully processed when needed.
+
+        @param[in]  ids     Keys of the pieces.
+        """
+
+        if self._neighbors is None:
+            return
+
+        if self._adjIndex is None:
+            self._buildIndex()
+        else:
+            for key in ids:
+                self._adjIndex.update(key, self._pieceBox(key))
+
+        for key in ids:
+            for other in self._neighbors.get(key, ()):
+                self._neighbors[other].discard(key)
+            self._neighbors[key] = set()
+
+        for key in ids:
+            for other in self._adjIndex.query(self._pieceBox(key), self.params.tauAdj):
+                if other != key and self._testAdjacentCached(key, other):
+                    self._neighbors[key].add(other)
+                    self._neighbors.setdefault(other, set()).add(key)
+
+        self._adjDense = None
+
+    #================================ addPiece ===============================
+    #
+    def addPiece(self, piece, ORIGINAL_ID=False):
+        """!
+        @brief  Add puzzle piece instance to the board, and update the adjacency.
+
+        @param[in]  piece           Puzzle piece instance.
+        @param[in]  ORIGINAL_ID     Flag indicating where to keep piece ID or re-assign.
+        """
+
+        super(Adjacent, self).addPiece(piece, ORIGINAL_ID)
+        self.updateAdjacency([self.id_count - 1])
+
+    #================================ rmPiece ================================
+    #
+    def rmPiece(self, id):
+        """!
+        @brief  Remove puzzle piece instance from board, and from the adjacency.
+
+        @param[in]  id  ID label of piece to remove.
+        """
+
+        super(Adjacent, self).rmPiece(id)
+
+        self._adjPoints.pop(id, None)
+        if self._adjIndex is not None:
+            self._adjIndex.remove(id)
+
+        if self._neighbors is not None:
+            for other in self._neighbors.pop(id, ()):
+                self._neighbors[other].discard(id)
+            self._adjDense = None
+
+    #=============================== movePiece ===============================
+    #
+    def movePiece(self, id, r, isOffset=False):
+        """!
+        @brief  Move a puzzle piece (see Template.setPlacement), and update the adjacency.
+
+        @param[in]  id          Key of the piece.
+        @param[in]  r           New location (or offset).
+        @param[in]  isOffset    Boolean flag indicating whether placement is an offset.
+        """
+
+        self.pieces[id].setPlacement(r, isOffset=isOffset)
+        self.updateAdjacency([id])
+
+    #============================== _buildIndex ==============================
+    #
+    def _buildIndex(self):
+        # Cells about the size of a piece plus the adjacency distance.
+        if self.size() > 0:
+            sizes = np.array([np.max(piece.size()) for piece in self.pieces.values()])
+            cellSize = np.median(sizes) + self.params.tauAdj
+        else:
+            cellSize = 64.
+
+        self._adjIndex = SpatialGrid(cellSize)
+        for key in self.pieces:
+            self._adjIndex.insert(key, self._pieceBox(key))
+
+    def _pieceBox(self, key):
+        piece = self.pieces[key]
+        rLoc = np.asarray(piece.rLoc, dtype=float).reshape(-1)[:2]
+        return (rLoc, rLoc + np.asarray(piece.size(), dtype=float))
+
+    def _testAdjacentCached(self, id_A, id_B):
+        # Board.testAdjacent, with the adjacency points kept per piece template.
+        pts = []
+        for key in (id_A, id_B):
+            piece = self.pieces[key]
+            entry = self._adjPoints.get(key)
+            if entry is None or entry[0] is not piece.y:
+                entry = (piece.y, Board.adjacencyPoints(piece))
+                self._adjPoints[key] = entry
+            pts.append(piece.rLoc + entry[1])
+
+        return cdist(pts[0], pts[1], 'euclidean').min() < self.params.tauAdj
 
     # OTHER CODE / MEMBER FUNCTIONS
     @staticmethod
@@ -39,8 +39,9 @@ from sklearn.cluster import KMeans
 
 from puzzle.builder.arrangement import Arrangement
 from puzzle.board import Board
+from puzzle.piece import Template, ParamRotationCache
 from puzzle.builder.interlocking import Interlocking, CfgInterlocking
-from puzzle.utils.dataProcessing import updateLabel, partition_even
+from puzzle.utils.dataProcessing import updateLabel, partition_even, partition_gap
 
 
 #
@@ -86,6 +87,7 @@ class CfgGridded(CfgInterlocking):
                         reorder = False,                # Reorder pieces based on grid.
                         grid = (None, None) ),          # Not sure. kmeans?
                         gridding = 'rectangular'        # Default grid estimation method.
+                                                        # (rectangular, arrangedbox or gap)
                         )
 
     return default_dict
@@ -111,15 +113,16 @@ class Gridded(Interlocking):
   '''
 
   #=========================== __init__ Gridded ==========================
-  def __init__(self, theBoard=[], theParams=CfgGridded()):
+  def __init__(self, theBoard=[], theParams=CfgGridded(), adjMat=None):
     '''!
     @brief Constructor for the puzzle.builder.adjacent class.
 
     @param[in]  theBoard    Input board instance.
     @param[in]  theParams   Gridded puzzle configuration instance.
+    @param[in]  adjMat      Known adjacency matrix [optional]. Skips its computation.
     '''
 
-    super(Gridded, self).__init__(theBoard, theParams)
+    super(Gridded, self).__init__(theBoard, theParams, adjMat)
 
     if isinstance(theBoard, Board):
       # Store the calibrated grid location of the puzzle piece, e.g., [x; y]
@@ -187,6 +190,14 @@ class Gridded(Interlocking):
 
       x_labels, y_labels = self.__processGrid_rectangular(x_list, y_list)
 
+    elif self.params.gridding == 'gap':
+
+      x_list = np.array([rLoc[0] for _, rLoc in pLoc.items()])
+      y_list = np.array([rLoc[1] for _, rLoc in pLoc.items()])
+
+      x_labels, y_labels = self.__processGrid_gap(x_list, y_list)
+      self.pshape = [x_labels.max() + 1, y_labels.max() + 1]
+
     else:
       # The puzzle need not be rectangular.  That would be problematic.
       # Uncomment if statement when ready.  Push other options to else.
@@ -212,41 +223,37 @@ class Gridded(Interlocking):
       plt.show()
 
     # Reorder the pieces, so the id will correspond to the grid location
+    x_labels = np.asarray(x_labels).reshape(-1)
+    y_labels = np.asarray(y_labels).reshape(-1)
+
     if self.params.reorder:
-      pieces_src = deepcopy(self.pieces)
       pieceKeysList = list(self.pieces.keys())
+      adjMat = self.adjMat
 
-      num = 0
-
-      # Save the changes, {new:old}
-      dict_conversion = {}
+      # Row-major grid order (y, then x).  Stable, so that a cell claimed twice
+      # keeps the first piece first.
+      order = np.lexsort((x_labels, y_labels))
 
-      for jj in range(max(y_labels) + 1):
-        for ii in range(max(x_labels) + 1):
-          for idx, pts in enumerate(zip(x_labels, y_labels)):
-            if pts[0] == ii and pts[1] == jj:
-              self.pieces[num] = pieces_src[pieceKeysList[idx]]
-              dict_conversion[num] = pieceKeysList[idx]
-              self.pieces[num].id = num
-              self.gc[:, num] = ii, jj
-              num = num + 1
-              break
+      # Re-key the pieces in grid order.  The piece instances are moved, not copied,
+      # and the dict is updated in place (it may be shared with the source board).
+      pieces_src = [self.pieces[pieceKeysList[idx]] for idx in order]
+      self.pieces.clear()
+      for num, piece in enumerate(pieces_src):
+        piece.id = num
+        self.pieces[num] = piece
 
-      # Have to re-compute adjMat/ilMat
-      adjMat_src = deepcopy(self.adjMat)
-      for ii in range(self.size()):
-        for jj in range(ii + 1, self.size()):
-          self.adjMat[ii, jj] = adjMat_src[dict_conversion[ii], dict_conversion[jj]]
-          self.adjMat[jj, ii] = self.adjMat[ii, jj]
+      self.gc[0, :] = x_labels[order]
+      self.gc[1, :] = y_labels[order]
 
-      self.ilMat = self.adjMat
+      # Have to re-compute adjMat (ilMat follows it)
+      self.adjMat = adjMat[np.ix_(order, order)]
 
     else:
-      for ii in range(self.size()):
-        # The order is in line with the one saving in self.pieces
-        self.gc[:, ii] = x_labels[ii], y_labels[ii]
-        # TODO  Eventually, this has to be upgraded to a dict? 
-        # TODO  Does it? Why? - PAV - 10/06/2024.
+      # The order is in line with the one saving in self.pieces
+      self.gc[0, :] = x_labels
+      self.gc[1, :] = y_labels
+      # TODO  Eventually, this has to be upgraded to a dict? 
+      # TODO  Does it? Why? - PAV - 10/06/2024.
 
 
 
@@ -307,11 +314,18 @@ class Gridded(Interlocking):
     @params[out] x_labels   Grid coordinates in x-direction ((N, 1))
     @params[out] y_labels   Grid coordinates in y-direction ((N, 1))
     '''
-    print("Processing rectangular.")
-    print(x_list)
-    print(y_list)
+    #DEBUG
+    #print("Processing rectangular.")
+    #print(x_list)
+    #print(y_list)
     N_piece = x_list.shape[0]
 
+    # Gap based gridding first, it is linearithmic.  The divisor search below is
+    # only needed when it does not give a complete grid.
+    x_labels, y_labels = self.__processGrid_gap(x_list, y_list)
+    if Gridded.isCompleteGrid(x_labels, y_labels):
+      return x_labels, y_labels
+
     # the result cache
     x_labels = None
     y_labels = None
@@ -347,6 +361,55 @@ class Gridded(Interlocking):
     return x_labels, y_labels
         
 
+  #=========================== __processGrid_gap ===========================
+  #
+  def __processGrid_gap(self, x_list, y_list):
+    '''!
+    @brief  Grid coordinates from the gaps between the sorted corner coordinates
+            (see partition_gap), separately in x and y.
+
+    The spacing between columns/rows is estimated from the coordinates.  Gaps under
+    a third of the mean piece size are taken as jitter within a column/row (as the
+    threshold of the cluster method).
+
+    @param[in] x_list   The x coordinates ((N,) or (N, 1))
+    @param[in] y_list   The y coordinates ((N,) or (N, 1))
+
+    @params[out] x_labels   Grid coordinates in x-direction ((N,))
+    @params[out] y_labels   Grid coordinates in y-direction ((N,))
+    '''
+    sizes = np.array([self.pieces[key].y.size for key in self.pieces], dtype=float).reshape(-1, 2)
+    if sizes.size > 0:
+      x_min, y_min = np.mean(sizes, axis=0) / 3
+    else:
+      x_min, y_min = 0., 0.
+
+    x_labels, _ = partition_gap(x_list, min_gap=x_min)
+    y_labels, _ = partition_gap(y_list, min_gap=y_min)
+
+    return x_labels, y_labels
+
+  #============================ isCompleteGrid ===========================
+  #
+  @staticmethod
+  def isCompleteGrid(x_labels, y_labels):
+    '''!
+    @brief  Check that grid coordinates fill a full rectangle, one piece per cell.
+
+    @param[in] x_labels   Grid coordinates in x-direction ((N,))
+    @param[in] y_labels   Grid coordinates in y-direction ((N,))
+
+    @return   flag (bool) True if complete.
+    '''
+    x_labels = np.asarray(x_labels).reshape(-1)
+    y_labels = np.asarray(y_labels).reshape(-1)
+    if x_labels.size == 0:
+      return False
+
+    nx = x_labels.max() + 1
+    cells = np.unique(y_labels * nx + x_labels)
+    return cells.size == x_labels.size and nx * (y_labels.max() + 1) == x_labels.size
+
   #============================= assert_gc =============================
   #
   def assert_gc(self, verbose=False):
@@ -388,10 +451,10 @@ class Gridded(Interlocking):
     '''!
     @brief  Randomly shuffle location of puzzle pieces of the puzzle.
 
-    Basically takes random mapping of puzzle pieces to each other, then swaps
-    locations and IDs.  That should shuffle everything up.
-
-    # @todo The numPieces argument does nothing as of now.  Should address.
+    Takes a random permutation of the puzzle pieces, then trades their locations
+    and IDs all at once (see Board.permute).  Rotations go through the rotation
+    cache (the global one if set, otherwise a default one), so the angles get
+    quantized to its step.
 
     @param[in]  numPieces   Number of pieces to shuffle (default: None = All pieces).
     @param[in]  reorient    Also apply random rotation (default: False).
@@ -400,31 +463,20 @@ class Gridded(Interlocking):
     @param[out] idMap       The ground truth shuffling as a dict [oldId -> newId]
     '''
 
-    keyOrig = list(self.pieces)
-    keyShuf = keyOrig.copy()
-    random.shuffle(keyShuf)
-
-    pieceLocations = self.pieceLocations()
-    pieceLocations = np.transpose(np.array([value for value in pieceLocations.values()]))
-    pieceLocations = pieceLocations[:,np.array(keyShuf)]
+    order = np.random.permutation(self.size())
+    if numPieces is not None and numPieces < self.size():
+      # Only a random subset trades places.
+      subset = np.random.choice(self.size(), numPieces, replace=False)
+      order  = np.arange(self.size())
+      order[subset] = np.random.permutation(subset)
 
-    pieceIDs = np.array([self.pieces[i].id for i in range(self.size())])
-    shuffIDs = pieceIDs[keyShuf]
-    key2id = dict(zip(keyOrig, shuffIDs))
-    idMap  = dict(zip(pieceIDs, shuffIDs))
+    angles = None
+    if reorient:
+      angles = np.random.uniform(rotRange[0], rotRange[1], size=self.size())
 
-    for key in self.pieces.keys():
-      piece = self.pieces[key]
+    theCache = Template.rotationCache if Template.rotationCache else ParamRotationCache()
 
-      if reorient:
-        piece = piece.rotatePiece(random.uniform(rotRange[0], rotRange[1]))    # Random reorientation
-
-      piece.setPlacement(pieceLocations[:,key])             # shuffled location.
-      piece.id = key2id[key]
-
-      self.pieces[key] = piece
-
-    return idMap
+    return self.permute(order, angles, theCache)
 
   #================================ retile ===============================
   #
@@ -442,44 +494,21 @@ class Gridded(Interlocking):
     @param[in]  inOrder     Sort by puzzle piece ID.
     '''
 
-    pSize = self.pshape[0]*self.pshape[1]
+    ncols, nrows = int(self.pshape[0]), int(self.pshape[1])
 
     if (inOrder):
-      pieceIDs = list(enumerate([self.pieces[i].id for i in range(self.size())]))
-      sortIDs = sorted(pieceIDs, key=lambda x:x[1])
-      sortInd = [index for index, _ in sortIDs]
+      sortInd = np.argsort([piece.id for piece in self.pieces.values()], kind='stable')
     else:
-      sortInd = list(range(0,self.size()))
-
-    pcnt  = 0;
-    for py in range(self.pshape[1]):
-      for px in range(self.pshape[0]):
-        self.pieces[sortInd[pcnt]].setPlacement(np.array([px*dx, py*dy]))
-        pcnt = pcnt + 1
-
-        if (pcnt >= pSize):
-          break
-
-      if (pcnt >= pSize):
-        break
-    
-    if (pcnt < pSize):
-      numLeft = (self.size() - pcnt)
-
-      numRows, numRem = divmod(numLeft, self.pshape[0])
-      if (numRem > 0):
-        numRows = numRows + 1
-
-      for py in range(self.pshape[1]+2,self.pshape[1]+2+numRows):
-        for px in range(self.pshape[0]):
-          self.pieces[sortInd[pcnt]].setPlacement(np.array([px*dx, py*dy]))
-          pcnt = pcnt + 1
+      sortInd = np.arange(self.size())
 
-          if (pcnt >= self.size()):
-            break
+    # Row-major grid slots.  Those past the puzzle shape skip two rows.
+    slots = np.arange(self.size())
+    px = slots % ncols
+    py = slots // ncols + 2 * (slots >= ncols * nrows)
 
-        if (pcnt >= self.size()):
-          break
+    rLocs = np.zeros((self.size(), 2), dtype=int)
+    rLocs[sortInd] = np.column_stack((px * dx, py * dy))
+    self.setLocations(rLocs)
     
   #============================ explodedPuzzle ===========================
   #
@@ -523,18 +552,15 @@ class Gridded(Interlocking):
     epImage = np.zeros((nr, nc, 3), dtype='uint8')
     epImage[:, :, :] = bgColor
 
-    #--[2] Place image data into the exploded puzzle image.
+    #--[2] Place the pieces of the epBoard (pixel data shared), then render
+    #      them into the exploded puzzle image in a single pass.
     #
+    epBoard = self.copyShared()
 
-    # Work on the epBoard
-    epBoard = deepcopy(self)
-    for idx, key in enumerate(epBoard.pieces):
-      piece = epBoard.pieces[key]
-      r_new = -r_origin + piece.rLoc + np.array([dx, dy]) * self.gc[:, idx].flatten()
-      r_new = r_new.astype('int')
+    r_new = -r_origin + self.locations() + np.array([dx, dy]) * self.gc[:2, :].T
+    epBoard.setLocations(r_new.astype('int'))
 
-      piece.placeInImageAt(epImage, rc=r_new)
-      piece.setPlacement(r_new)
+    epBoard._paintPieces(epImage, CONTOUR_DISPLAY=True)
 
     # @todo Doesn't seem to have copied the piece IDs.  Need to double check that.
 
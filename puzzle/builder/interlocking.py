@@ -95,24 +95,39 @@ class Interlocking(Adjacent):
 
     #============================== adjacent =============================
     #
-    def __init__(self, theBoard=[], theParams=CfgInterlocking):
+    def __init__(self, theBoard=[], theParams=CfgInterlocking, adjMat=None, lazy=False):
         """!
         @brief  Constructor for the puzzle.builder.adjacent class.
 
         Args:
             theBoard: The input board instance.
             theParams: The params.
+            adjMat: Known adjacency matrix [optional]. Skips its computation.
+            lazy: Leave the adjacency pending until first used (e.g., for a
+                  view of a board that may never need it).
         """
 
-        super(Interlocking, self).__init__(theBoard, theParams)
-
-        if isinstance(theBoard, Board):
-            self.ilMat = np.eye(theBoard.size()).astype('bool')
-        else:
+        if not isinstance(theBoard, Board):
             raise TypeError('Not initialized properly')
 
+        super(Interlocking, self).__init__(theBoard, theParams, adjMat, lazy)
+
         self.processInterlocking()
 
+    #================================= ilMat =================================
+    #
+    @property
+    def ilMat(self):
+        """!
+        @brief  Interlocking matrix (N x N bool).  Same as adjMat for now.
+        """
+
+        return self.adjMat
+
+    @ilMat.setter
+    def ilMat(self, theMat):
+        self.adjMat = theMat
+
     def processInterlocking(self):
         """!
         @brief Process the solution board and determine what pieces are
@@ -125,7 +140,7 @@ class Interlocking(Adjacent):
         """
 
         # Todo: Wait for further development
-        self.ilMat = self.adjMat
+        # ilMat follows adjMat (see the ilMat property), nothing to compute.
 
         # @note
         # For now interlocking and adjacency will be the same.
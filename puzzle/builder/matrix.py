@@ -36,6 +36,7 @@ import ivapy.display_cv as display
 
 from puzzle.builder.arrangement import Arrangement
 from puzzle.board import Board
+from puzzle.piece import Template, PuzzleTemplate, PieceStatus, ParamRotationCache
 from puzzle.builder.adjacent import Adjacent, CfgAdjacent
 from puzzle.utils.dataProcessing import updateLabel, partition_even
 
@@ -112,15 +113,16 @@ class Matrix(Adjacent):
   '''
 
   #=========================== __init__ Matrix ===========================
-  def __init__(self, theBoard=[], theParams=CfgMatrix):
+  def __init__(self, theBoard=[], theParams=CfgMatrix, adjMat=None):
     '''!
     @brief Constructor for the puzzle.builder.adjacent class.
 
     @param[in]  theBoard    Input board instance.
     @param[in]  theParams   Matrix puzzle configuration instance.
+    @param[in]  adjMat      Known adjacency matrix [optional]. Skips its computation.
     '''
 
-    super(Matrix, self).__init__(theBoard, theParams)
+    super(Matrix, self).__init__(theBoard, theParams, adjMat)
 
     if isinstance(theBoard, Board):
       # Store the calibrated grid location of the puzzle piece, e.g., [x; y]
@@ -322,47 +324,38 @@ class Matrix(Adjacent):
 
   #============================== shuffle ==============================
   #
-  def shuffle(self, numPieces=None, reorient=False):
+  def shuffle(self, numPieces=None, reorient=False, rotRange=[0,30]):
     '''!
     @brief  Randomly shuffle location of puzzle pieces of the puzzle.
 
-    Basically takes random mapping of puzzle pieces to each other, then swaps
-    locations and IDs.  That should shuffle everything up.
+    Takes a random permutation of the puzzle pieces, then trades their locations
+    and IDs all at once (see Board.permute).  Rotations go through the rotation
+    cache (the global one if set, otherwise a default one), so the angles get
+    quantized to its step.
 
-    # @todo The numPieces argument does nothing as of now.  Should address.
     # @todo Rotation should just be 90 degree increments (0,90,180,270).
 
     @param[in]  numPieces   Number of pieces to shuffle (default: None = All pieces).
     @param[in]  reorient    Also apply random rotation (default: False).
+    @param[in]  rotRange    Range of random rotation if reorienting.
 
     @param[out] idMap       The ground truth shuffling as a dict [oldId -> newId]
     '''
 
-    keyOrig = list(self.pieces)
-    keyShuf = keyOrig.copy()
-    random.shuffle(keyShuf)
-
-    pieceLocations = self.pieceLocations()
-    pieceLocations = np.transpose(np.array([value for value in pieceLocations.values()]))
-    pieceLocations = pieceLocations[:,np.array(keyShuf)]
-
-    pieceIDs = np.array([self.pieces[i].id for i in range(self.size())])
-    shuffIDs = pieceIDs[keyShuf]
-    key2id = dict(zip(keyOrig, shuffIDs))
-    idMap  = dict(zip(pieceIDs, shuffIDs))
-
-    for key in self.pieces.keys():
-      piece = self.pieces[key]
+    order = np.random.permutation(self.size())
+    if numPieces is not None and numPieces < self.size():
+      # Only a random subset trades places.
+      subset = np.random.choice(self.size(), numPieces, replace=False)
+      order  = np.arange(self.size())
+      order[subset] = np.random.permutation(subset)
 
-      if reorient:
-        piece = piece.rotatePiece(random.uniform(rotRange[0], rotRange[1]))    # Random reorientation
+    angles = None
+    if reorient:
+      angles = np.random.uniform(rotRange[0], rotRange[1], size=self.size())
 
-      piece.setPlacement(pieceLocations[:,key])             # shuffled location.
-      piece.id = key2id[key]
+    theCache = Template.rotationCache if Template.rotationCache else ParamRotationCache()
 
-      self.pieces[key] = piece
-
-    return idMap
+    return self.permute(order, angles, theCache)
 
 
   #============================ swapByCoords ===========================
@@ -407,41 +400,20 @@ class Matrix(Adjacent):
     @param[out] idMap       The ground truth swap as a dict [oldId -> newId]
     '''
 
-    # @todo This is a copy of shuffle.  Need to redo the code so it swaps only
-    #       those specified.  Basically just remap according to theswap.
-    #
-    #!print('Hello')
-    keyOrig = list(self.pieces)
-    keySwap = keyOrig.copy()
+    if theswap is None:
+      return {}
+
+    keySwap = np.arange(self.size())
     numSwaps = theswap.shape[0]
     for ii in range(numSwaps):
       keySwap[theswap[ii,0]] = theswap[ii,1]
       keySwap[theswap[ii,1]] = theswap[ii,0]
 
-    # @note Currently doing a brute force swap over all.  Not the cleanest
-    #       Should be able to do only subset affected.
-
-    pieceLocations = self.pieceLocations()
-    pieceLocations = np.transpose(np.array([value for value in pieceLocations.values()]))
-    pieceLocations = pieceLocations[:,np.array(keySwap)]
-
-    pieceIDs = np.array([self.pieces[i].id for i in range(self.size())])
-    shuffIDs = pieceIDs[keySwap]
-    key2id = dict(zip(keyOrig, shuffIDs))
-    idMap  = dict(zip(pieceIDs, shuffIDs))
-
-    for key in self.pieces.keys():
-      piece = self.pieces[key]
+    angles = None
+    if reorient:
+      angles = 90 * np.random.randint(0, 4, size=self.size())
 
-      if reorient:
-        piece = piece.rotatePiece(random.uniform(rotRange[0], rotRange[1]))    # Random reorientation
-
-      piece.setPlacement(pieceLocations[:,key])             # shuffled location.
-      piece.id = key2id[key]
-
-      self.pieces[key] = piece
-
-    return idMap
+    return self.permute(keySwap, angles)
 
   #================================ retile ===============================
   #
@@ -459,44 +431,21 @@ class Matrix(Adjacent):
     @param[in]  inOrder     Sort by puzzle piece ID.
     '''
 
-    pSize = self.pshape[0]*self.pshape[1]
+    ncols, nrows = int(self.shape[0]), int(self.shape[1])
 
     if (inOrder):
-      pieceIDs = list(enumerate([self.pieces[i].id for i in range(self.size())]))
-      sortIDs = sorted(pieceIDs, key=lambda x:x[1])
-      sortInd = [index for index, _ in sortIDs]
+      sortInd = np.argsort([piece.id for piece in self.pieces.values()], kind='stable')
     else:
-      sortInd = list(range(0,self.size()))
+      sortInd = np.arange(self.size())
 
-    pcnt  = 0;
-    for py in range(self.pshape[1]):
-      for px in range(self.pshape[0]):
-        self.pieces[sortInd[pcnt]].setPlacement(np.array([px*dx, py*dy]))
-        pcnt = pcnt + 1
+    # Row-major grid slots.  Those past the puzzle shape skip two rows.
+    slots = np.arange(self.size())
+    px = slots % ncols
+    py = slots // ncols + 2 * (slots >= ncols * nrows)
 
-        if (pcnt >= pSize):
-          break
-
-      if (pcnt >= pSize):
-        break
-    
-    if (pcnt < pSize):
-      numLeft = (self.size() - pcnt)
-
-      numRows, numRem = divmod(numLeft, self.pshape[0])
-      if (numRem > 0):
-        numRows = numRows + 1
-
-      for py in range(self.pshape[1]+2,self.pshape[1]+2+numRows):
-        for px in range(self.pshape[0]):
-          self.pieces[sortInd[pcnt]].setPlacement(np.array([px*dx, py*dy]))
-          pcnt = pcnt + 1
-
-          if (pcnt >= self.size()):
-            break
-
-        if (pcnt >= self.size()):
-          break
+    rLocs = np.zeros((self.size(), 2), dtype=int)
+    rLocs[sortInd] = np.column_stack((px * dx, py * dy))
+    self.setLocations(rLocs)
     
   #============================ explodedPuzzle ===========================
   #
@@ -540,18 +489,15 @@ class Matrix(Adjacent):
     epImage = np.zeros((nr, nc, 3), dtype='uint8')
     epImage[:, :, :] = bgColor
 
-    #--[2] Place image data into the exploded puzzle image.
+    #--[2] Place the pieces of the epBoard (pixel data shared), then render
+    #      them into the exploded puzzle image in a single pass.
     #
+    epBoard = self.copyShared()
 
-    # Work on the epBoard
-    epBoard = deepcopy(self)
-    for idx, key in enumerate(epBoard.pieces):
-      piece = epBoard.pieces[key]
-      r_new = -r_origin + piece.rLoc + np.array([dx, dy]) * self.gc[:, idx].flatten()
-      r_new = r_new.astype('int')
+    r_new = -r_origin + self.locations() + np.array([dx, dy]) * self.gc[:2, :].T
+    epBoard.setLocations(r_new.astype('int'))
 
-      piece.placeInImageAt(epImage, rc=r_new)
-      piece.setPlacement(r_new)
+    epBoard._paintPieces(epImage, CONTOUR_DISPLAY=True)
 
     # @todo Doesn't seem to have copied the piece IDs.  Need to double check that.
 
@@ -780,19 +726,112 @@ class Matrix(Adjacent):
 
     theParams.isize = (None, None)      #! Image will determine image size.
 
-    #! Step 5: For now make a mask. Later do by region labeling.
+    #! Step 5: The cut lines are known, slice the image directly.
     #!
-    theMask = np.ones([imrows, imcols])
-    for ci in range(theParams.psize[0]) :
-      theMask[:,ci*dc] = 0;
+    thePuzzle = Matrix.buildFrom_ImageAndGrid(theImage, theParams)
 
-    for ri in range(theParams.psize[1]) :
-      theMask[ri*dr,:] = 0;
+    return thePuzzle, theImage
 
-    thePuzzle = Matrix.buildFrom_ImageAndMask(theImage, theMask, theParams)
+  #====================== buildFrom_ImageAndGrid =======================
+  #
+  @staticmethod 
+  def buildFrom_ImageAndGrid(theImage, theParams):
+    '''!
+    @brief  Slice an image into the psize grid of a Matrix puzzle.
 
-    return thePuzzle, theImage
+    No segmentation is involved.  Each cell of the grid becomes a rectangular
+    Template (all ones mask, image as a view into the source image), created in
+    row-major order.  The grid coordinates and the adjacency follow from the
+    cell layout.  Trailing rows/columns that do not fill a cell are dropped.
+
+    @param[in]  theImage    The source image (H x W x D).
+    @param[in]  theParams   The Matrix puzzle configuration (psize must be set).
+
+    @return     thePuzzle   A Matrix puzzle board instance.
+    '''
+
+    ncols, nrows = theParams.psize
+    dc = int(np.shape(theImage)[1] / ncols)
+    dr = int(np.shape(theImage)[0] / nrows)
+
+    #! Same for all the cells: mask, coordinates (x;y) and contour (as from
+    #! findContours). Each piece gets its own copy.
+    cMask = np.ones((dr, dc), dtype='uint8')
+    cy, cx = np.nonzero(cMask)
+    cCoords = np.vstack((cx, cy)).astype(np.int32)
+    cContour = np.array([[[0, 0]], [[0, dr-1]], [[dc-1, dr-1]], [[dc-1, 0]]], 
+                                                                     dtype=np.int32)
+    cCent = np.array([(dc-1)/2, (dr-1)/2])
+
+    theBoard = Board()
+    theta = None
+    for ri in range(nrows):
+      for ci in range(ncols):
+        pCorn = np.array([ci*dc, ri*dr])
+        pImage = theImage[ri*dr:(ri+1)*dr, ci*dc:(ci+1)*dc]
+
+        y = PuzzleTemplate()
+        y.size    = [dc, dr]
+        y.pcorner = pCorn
+        y.mask    = cMask.copy()
+        y.contour_pts = cContour.copy()
+        y.rcoords = cCoords.copy()
+        y.appear  = pImage.reshape(dr*dc, -1)
+        y.image   = pImage
+
+        thePiece = Template(y, pCorn, np.round(pCorn + cCent).astype(int))
+        if theta is None:
+          theta = -thePiece.orientation()     #! Same shape, same orientation.
+        thePiece.theta  = theta
+        thePiece.status = PieceStatus.MEASURED
+
+        #! As Board.addPiece, less the deep copy.
+        thePiece.id = theBoard.id_count + 1
+        theBoard.pieces[theBoard.id_count] = thePiece
+        theBoard.id_count += 1
+
+    #! Grid coordinates (x; y), row-major.
+    gc = np.vstack((np.tile(np.arange(ncols), nrows), np.repeat(np.arange(nrows), ncols)))
+
+    adjMat = Matrix.gridAdjacency(theParams.psize, (dc, dr), theParams.tauAdj)
+
+    thePuzzle = Matrix(theBoard, theParams, adjMat)
+    thePuzzle.gc = gc
+
+    return thePuzzle
+
+
+  #=========================== gridAdjacency ===========================
+  #
+  @staticmethod
+  def gridAdjacency(psize, csize, tauAdj):
+    '''!
+    @brief  Adjacency matrix of the cells of a regular grid, row-major order.
+
+    Same outcome as processAdjacency on rectangular cells tiling the grid: the
+    nearest contour points of two cells are corners, so their distance is the
+    pixel gap between the cells.  It only depends on the row & column offsets,
+    which get tabulated then expanded.
+
+    @param[in]  psize   Grid size (columns, rows).
+    @param[in]  csize   Cell size (width, height) in pixels.
+    @param[in]  tauAdj  Distance threshold for concluding adjacency.
+
+    @return     adjMat  Adjacency matrix (N x N bool).
+    '''
+
+    ncols, nrows = psize
+    dc, dr = csize
+
+    dRow = np.abs(np.arange(nrows)[:,None] - np.arange(nrows)[None,:])
+    dCol = np.abs(np.arange(ncols)[:,None] - np.arange(ncols)[None,:])
+
+    offs = np.arange(max(nrows, ncols))
+    gaps = np.hypot(np.maximum(offs*dr - dr + 1, 0)[:nrows,None], 
+                    np.maximum(offs*dc - dc + 1, 0)[None,:ncols])
+    isAdj = gaps < tauAdj                              #! (row offset, col offset)
 
+    return isAdj[dRow[:,None,:,None], dCol[None,:,None,:]].reshape(nrows*ncols, -1)
 
   #===================== buildFrom_ImageAndRegions =====================
   #
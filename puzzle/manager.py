@@ -48,6 +48,8 @@ from puzzle.parser.fromLayer import FromLayer
 from puzzle.piece.matchDifferent import MatchDifferent
 from puzzle.piece.matchSimilar import MatchSimilar
 from puzzle.piece.moments import Moments
+from puzzle.piece import Regular
+from puzzle.pieces.edge import Edge, EdgeIndex
 
 # ===== Helper Elements
 #
@@ -176,7 +178,20 @@ class Manager(FromLayer):
         scoreTable_shape = np.zeros((self.bMeas.size(), self.solution.size()))
         scoreTable_color = np.zeros((self.bMeas.size(), self.solution.size()))
         scoreTable_edge_color = np.zeros((self.bMeas.size(), self.solution.size(), 4))
+
+        # Edge type scores are infinite unless the side types agree, so only the
+        # solution pieces with the same types (up to rotation) are worth scoring.
+        theIndex = None
+        if isinstance(self.matcher, Edge) \
+                and all(isinstance(piece, Regular) for piece in self.solution.pieces.values()):
+            theIndex = EdgeIndex(self.solution.pieces)
+
         for idx_x, MeaPiece in enumerate(self.bMeas.pieces):
+            if theIndex is not None and isinstance(self.bMeas.pieces[MeaPiece], Regular):
+                candidates = {key for key, _ in theIndex.similar(self.bMeas.pieces[MeaPiece])}
+            else:
+                candidates = None
+
             for idx_y, SolPiece in enumerate(self.solution.pieces):
 
                 # Todo: Currently, it does not support two scoreTables. We currently use the sift features, only one table.
@@ -187,6 +202,12 @@ class Manager(FromLayer):
                         scoreTable_shape[idx_x][idx_y] = -100
                     continue
 
+                if candidates is not None and SolPiece not in candidates:
+                    scoreTable_shape[idx_x][idx_y] = np.inf
+                    scoreTable_color[idx_x][idx_y] = np.inf
+                    scoreTable_edge_color[idx_x][idx_y] = np.inf
+                    continue
+
                 ret = self.matcher.score(self.bMeas.pieces[MeaPiece], self.solution.pieces[SolPiece])
 
                 # Debug only
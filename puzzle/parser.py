@@ -52,7 +52,7 @@ from trackpointer.centroidMulti import centroidMulti, CfgCentMulti
 
 from puzzle.board import Board
 from puzzle.piece import Piece, PieceStatus
-from puzzle.utils.shapeProcessing import bb_intersection_over_union
+from puzzle.utils.imageProcessing import mask2regions
 
 from camera.utils import display
 
@@ -326,107 +326,14 @@ class boardMeasure(centroidMulti):
       #  print(f"Piece failed test. {ri.area}, {ri.bbox[2] - ri.bbox[0]}, {ri.bbox[3] - ri.bbox[1]}")
 
 
-  #xxxxxxxxxxxxxxxxxxxxxxx findCorrectedContours xxxxxxxxxxxxxxxxxxxxxxx
+  #============================= mask2regions ============================
   #
-  # MOST LIKELY NO LONGER NEEDED. KEEP UNTIL NEW IMPLEMENTATION DONE.
+  # Legacy region extraction, kept for callers of regions2pieces.  Now based on
+  # connected components, see puzzle.utils.imageProcessing.mask2regions.
   #
-  def findCorrectedContours(self, mask, FILTER=True):
-    """
-    @brief Find the right contours given a binary mask image.
-
-    @param[in]  mask    The input binary mask image.
-    @param[in]  FILTER  Options (set to TRUE).
-
-    @param[ou]  desired_cnts    Contour list.
-        """
-    # For details of options, see https://docs.opencv.org/4.5.2/d3/dc0/group__imgproc__shape.html#ga819779b9857cc2f8601e6526a3a5bc71
-    # and https://docs.opencv.org/4.5.2/d3/dc0/group__imgproc__shape.html#ga4303f45752694956374734a03c54d5ff
-    # For OpenCV 4+
-    cnts, hierarchy = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-
-    if len(cnts) == 0:
-      return []
-
-    hierarchy = hierarchy[0]
-
-    if FILTER:
-      # Filter out the outermost contour
-      # See https://docs.opencv.org/master/d9/d8b/tutorial_py_contours_hierarchy.html
-      keep = []
-      for i in range(hierarchy.shape[0]):
-        # We assume a valid contour should not contain too many small contours
-        if hierarchy[i][3] == -1 and np.count_nonzero(hierarchy[:, 3] == i) >= 2:
-          # # Debug only
-          # temp_mask = np.zeros_like(mask).astype('uint8')
-          # cv2.drawContours(temp_mask, cnts[i], -1, (255, 255, 255), 2)
-          # _, temp_mask = cv2.threshold(temp_mask, 10, 255, cv2.THRESH_BINARY)
-          # cv2.imshow('temp_mask', temp_mask)
-          # cv2.waitKey()
-          pass
-        else:
-          keep.append(i)
-
-      #DEBUG
-      #print('KKKK')
-      #print(keep)
-      #print(cnts)
-      cnts = np.array(cnts)
-      cnts = cnts[keep]
-      #print('CCCC')
-      #print(cnts)
-      #print('----')
-    else:
-      cnts = np.array(cnts)
-
-    desired_cnts = []
-
-    # Filter out some contours according to area threshold
-    for c in cnts:
-      # Draw the contours
-      # cv2.drawContours(mask, [c], -1, (0, 255, 0), 2)
-
-      area = cv2.contourArea(c)
-
-      # Filtered by the area threshold
-      if area > self.tparams.maxArea:
-        continue
-      elif area > self.tparams.minArea:
-        desired_cnts.append(c)
-      else:
-        # findContours may return a discontinuous contour which cannot compute contourArea correctly
-        if cv2.arcLength(c, True) > self.tparams.lengthThresholdLower:
-
-          temp_mask = np.zeros_like(mask).astype('uint8')
-          cv2.drawContours(temp_mask, [c], -1, (255, 255, 255), 2)
-          _, temp_mask = cv2.threshold(temp_mask, 10, 255, cv2.THRESH_BINARY)
-          # Debug only
-          # debug_mask = copy.deepcopy(temp_mask)
-          # debug_mask = cv2.resize(debug_mask, (int(debug_mask.shape[1] / 2), int(debug_mask.shape[0] / 2)),
-          #                         interpolation=cv2.INTER_AREA)
-          # cv2.imshow('debug', debug_mask)
-          # cv2.waitKey()
-          desired_cnts_new = self.findCorrectedContours(temp_mask)
-          for c in desired_cnts_new:
-            if area > self.tparams.maxArea:
-              continue
-            elif area > self.tparams.minArea:
-              desired_cnts.append(c)
-            desired_cnts.append(c)
-    
-    #DEBUG
-    #print("DCDCDCDCDCDC")
-    #print(desired_cnts)
-    #print('RRRRRRRRRRRR')
-    return desired_cnts
-
-  #xxxxxxxxxxxxxxxxxxxxxxxxxxxx mask2regions xxxxxxxxxxxxxxxxxxxxxxxxxxx
-  #
-  # To be deprecated.  Seems to use an inefficient OpenCV scheme.
-  # Replicating functionality elsewhere as I decipher the code.
   def mask2regions(self, I, M, verbose=False):
     """
     @brief Convert the selection mask into a bunch of regions.
-           Mainly based on findContours function.
 
     Args:
         I:  RGB image.
@@ -435,71 +342,11 @@ class boardMeasure(centroidMulti):
     Returns:
         regions: A list of regions (mask, segmented image, location in the source image).
     """
-    # Convert mask to an image
-    mask = M.astype('uint8')
-
-    # # Debug only
-    if verbose:
-      cv2.imshow('debug_ori_mask',mask)
-      cv2.waitKey()
-
-    desired_cnts = self.findCorrectedContours(mask)
-
-    # In rare case, a valid contour may contain some small contours
-    if len(desired_cnts) == 0:
-        desired_cnts = self.findCorrectedContours(mask, FILTER=False)
-
-    if verbose:
-        print('size of desired_cnts is', len(desired_cnts))
+    regions = mask2regions(I, M, areaThresholdLower=self.tparams.minArea,
+                           areaThresholdUpper=self.tparams.maxArea)
 
-    # # Debug only
     if verbose:
-      debug_mask = np.zeros_like(mask).astype('uint8')
-      for c in desired_cnts:
-        cv2.drawContours(debug_mask, [c], -1, (255, 255, 255), 2)
-
-      debug_mask = cv2.resize(debug_mask, (int(debug_mask.shape[1] / 2), int(debug_mask.shape[0] / 2)), interpolation=cv2.INTER_AREA)
-      cv2.imshow('debug_after_area_thresh',debug_mask)
-      cv2.waitKey()
-
-    regions = []
-    # Get the individual part
-    print('DCDCDCDCDCD')
-    print(desired_cnts)
-    for c in desired_cnts:
-      seg_img = np.zeros(mask.shape[:2], dtype="uint8")  # reset a blank image every time
-      cv2.drawContours(seg_img, [c], -1, (255, 255, 255), thickness=-1)
-
-      # # Debug only
-      if verbose:
-        cv2.imshow('debug_individual_seg',seg_img)
-        cv2.waitKey()
-
-      # Get ROI, OpenCV style
-      x, y, w, h = cv2.boundingRect(c)
-
-      # The area checking only count the actual area but we may have some cases where segmentation is scattered
-      if w*h > self.tparams.maxArea:
-        skipFlag = True
-      else:
-        # Double check if ROI has a large IoU with the previous ones, then discard it
-        skipFlag = False
-        for region in regions:
-          if bb_intersection_over_union(region[3], [x, y, x + w, y + h]) > 0.5:
-            skipFlag = True
-            break
-
-      # Todo: A tricky solution to skip regions of all black, which is for our real scene
-      if cv2.countNonZero(cv2.threshold(cv2.cvtColor(cv2.bitwise_and(I.astype('uint8'), I.astype('uint8'), mask=seg_img.astype('uint8')), cv2.COLOR_BGR2GRAY), 50, 255, cv2.THRESH_BINARY)[1]) == 0:
-        # Debug only
-        # cv2.imshow('seg_img', seg_img)
-        # cv2.imshow('I', I)
-        # cv2.waitKey()
-        continue
-
-      if not skipFlag:
-        # Add theMask, theImage, rLoc, the region
-        regions.append((seg_img[y:y + h, x:x + w], I[y:y + h, x:x + w, :], [x, y], [x, y, x + w, y + h]))
+      print('size of regions is', len(regions))
 
     return regions
 
@@ -523,7 +370,6 @@ class boardMeasure(centroidMulti):
       @param[out] pieces    List of puzzle pieces instances.
       """
       pieces = []
-      print(regions)
       for region in regions:
         theMask  = region[0]
         theImage = region[1]
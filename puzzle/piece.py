@@ -23,20 +23,23 @@
 
 # ===== Environment / Dependencies
 #
-from copy import deepcopy
+from collections import OrderedDict
+import hashlib
+from copy import copy, deepcopy
 from dataclasses import dataclass
 from enum import Enum
 
 import cv2
 import numpy as np
 
+from puzzle.utils.imageProcessing import grasp_point
 from puzzle.utils.imageProcessing import rotate_im
-from puzzle.utils.imageProcessing import rotate_nd
+from puzzle.utils.imageProcessing import rotate_sparse
+from puzzle.utils.shapeProcessing import moment_frame
 
 import matplotlib.pyplot as plt
 import ivapy.display_cv as display
 
-from scipy.signal import convolve2d
 # ===== Helper Elements
 #
 
@@ -60,22 +63,228 @@ class PieceStatus(Enum):
 #
 #================================= PuzzleTemplate ================================
 #
-@dataclass
 class PuzzleTemplate:
     '''!
     @ingroup    PuzzleSolver
     @brief  Data class containing puzzle piece information.
+
+    Slotted, with integer pixel coordinates stored as int32.  The binary contour
+    image is not stored, it is drawn from the mask when asked for.  See compact for
+    shrinking a template further once it is only kept around (e.g., history boards).
+    '''
+
+    __slots__ = ('pcorner', 'size', '_rcoords', 'appear', '_image', '_mask', '_packed',
+                 '_contour', '_frame', 'contour_pts', 'kpFea')
+
+    def __init__(self):
+        self.pcorner = np.array([])     # @< The top left corner (x,y) of puzzle piece bbox.
+        self.size = np.array([])        # @< Tight bbox size (width, height) of puzzle piece image.
+        self.rcoords = np.array([])     # @< Puzzle piece linear image coordinates.
+        self.appear = np.array([])      # @< Puzzle piece vectorized color/appearance.
+        self.image = np.array([], dtype='uint8')    # @< Image w/BG (original).
+        self.mask = np.array([], dtype='uint8')     # @< Binary mask image.
+        self.contour_pts = np.array([])  # @< Template contour points.
+        self.kpFea = np.array([])       # @< Sift Kp Features>
+
+    #============================== __setstate__ =============================
+    #
+    def __setstate__(self, state):
+        # Handles slotted state (dict, slots) as well as the dict of older pickles.
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **(state[1] or {})}
+
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    #================================ rcoords ================================
+    #
+    @property
+    def rcoords(self):
+        return self._rcoords
+
+    @rcoords.setter
+    def rcoords(self, value):
+        # Lists are left as is, the builders swap rows of a list before the final array.
+        if isinstance(value, np.ndarray) and value.dtype.kind in 'iu' and value.dtype.itemsize > 4:
+            value = value.astype(np.int32)
+        self._rcoords = value
+
+    #================================= mask ==================================
+    #
+    @property
+    def mask(self):
+        if self._packed is None:
+            return self._mask
+
+        bits, shape, dtype, value = self._packed
+        theMask = np.unpackbits(bits, count=shape[0] * shape[1]).reshape(shape)
+        return (theMask * value).astype(dtype)
+
+    @mask.setter
+    def mask(self, value):
+        self._mask = value
+        self._packed = None
+        self._contour = None
+        self._frame = None
+
+    #================================= frame =================================
+    #
+    def frame(self):
+        '''!
+        @brief  Centroid and signed principal axes of the mask (see moment_frame).
+                Computed once from the mask moments, then kept.
+
+        @return     centroid    Centroid (x, y) in template coordinates (None if degenerate).
+        @return     axes        2x2 rotation, major axis first (None if degenerate).
+        '''
+
+        theFrame = getattr(self, '_frame', None)
+        if theFrame is None:
+            theFrame = moment_frame(self.mask)
+            self._frame = theFrame
+
+        return theFrame
+
+    #================================ contour ================================
+    #
+    @property
+    def contour(self):
+        if self._contour is not None:
+            return self._contour
+
+        theMask = self.mask
+        if np.ndim(theMask) != 2:
+            return np.array([], dtype='uint8')
+
+        theMask = theMask.astype('uint8')
+        cnts = cv2.findContours(theMask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        theContour = np.zeros_like(theMask)
+        cv2.drawContours(theContour, cnts[0], -1, 255, thickness=2)
+
+        if self._packed is None:
+            self._contour = theContour
+
+        return theContour
+
+    @contour.setter
+    def contour(self, value):
+        self._contour = value
+
+    #================================= image =================================
+    #
+    @property
+    def image(self):
+        if self._image is not None:
+            return self._image
+
+        # Discarded by compact, rebuilt from the appearance on a black background.
+        theImage = np.zeros(tuple(self.imshape) + self.appear.shape[1:], dtype=self.appear.dtype)
+        theImage[self.rcoords[1], self.rcoords[0]] = self.appear
+        return theImage
+
+    @image.setter
+    def image(self, value):
+        self._image = value
+
+    #============================= pixelBuffers ==============================
+    #
+    def pixelBuffers(self):
+        '''!
+        @brief  The pixel arrays held by the template (image, mask, contour, coordinates,
+                appearance), for copies that should share rather than duplicate them.
+        '''
+
+        return [value for value in (self._image, self._mask, self._contour, self._rcoords,
+                                    self.appear) if isinstance(value, np.ndarray)]
+
+    #================================ imshape ================================
+    #
+    @property
+    def imshape(self):
+        '''!
+        @brief  Height and width of the template image/mask, without unpacking them.
+        '''
+
+        if self._packed is not None:
+            return self._packed[1]
+        return self._mask.shape[:2]
+
+    #================================ compact ================================
+    #
+    def compact(self, discardImage=False):
+        '''!
+        @brief  Shrink the template storage.
+
+        The mask is bit-packed (unpacked again on access), the cached contour image
+        is dropped, and rcoords become int16 when they fit.  Optionally the image with
+        background is dropped too, in which case image returns the piece pixels on a
+        black background.  The mask and image returned afterwards are fresh copies, so
+        writing into them has no effect on the template.
+
+        @param[in]  discardImage    Drop the background-inclusive image or not.
+        '''
+
+        theMask = self._mask
+        if self._packed is None and isinstance(theMask, np.ndarray) and theMask.ndim == 2 \
+                and theMask.size > 0:
+            values = np.unique(theMask)
+            if values.size <= 2 and values[0] == 0:
+                value = values[-1] if values.size == 2 else 1
+                self._packed = (np.packbits(theMask != 0), theMask.shape, theMask.dtype, value)
+                self._mask = None
+
+        self._contour = None
+
+        if isinstance(self._rcoords, np.ndarray) and self._rcoords.size > 0 \
+                and self._rcoords.dtype.kind in 'iu' \
+                and np.abs(self._rcoords).max() <= np.iinfo(np.int16).max:
+            self._rcoords = self._rcoords.astype(np.int16)
+
+        if discardImage and np.size(self.appear) > 0:
+            self._image = None
+
+#
+#================================= RotationCache =================================
+#
+@dataclass
+class ParamRotationCache:
+    step:           float = 1.0     # @< Angle quantization (degrees).
+    capacity:       int = 16        # @< Rotated sprites kept per piece (LRU).
+
+
+class RotationCache:
+    '''!
+    @ingroup    PuzzleSolver
+    @brief  Per-piece LRU store of rotated sprites, keyed by quantized angle.
+
+    Copies of a piece hold the same source data, so deep copies share the cache
+    instead of duplicating it.
     '''
 
-    pcorner:        np.ndarray = np.array([])   # @< The top left corner (x,y) of puzzle piece bbox.
-    size:           np.ndarray = np.array([])   # @< Tight bbox size (width, height) of puzzle piece image.
-    rcoords:        np.ndarray = np.array([])   # @< Puzzle piece linear image coordinates.
-    appear:         np.ndarray = np.array([])   # @< Puzzle piece vectorized color/appearance.
-    image:          np.ndarray = np.array([], dtype='uint8')    # @< Image w/BG (original).
-    mask:           np.ndarray = np.array([], dtype='uint8')    # @< Binary mask image.
-    contour:        np.ndarray = np.array([], dtype='uint8')    # @< Binary contour image.
-    contour_pts:    np.ndarray = np.array([])   # @< Template contour points.
-    kpFea:          np.ndarray = np.array([])   # @< Sift Kp Features>
+    def __init__(self, capacity=16):
+        self.capacity = capacity
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def get(self, key):
+        item = self.items.get(key)
+        if item is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.items.move_to_end(key)
+        return item
+
+    def put(self, key, item):
+        self.items[key] = item
+        self.items.move_to_end(key)
+        while len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+
 #
 #==================================== Template ===================================
 #
@@ -91,6 +300,11 @@ class Template:
 
     '''
 
+    __slots__ = ('y', 'gLoc', 'centroidLoc', 'rLoc', 'id', 'status', 'theta', 'lifespan',
+                 'featVec', '_rotCache', 'cluster_id', 'tracking_life', 'rLoc_relative')
+
+    rotationCache = None            # @< ParamRotationCache for rotatePiece. None disables it.
+
     #================================ __init__ ===============================
     #
     def __init__(self, y:PuzzleTemplate=None, r=None, centroidLoc=None, id=None, theta=0, pieceStatus=PieceStatus.UNKNOWN):
@@ -127,15 +341,55 @@ class Template:
                                     # regular piece, which means the angle to rotate to its upright.
 
         self.lifespan = 0           # @< Save life count, only useful in the tracking function.
+        self.tracking_life = 0      # @< Frames spent tracked but unseen, for the planner.
+        self.cluster_id = None      # @< Cluster assignment, if any.
         self.featVec  = None        # @< If assigned, feature descriptor vector of puzzle piece.
+        self._rotCache = None       # @< RotationCache, created on first cached rotatePiece.
 
 
+    def __setstate__(self, state):
+        # Handles slotted state (dict, slots) as well as the dict of older pickles.
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **(state[1] or {})}
+
+        for key, value in state.items():
+            setattr(self, key, value)
+
     def deepcopy(self):
 
       thePiece = Template(y=deepcopy(self.y), r=self.rLoc, centroidLoc=self.centroidLoc, id=deepcopy(self.id), 
                           theta=self.theta, pieceStatus=self.status)
+      thePiece._rotCache = getattr(self, '_rotCache', None)
       return thePiece
 
+    #================================ compact ================================
+    #
+    def compact(self, discardImage=False):
+        """!
+        @brief  Shrink the stored template data, see PuzzleTemplate.compact.
+
+        @param[in]  discardImage    Drop the background-inclusive image or not.
+        """
+
+        self.y.compact(discardImage)
+        self._rotCache = None
+
+    #=========================== setRotationCache ==========================
+    #
+    @staticmethod
+    def setRotationCache(theParams=ParamRotationCache()):
+        """!
+        @brief  Enable (or disable with None) the rotatePiece cache for all pieces.
+
+        With the cache on, rotatePiece snaps the angle to the nearest multiple of
+        theParams.step and reuses the rotated sprite when the same piece (or a copy
+        of it) is rotated by that angle again.
+
+        @param[in]  theParams   ParamRotationCache instance or None.
+        """
+
+        Template.rotationCache = theParams
+
     #================================== size =================================
     #
     def size(self):
@@ -291,29 +545,58 @@ class Template:
         """!
         @brief Get the location in pixel coordinates to send the suction cup
                gripper to grasp the piece.
-        
-        @param[in]  kernel_size     Size of square kernel used in convolution.
+
+        The in-piece offset comes from grasp_point and is cached by mask content,
+        so identical pieces and repeated calls do not recompute it.
+
+        @param[in]  kernel_size     Size of the square suction cup footprint, or a
+                                    binary footprint image for other shapes.
         
         Returns:
             loc:    [x, y] coordinates in image to send suction cup
         """
-        if self.gLoc is not None:
-            return self.gLoc
-        kernel = np.ones((kernel_size,kernel_size))
-
-        # Convolve across image with 1 piece to get scores
-        output_scores = convolve2d(self.y.mask, kernel, mode='same', boundary='fill', fillvalue=0)
-        max_val = np.max(output_scores)
-        max_val_loc = np.where(output_scores == max_val)
-        max_val_loc = np.array(max_val_loc).T
-  
-        diff = max_val_loc - np.array([self.y.size[1] / 2, self.y.size[0] / 2])
-        distances = np.linalg.norm(diff, axis=1)
-
-        target = max_val_loc[np.argmin(distances)] + self.y.pcorner[::-1]
-        self.gLoc = target[::-1]
+
+        offset = Template._graspOffset(self.y.mask, kernel_size)
+
+        self.gLoc = (offset + np.asarray(self.y.pcorner)[::-1])[::-1]
         return self.gLoc
 
+    #============================= _graspOffset ==============================
+    #
+    _graspCache = OrderedDict()     # @< Grasp offsets by mask hash, see _graspOffset.
+    _graspCacheSize = 1024
+
+    @staticmethod
+    def _graspOffset(theMask, kernel_size):
+        """!
+        @brief  Grasp location (row, col) within a mask, cached by mask hash.
+
+        @param[in]  theMask         Binary mask image.
+        @param[in]  kernel_size     Footprint size or image (see getGraspLoc).
+
+        @return     offset          Location (row, col) within the mask.
+        """
+
+        theMask = np.ascontiguousarray(theMask)
+        if np.isscalar(kernel_size):
+            kernelKey = int(kernel_size)
+        else:
+            kernel_size = np.ascontiguousarray(kernel_size)
+            kernelKey = (kernel_size.shape, hashlib.blake2b(kernel_size.tobytes(), digest_size=16).digest())
+
+        key = (theMask.shape, hashlib.blake2b(theMask.tobytes(), digest_size=16).digest(), kernelKey)
+
+        offset = Template._graspCache.get(key)
+        if offset is None:
+            offset = grasp_point(theMask, kernel_size)
+            Template._graspCache[key] = offset
+            if len(Template._graspCache) > Template._graspCacheSize:
+                Template._graspCache.popitem(last=False)
+        else:
+            Template._graspCache.move_to_end(key)
+
+        return offset
+
     #============================== placeInImage =============================
     #
     def placeInImage(self, theImage, offset=[0, 0], CONTOUR_DISPLAY=False):
@@ -530,11 +813,9 @@ class Template:
         y.mask = theMask.astype('uint8')
 
         # Create a contour of the mask.  Find version gets the contour/boundary.
-        # Draw version creates binary contour mask.
+        # The binary contour mask is drawn on demand, see PuzzleTemplate.contour.
         cnts = cv2.findContours(y.mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
         y.contour_pts = cnts[0][0]
-        y.contour = np.zeros_like(y.mask).astype('uint8')
-        cv2.drawContours(y.contour, cnts[0], -1, 255, thickness=2)
 
         # Debug only
         # hull = cv2.convexHull(cnts[0][0])
@@ -561,7 +842,7 @@ class Template:
             thePiece = Template(y, rLoc, centroidLoc)
 
         # Set up the rotation (with theta, we can correct the rotation)
-        thePiece.theta = -Template.getEig(thePiece.y.mask)
+        thePiece.theta = -thePiece.orientation()
 
         # Set up the status of the piece
         thePiece.status = pieceStatus
@@ -608,11 +889,9 @@ class Template:
         y.mask = newMask.astype('uint8')
 
         # Create a contour of the mask.  Find version gets the contour/boundary.
-        # Draw version creates binary contour mask.
+        # The binary contour mask is drawn on demand, see PuzzleTemplate.contour.
         cnts = cv2.findContours(y.mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
         y.contour_pts = cnts[0][0]
-        y.contour = np.zeros_like(y.mask).astype('uint8')
-        cv2.drawContours(y.contour, cnts[0], -1, 255, thickness=2)
 
         y.rcoords = list(np.nonzero(newMask))  # 2 (row,col) x N
 
@@ -626,10 +905,11 @@ class Template:
         y.image = newImage
 
         # Set up the rotation (with theta, we can correct the rotation)
-        self.theta = -Template.getEig(y.mask)
         self.y = y
+        self.theta = -self.orientation()
         self.rLoc = rLoc
         self.featVec = None
+        self._rotCache = None
 
     #================================= rotate ================================
     #
@@ -647,16 +927,7 @@ class Template:
         # Apply the shift and instantiate a new puzzle piece from
         # the rotated mask and image.
         #
-        (rIm, rMa) = rotate_nd(self.y.image, theta, self.y.mask)
-
-        rowMa = rMa.any(axis=1)
-        colMa = rMa.any(axis=0)
-
-        rowInds = np.argwhere(rowMa)
-        colInds = np.argwhere(colMa)
-
-        cropIm = rIm[rowInds,np.transpose(colInds)]
-        cropMa = rMa[rowInds,np.transpose(colInds)]
+        cropIm, cropMa, cDelta = self._rotateSource(theta)
 
         #DEBUG
         #print([np.shape(rMa), np.shape(colMa), sum(colMa) , np.shape(rowMa), sum(rowMa)])
@@ -675,11 +946,6 @@ class Template:
         #  display.binary(cropMa)
         #  display.wait()
 
-        imdims = np.array(self.y.image.shape[0:2])
-        rodims = np.array(cropIm.shape[0:2])
-
-        cDelta = (rodims - imdims)/2            # Piece offset (dH,dW).
-        cDelta = cDelta[-1]                     # Piece offset (dx,dy).
         cLoc   = self.y.pcorner - cDelta.astype('uint8')
         rLoc   = self.rLoc - cDelta.astype('uint8')
 
@@ -690,15 +956,23 @@ class Template:
 
     #============================== rotatePiece ==============================
     #
-    def rotatePiece(self, theta):
+    def rotatePiece(self, theta, theCache=None):
         """!
         @brief Create copy of puzzle piece instance rotated by the given angle.
 
+        If the rotation cache is on (see setRotationCache), the angle is quantized
+        and the rotated sprite is reused from the piece's cache when available.
+
         @param[in]  theta       Rotation angle.
+        @param[in]  theCache    ParamRotationCache to use instead of the global one.
 
         @return     thePiece    Rotated puzzle template instance.
         """
 
+        theParams = Template.rotationCache if theCache is None else theCache
+        if theParams is not None:
+            return self._rotatePieceCached(theta, theParams)
+
         # First, generate rotated copies of the image data.
         # Then figure out how to shift location based on new size.
         # The shift is not sub-pixel, which will cause a small offset
@@ -706,33 +980,10 @@ class Template:
         # Apply the shift and instantiate a new puzzle piece from
         # the rotated mask and image.
         #
-        (rIm, rMa) = rotate_nd(self.y.image, theta, self.y.mask)
-
-        rowMa = rMa.any(axis=1)
-        colMa = rMa.any(axis=0)
-
-        rowInds = np.argwhere(rowMa)
-        colInds = np.argwhere(colMa)
-
-        cropIm = rIm[rowInds,np.transpose(colInds)]
-        cropMa = rMa[rowInds,np.transpose(colInds)]
+        cropIm, cropMa, cDelta = self._rotateSource(theta)
+        cLoc, rLoc = self._rotatedLocations(cDelta)
 
         # Reconsitute a puzzle template from rotated, cropped mask and image 
-
-        imdims = np.array(self.y.image.shape[0:2])
-        rodims = np.array(cropIm.shape[0:2])
-
-        cDelta = (rodims - imdims)/2            # Piece offset (dH,dW).
-        cDelta = cDelta[-1]                     # Piece offset (dx,dy).
-        cLoc   = self.y.pcorner - cDelta
-        rLoc   = self.rLoc - cDelta
-
-        cLoc   = np.maximum(cLoc, 0)            # Keep in bounds at min edges.
-        rLoc   = np.maximum(rLoc, 0)            # No problems with max edges.
-
-        cLoc   = cLoc.astype(int)
-        rLoc   = rLoc.astype(int)
-
         rotPiece = Template.buildFromMaskAndImage(cropMa, cropIm, cLoc, rLoc, \
                                                   pieceStatus=self.status)
 
@@ -816,60 +1067,147 @@ class Template:
 
         return thePiece
 
+    #============================= _rotateSource =============================
+    #
+    def _rotateSource(self, theta):
+        """!
+        @brief  Rotate the source sprite and crop it tight.
+
+        @param[in]  theta       Rotation angle.
+
+        @return     cropIm      Rotated, cropped image.
+        @return     cropMa      Rotated, cropped mask.
+        @return     cDelta      Change of size (dx,dy) over two, for recentering.
+        """
+
+        # Only the sprite pixels are rotated, see rotate_sparse.
+        imdims = np.array(self.y.imshape[0:2])
+
+        rcoords, appear, cropMa = rotate_sparse(self.y.rcoords, self.y.appear,
+                                                (imdims[1], imdims[0]), theta)
+
+        cropIm = np.zeros(cropMa.shape + self.y.appear.shape[1:], dtype=self.y.appear.dtype)
+        cropIm[rcoords[1], rcoords[0]] = appear
+
+        rodims = np.array(cropIm.shape[0:2])
+
+        cDelta = (rodims - imdims)/2            # Piece offset (dH,dW).
+        cDelta = cDelta[-1]                     # Piece offset (dx,dy).
+
+        return cropIm, cropMa, cDelta
+
+    #=========================== _rotatedLocations ===========================
+    #
+    def _rotatedLocations(self, cDelta):
+        """!
+        @brief  Corner and placement locations of the piece after a rotation.
+
+        @param[in]  cDelta      Recentering offset from _rotateSource.
+
+        @return     cLoc        Corner location.
+        @return     rLoc        Placement location.
+        """
+
+        cLoc   = self.y.pcorner - cDelta
+        rLoc   = self.rLoc - cDelta
+
+        cLoc   = np.maximum(cLoc, 0)            # Keep in bounds at min edges.
+        rLoc   = np.maximum(rLoc, 0)            # No problems with max edges.
+
+        return cLoc.astype(int), rLoc.astype(int)
+
+    #=========================== _rotatePieceCached ==========================
+    #
+    def _rotatePieceCached(self, theta, theParams):
+        """!
+        @brief  Cached version of rotatePiece, on quantized angles.
+
+        The cache holds location free sprites (built at the origin).  A hit only
+        copies the sprite and places it, the pixel data is shared.
+
+        @param[in]  theta       Rotation angle.
+        @param[in]  theParams   ParamRotationCache instance.
+
+        @return     thePiece    Rotated puzzle template instance.
+        """
+
+        angle = (round(theta / theParams.step) * theParams.step) % 360
+
+        theCache = getattr(self, '_rotCache', None)
+        if theCache is None or theCache.capacity != theParams.capacity:
+            theCache = RotationCache(theParams.capacity)
+            self._rotCache = theCache
+
+        item = theCache.get(angle)
+        if item is None:
+            cropIm, cropMa, cDelta = self._rotateSource(angle)
+            sprite = Template.buildFromMaskAndImage(cropMa, cropIm, np.array([0, 0]))
+            item = (sprite, cDelta)
+            theCache.put(angle, item)
+
+        sprite, cDelta = item
+        cLoc, rLoc = self._rotatedLocations(cDelta)
+
+        rotPiece = copy(sprite)
+        rotPiece.y = copy(sprite.y)
+        rotPiece.y.pcorner = cLoc
+        rotPiece.rLoc = rLoc
+        rotPiece.status = self.status
+        rotPiece._rotCache = None
+
+        return rotPiece
+
+    #============================== orientation ==============================
+    #
+    def orientation(self):
+        """!
+        @brief  Angle of the major axis of the piece (degrees), see pcaFrame.
+
+        @return     theta       The major axis angle, 0 for a degenerate piece.
+        """
+
+        _, axes = self.y.frame()
+        if axes is None:
+            return 0.
+
+        return np.rad2deg(np.arctan2(axes[1, 0], axes[0, 0]))
+
+    #================================ pcaFrame ===============================
+    #
+    def pcaFrame(self):
+        """!
+        @brief  Signed principal frame of the piece at its current placement.
+
+        @return     center      Global pixel centroid (None if degenerate).
+        @return     frame       2x2 right-handed rotation, major axis first (None if degenerate).
+        """
+
+        centroid, axes = self.y.frame()
+        if centroid is None:
+            return None, None
+
+        return centroid + np.asarray(self.rLoc, dtype=np.float64), axes
+
     #================================= getEig ================================
     #
     @staticmethod
     def getEig(img):
         """!
         @brief  To find the major and minor axes of a blob and then return the aligned rotation.
-                See https://alyssaq.github.io/2015/computing-the-axes-or-orientation-of-a-blob/ for details.
-                PCA is our default method which does not perform very well.
+                The axes come from the image moments, see moment_frame.
 
         Args:
-            img: A contour image.
+            img: A mask (or contour) image.
 
         Returns:
             theta: The aligned angle (degree).
         """
 
-        # @note Currently, we use the image center
+        _, axes = moment_frame(img)
+        if axes is None:
+            return 0.
 
-        y, x = np.nonzero(img)
-        # x = x - np.mean(x)
-        # y = y - np.mean(y)
-        #
-        x = x - np.mean(img.shape[1] / 2)
-        y = y - np.mean(img.shape[0] / 2)
-
-        coords = np.vstack([x, y])
-        cov = np.cov(coords)
-        evals, evecs = np.linalg.eig(cov)
-        sort_indices = np.argsort(evals)[::-1]
-        v1 = evecs[:, sort_indices[0]]  # Eigenvector with largest eigenvalue
-        v2 = evecs[:, sort_indices[1]]
-
-        dict = {
-            'x': x,
-            'y': y,
-            'v1': v1,
-            'v2': v2,
-        }
-
-        theta = np.rad2deg(np.arctan2(dict['v1'][1], dict['v1'][0]))
-
-        # # Debug only
-        #
-        # scale = 20
-        # plt.plot([dict['v1'][0] * -scale * 2, dict['v1'][0] * scale * 2],
-        #          [dict['v1'][1] * -scale * 2, dict['v1'][1] * scale * 2], color='red')
-        # plt.plot([dict['v2'][0] * -scale, dict['v2'][0] * scale],
-        #          [dict['v2'][1] * -scale, dict['v2'][1] * scale], color='blue')
-        # plt.plot(x, y, 'k.')
-        # plt.axis('equal')
-        # plt.gca().invert_yaxis()  # Match the image system with origin at top left
-        # plt.show()
-
-        return theta
+        return np.rad2deg(np.arctan2(axes[1, 0], axes[0, 0]))
 
     #=========================== replaceSourceData ===========================
     #
@@ -1049,8 +1387,6 @@ class Template:
                                 cv2.CHAIN_APPROX_SIMPLE)
 
         y.contour_pts = cnts[0][0]
-        y.contour = np.zeros_like(y.mask).astype('uint8')
-        cv2.drawContours(y.contour, cnts[0], -1, (255, 255, 255), thickness=2)
 
         y.rcoords = list(np.nonzero(y.mask))  # 2 (row,col) x N
         # Updated to OpenCV style -> (x,y)
@@ -1109,6 +1445,8 @@ class Piece:
 #===== Environment / Dependencies
 #
 
+from concurrent.futures import ProcessPoolExecutor
+
 from puzzle.utils.sideExtractor import sideExtractor
 
 
@@ -1145,6 +1483,7 @@ class EdgeDes:
 
     colorFea: np.ndarray = np.array([])  # @< The processed color feature.
     shapeFea: np.ndarray = np.array([])  # @< The processed shape feature.
+    signature: np.ndarray = np.array([])  # @< Resampled side contour (L, 2), see Edge.signatures.
 
 
 #
@@ -1157,34 +1496,73 @@ class Regular(Template):
             East, West approach. Usually Regular pieces are part of a Gridded puzzle.
     '''
 
+    __slots__ = ('_edge', '_sidesPending', 'class_image', 'rectangle_pts',
+                 'filtered_harris_pts', 'simple_harris_pts')
+
+    lazySides = False               # @< Default for deferring the side extraction, see __init__.
+
+    _sideCache = OrderedDict()      # @< sideExtractor outputs by mask hash, see _extract.
+    _sideCacheSize = 512
+
     #============================= __init__ Regular ============================
     #
-    def __init__(self, y:PuzzleTemplate=None, r=(0, 0), id=None, theta=0, pieceStatus=PieceStatus.UNKNOWN):
+    def __init__(self, y:PuzzleTemplate=None, r=(0, 0), id=None, theta=0, pieceStatus=PieceStatus.UNKNOWN,
+                 lazy=None):
         '''!
         @brief  Constructor for the regular puzzle piece.  Arguments are optional.
 
+        With lazy set, the sides are not extracted here but on first access to edge
+        (e.g., by the Edge matcher), or for a whole board at once by extractSides.
+        theta keeps its given value until then.
+
         @param[in]  y           Puzzle template instance.
         @param[in]  r           Location of the puzzle piece (top-left corner).
         @param[in]  theta       Orientation of the piece.
         @param[in]  pieceStatus Measurement status.
+        @param[in]  lazy        Defer the side extraction (None: Regular.lazySides).
         '''
 
-        super(Regular, self).__init__(y, r, id, theta, pieceStatus)
+        super(Regular, self).__init__(y, r, id=id, theta=theta, pieceStatus=pieceStatus)
 
         # Assume the order 0, 1, 2, 3 correspond to left, right, top, bottom
-        self.edge = [EdgeDes() for i in range(4)]
+        self._edge = [EdgeDes() for i in range(4)]
+        self._sidesPending = None       # @< enable_rotate of the pending extraction, if any.
 
         # Debug only
         self.class_image            = None
         self.rectangle_pts          = None
         self.filtered_harris_pts    = None
         self.simple_harris_pts      = None
-        self.theta = None
 
-        if theta == 0:
-            self._process(enable_rotate=False)
+        if lazy is None:
+            lazy = Regular.lazySides
+
+        if lazy:
+            self._sidesPending = not (theta == 0)
         else:
-            self._process()
+            self.theta = None
+            self._process(enable_rotate=not (theta == 0))
+
+    #================================== edge ===================================
+    #
+    @property
+    def edge(self):
+        if getattr(self, '_sidesPending', None) is not None:
+            self._process(enable_rotate=self._sidesPending)
+        return self._edge
+
+    @edge.setter
+    def edge(self, value):
+        self._edge = value
+
+    #=============================== sidesPending ==============================
+    #
+    def sidesPending(self):
+        '''!
+        @brief  Whether the side extraction was deferred and has not run yet.
+        '''
+
+        return getattr(self, '_sidesPending', None) is not None
 
     #================================= _process ================================
     #
@@ -1196,19 +1574,24 @@ class Regular(Template):
         # @todo     Enable rotate should be a param flag.
         # @note     All of the work is done in sideExtractor.  Why have it be separate?
 
-        # d_thresh is related to the size of the puzzle piece
-        out_dict = sideExtractor(self.y, scale_factor=1,
-                                 harris_block_size=5, harris_ksize=5,
-                                 corner_score_threshold=0.7, corner_minmax_threshold=100,
-                                 shape_classification_nhs=3, 
-                                 d_thresh=(self.y.size[0] + self.y.size[1]) / 5,
-                                 enable_rotate=enable_rotate)
+        self._applySides(Regular._extract(self.y, enable_rotate))
+
+    #=============================== _applySides ===============================
+    #
+    def _applySides(self, out_dict):
+        '''!
+        @brief  Set up the edges from the sideExtractor output.
+
+        @param[in]  out_dict    Output of sideExtractor.
+        '''
+
+        self._sidesPending = None
 
         # Set up the type/img of the chosen edge
         for direction in EdgeDirection:
             self.setEdgeType(direction.value, out_dict['inout'][direction.value])
-            self.edge[direction.value].image = out_dict['class_image']
-            self.edge[direction.value].mask = out_dict['side_images'][direction.value]
+            self._edge[direction.value].image = out_dict['class_image']
+            self._edge[direction.value].mask = out_dict['side_images'][direction.value]
 
         # @note Just for display for now
         self.class_image = out_dict['class_image']  # with four edges
@@ -1219,6 +1602,77 @@ class Regular(Template):
         self.filtered_harris_pts = out_dict['filtered_harris_pts']
         self.simple_harris_pts = out_dict['simple_harris_pts']
 
+    #================================ _sideKey =================================
+    #
+    @staticmethod
+    def _sideKey(y, enable_rotate):
+        '''!
+        @brief  Cache key of the side extraction: the mask (hashed), its size and the
+                rotation flag.  Nothing else of the template is used.
+        '''
+
+        theMask = np.ascontiguousarray(y.mask)
+        return (theMask.shape, hashlib.blake2b(theMask.tobytes(), digest_size=16).digest(),
+                tuple(np.asarray(y.size).tolist()), bool(enable_rotate))
+
+    #================================= _extract ================================
+    #
+    @staticmethod
+    def _extract(y, enable_rotate, key=None):
+        '''!
+        @brief  sideExtractor output for a template, cached by mask hash.
+
+        Pieces with identical masks (re-measured or copied pieces) share the output
+        arrays, which are not to be written into.
+
+        @param[in]  y               Puzzle template instance.
+        @param[in]  enable_rotate   Rotate the piece to horizontal or not.
+        @param[in]  key             Precomputed _sideKey, if available.
+
+        @return     out_dict        Output of sideExtractor.
+        '''
+
+        if key is None:
+            key = Regular._sideKey(y, enable_rotate)
+
+        out_dict = Regular._sideCache.get(key)
+        if out_dict is None:
+            out_dict = _sideExtract(y, enable_rotate)
+            Regular._cacheSides(key, out_dict)
+        else:
+            Regular._sideCache.move_to_end(key)
+
+        return out_dict
+
+    @staticmethod
+    def _cacheSides(key, out_dict):
+        Regular._sideCache[key] = out_dict
+        Regular._sideCache.move_to_end(key)
+        if len(Regular._sideCache) > Regular._sideCacheSize:
+            Regular._sideCache.popitem(last=False)
+
+    #=============================== _sideSource ===============================
+    #
+    @staticmethod
+    def _sideSource(y):
+        '''!
+        @brief  Compact copy of a template holding only what sideExtractor needs, for
+                sending to worker processes: bit-packed mask, no cached contour, and
+                the image rebuilt from the appearance (sideExtractor does not use the
+                background).
+        '''
+
+        theSource = PuzzleTemplate()
+        theSource.pcorner = y.pcorner
+        theSource.size = y.size
+        theSource.rcoords = y.rcoords
+        theSource.appear = y.appear
+        theSource.mask = y.mask
+        theSource.image = None if np.size(y.appear) > 0 else y.image
+        theSource.compact()
+
+        return theSource
+
     #=============================== setEdgeType ===============================
     #
     def setEdgeType(self, direction, etype):
@@ -1246,19 +1700,20 @@ class Regular(Template):
 
     #=============================== rotatePiece ===============================
     #
-    def rotatePiece(self, theta):
+    def rotatePiece(self, theta, theCache=None):
         """
         @brief  Rotate the regular puzzle piece
 
         Args:
             theta: The rotation angle.
+            theCache: ParamRotationCache to use instead of the global one.
 
         Returns:
             theRegular: The rotated regular piece.
         """
 
         # @todo May need to change from redo everything to focus on transformation.
-        thePiece = super().rotatePiece(theta)
+        thePiece = super().rotatePiece(theta, theCache)
 
         # Hacked to disable rotation operation
         thePiece.theta = 0
@@ -1296,18 +1751,100 @@ class Regular(Template):
     #============================= upgradeTemplate =============================
     #
     @staticmethod
-    def upgradeTemplate(thePiece):
+    def upgradeTemplate(thePiece, lazy=None):
         '''!
         @brief  Given a Template instance, transfer to a Regular instance.
 
         @param[in]  thePiece    Puzzle piece as a Template instance.
+        @param[in]  lazy        Defer the side extraction (None: Regular.lazySides).
         @param[out]             Puzzle piece as a Regular instance.
         '''
 
         thePiece = Regular(thePiece.y, thePiece.rLoc, thePiece.id, 
-                                                      thePiece.theta, thePiece.status)
+                                                      thePiece.theta, thePiece.status, lazy=lazy)
         return thePiece
 
+
+#============================== _sideExtract ===============================
+#
+def _sideExtract(y, enable_rotate):
+    '''!
+    @brief  Run sideExtractor on a template with the Regular piece settings.
+
+    @param[in]  y               Puzzle template instance.
+    @param[in]  enable_rotate   Rotate the piece to horizontal or not.
+
+    @return     out_dict        Output of sideExtractor.
+    '''
+
+    # d_thresh is related to the size of the puzzle piece
+    return sideExtractor(y, scale_factor=1,
+                         harris_block_size=5, harris_ksize=5,
+                         corner_score_threshold=0.7, corner_minmax_threshold=100,
+                         shape_classification_nhs=3, 
+                         d_thresh=(y.size[0] + y.size[1]) / 5,
+                         enable_rotate=enable_rotate)
+
+def _sideWorker(job):
+    # Process pool entry point, job = (compact template, enable_rotate).
+    return _sideExtract(*job)
+
+#============================== extractSides ===============================
+#
+def extractSides(theBoard, workers=None, lazy=False):
+    '''!
+    @brief  Side extraction of all the Regular pieces of a board still pending it.
+
+    Meant for boards built with deferred extraction (Regular.lazySides or lazy=True),
+    so that the per-piece sideExtractor runs are done in one batch over a process
+    pool instead of one by one during the build.  Each distinct mask is processed
+    once, and the outputs go into the Regular mask hash cache.  The workers receive
+    compact templates (packed mask plus appearance).
+
+    With lazy set, only the cached outputs are applied; the other pieces stay
+    pending and get their sides when first asked for (e.g., by the Edge matcher).
+
+    @param[in]  theBoard    The board (pieces are updated in place).
+    @param[in]  workers     Number of processes. None uses all the cores, 1 (or less)
+                            runs in-process.
+    @param[in]  lazy        Leave the uncached pieces pending instead of processing them.
+
+    @return     nDone       Number of pieces whose sides got set.
+    '''
+
+    pending = [piece for piece in theBoard.pieces.values()
+                     if isinstance(piece, Regular) and piece.sidesPending()]
+
+    # Pieces by cache key; those already in the cache are done right away.
+    jobs = OrderedDict()
+    nDone = 0
+    for piece in pending:
+        key = Regular._sideKey(piece.y, piece._sidesPending)
+        if key in Regular._sideCache:
+            piece._applySides(Regular._extract(piece.y, piece._sidesPending, key=key))
+            nDone += 1
+        else:
+            jobs.setdefault(key, []).append(piece)
+
+    if lazy or len(jobs) == 0:
+        return nDone
+
+    sources = [(Regular._sideSource(group[0].y), key[-1]) for key, group in jobs.items()]
+
+    if (workers is not None and workers <= 1) or len(sources) == 1:
+        outputs = [_sideWorker(job) for job in sources]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outputs = list(executor.map(_sideWorker, sources))
+
+    for (key, group), out_dict in zip(jobs.items(), outputs):
+        Regular._cacheSides(key, out_dict)
+        for piece in group:
+            piece._applySides(out_dict)
+            nDone += 1
+
+    return nDone
+
 #
 #============================== puzzle.piece.regular =============================
 
@@ -23,6 +23,8 @@ import numpy as np
 from puzzle.pieces.matcher import MatchDifferent
 from puzzle.piece import Regular
 from puzzle.piece import Template
+from puzzle.piece import EdgeDirection, EdgeType
+from puzzle.utils.shapeProcessing import side_signatures, signature_distances
 
 
 #
@@ -39,13 +41,15 @@ class Edge(MatchDifferent):
     """
 
 
-    def __init__(self, tau_shape=100, tau_color=400):
+    def __init__(self, tau_shape=100, tau_color=400, sigLength=64, band=None):
         """
         @brief  Constructor for the puzzle piece edge class.
                 150 for lab space/400 for RGB space.
         Args:
             tau_shape: The threshold for the shape feature.
             tau_color: The threshold for the color feature.
+            sigLength: The number of points of the side signatures.
+            band: The DTW band (samples) for signature distances, None for plain L2.
         """
 
         super(Edge, self).__init__()
@@ -53,6 +57,74 @@ class Edge(MatchDifferent):
         self.tau_shape = tau_shape
         self.tau_color = tau_color
 
+        self.sigLength = sigLength
+        self.band = band
+
+    @staticmethod
+    def sideSignatures(piece, sigLength=64):
+        """
+        @brief  The resampled signatures of the four sides of a piece (see
+                side_signatures), computed once and kept in the piece's edges.
+
+        Args:
+            piece: A Regular piece.
+            sigLength: The number of points of a signature.
+
+        Returns:
+            sigs: The (4, sigLength, 2) signatures.
+        """
+
+        if not issubclass(type(piece), Regular):
+            raise TypeError('The input type is wrong. Need a regular instance.')
+
+        if any(np.shape(edge.signature) != (sigLength, 2) for edge in piece.edge):
+            sigs = side_signatures(piece.edge[0].image, length=sigLength)
+            for i in range(4):
+                piece.edge[i].signature = sigs[i]
+
+        return np.stack([piece.edge[i].signature for i in range(4)])
+
+    def signatures(self, pieces):
+        """
+        @brief  Side signatures of a collection of pieces.
+
+        Args:
+            pieces: A list of Regular pieces (or a dict of them, e.g., board.pieces).
+
+        Returns:
+            sigs: The (N, 4, sigLength, 2) signatures, in the order of the pieces.
+        """
+
+        if isinstance(pieces, dict):
+            pieces = list(pieces.values())
+
+        if len(pieces) == 0:
+            return np.zeros((0, 4, self.sigLength, 2))
+
+        return np.stack([Edge.sideSignatures(piece, self.sigLength) for piece in pieces])
+
+    def compatibility(self, piecesA, piecesB=None, mate=True):
+        """
+        @brief  Side-vs-side distances between all the pieces, in a single call.
+
+        Args:
+            piecesA: A list (or dict) of Regular pieces, or their (N, 4, L, 2) signatures.
+            piecesB: Same for the second set (None: piecesA).
+            mate: Compare the sides for fitting together (True) or for similarity.
+
+        Returns:
+            dist: The (NA, NB, 4, 4) tensor, dist[i, j, a, b] between side a of piece i
+                  of the first set and side b of piece j of the second set.
+        """
+
+        sigA = piecesA if isinstance(piecesA, np.ndarray) else self.signatures(piecesA)
+        if piecesB is None:
+            sigB = None
+        else:
+            sigB = piecesB if isinstance(piecesB, np.ndarray) else self.signatures(piecesB)
+
+        return signature_distances(sigA, sigB, mate=mate, band=self.band)
+
     @staticmethod
     def extractFeature(piece, method=None):
         """
@@ -73,8 +145,7 @@ class Edge(MatchDifferent):
         for i in range(4):
 
             # Check if the variable is an empty list
-            if (isinstance(piece.edge[i].shapeFea, list) and len(piece.edge[i].shapeFea) > 0) \
-                    or piece.edge[i].shapeFea:
+            if np.size(piece.edge[i].shapeFea) > 0:
                 shapeFeaList.append(piece.edge[i].shapeFea)
             else:
                 if method == 'type':
@@ -170,7 +241,8 @@ class Edge(MatchDifferent):
             piece_B: A template instance saving a piece's info.
             method: We use some built-in functions in similaritymeasures
                     (pcm/frechet_dist/area_between_two_curves/curve_length_measure/dtw)
-                    or just the types of the edges.
+                    or just the types of the edges ('type'), or the precomputed side
+                    signatures ('signature', see compatibility).
 
         Returns:
             distance_shape: The shape distance between the two passed data.
@@ -206,7 +278,16 @@ class Edge(MatchDifferent):
         if type(piece_A) != type(piece_B):
             raise TypeError('Input should be of the same type.')
         else:
-            if isinstance(piece_A, Regular):
+            if isinstance(piece_A, Regular) and method == 'signature':
+
+                dist = self.compatibility([piece_A], [piece_B], mate=False)[0, 0]
+                colorFea_A = Edge.colorFeaExtract(piece_A)
+                colorFea_B = Edge.colorFeaExtract(piece_B)
+                for i in range(4):
+                    distance_shape.append(dist[i, i])
+                    distance_color.append(dis_color(colorFea_A[i], colorFea_B[i]))
+
+            elif isinstance(piece_A, Regular):
 
                 ret_A = self.process(piece_A, method=method)
                 ret_B = self.process(piece_B, method=method)
@@ -243,5 +324,170 @@ class Edge(MatchDifferent):
         else:
             return False
 
+
+#
+# ================================ EdgeIndex ================================
+#
+class EdgeIndex:
+    """!
+    @ingroup  Puzzle_Tracking
+    @brief  Index of Regular pieces by the in/out/flat types of their four sides.
+
+    A piece's type signature is the tuple of its side types in cyclic order around
+    the piece (LEFT, TOP, RIGHT, BOTTOM).  Every piece is entered under the four
+    cyclic rotations of its signature, so that the pieces fitting a given pattern,
+    or having the same sides as another piece up to rotation, are a dictionary
+    lookup away instead of a pairwise scan.  Rotation r means r quarter turns
+    clockwise: the side at cyclic position p moves to position p + r.
+    """
+
+    CYCLE = (EdgeDirection.LEFT.value, EdgeDirection.TOP.value,
+             EdgeDirection.RIGHT.value, EdgeDirection.BOTTOM.value)
+
+    TYPES = tuple(etype.value for etype in EdgeType)
+
+    COMPLEMENT = {EdgeType.IN.value: EdgeType.OUT.value, EdgeType.OUT.value: EdgeType.IN.value}
+
+    def __init__(self, pieces=None):
+        """
+        @brief  Constructor for the edge type index.
+
+        Args:
+            pieces: A dict of Regular pieces (e.g., board.pieces) to index, if given.
+        """
+
+        self.signatures = {}    # @< Piece key -> type signature (cyclic order).
+        self.table = {}         # @< Rotated signature -> list of (piece key, rotation).
+
+        if pieces is not None:
+            self.update(pieces)
+
+    @staticmethod
+    def signature(piece):
+        """
+        @brief  The side types of a Regular piece in cyclic order.
+
+        Args:
+            piece: A Regular piece.
+
+        Returns:
+            sig: A tuple of 4 EdgeType values.
+        """
+
+        return tuple(int(getattr(piece.edge[i].etype, 'value', piece.edge[i].etype))
+                     for i in EdgeIndex.CYCLE)
+
+    @staticmethod
+    def rotate(sig, r):
+        """
+        @brief  The signature of a piece turned by r quarter turns clockwise.
+        """
+
+        r = r % 4
+        return tuple(sig[-r:] + sig[:-r]) if r else tuple(sig)
+
+    def add(self, key, piece):
+        """
+        @brief  Add (or replace) a piece.
+
+        Args:
+            key: The piece key (e.g., its board key).
+            piece: A Regular piece.
+        """
+
+        if key in self.signatures:
+            self.remove(key)
+
+        sig = EdgeIndex.signature(piece)
+        self.signatures[key] = sig
+        for r in range(4):
+            self.table.setdefault(EdgeIndex.rotate(sig, r), []).append((key, r))
+
+    def remove(self, key):
+        """
+        @brief  Remove a piece, if indexed.
+        """
+
+        sig = self.signatures.pop(key, None)
+        if sig is None:
+            return
+
+        for r in range(4):
+            rotSig = EdgeIndex.rotate(sig, r)
+            entries = [entry for entry in self.table[rotSig] if entry[0] != key]
+            if entries:
+                self.table[rotSig] = entries
+            else:
+                del self.table[rotSig]
+
+    def update(self, pieces):
+        """
+        @brief  Add all the pieces of a dict (e.g., board.pieces).
+        """
+
+        for key, piece in pieces.items():
+            self.add(key, piece)
+
+    def lookup(self, pattern):
+        """
+        @brief  Pieces fitting a side type pattern.
+
+        Args:
+            pattern: Tuple of 4 EdgeType values in cyclic order, None for any type.
+
+        Returns:
+            matches: List of (piece key, rotation) making the piece fit the pattern.
+        """
+
+        free = [p for p, etype in enumerate(pattern) if etype is None]
+        if not free:
+            return list(self.table.get(tuple(pattern), []))
+
+        matches = []
+        sig = list(pattern)
+        for etypes in np.ndindex(*(len(EdgeIndex.TYPES),) * len(free)):
+            for p, t in zip(free, etypes):
+                sig[p] = EdgeIndex.TYPES[t]
+            matches += self.table.get(tuple(sig), [])
+
+        return matches
+
+    def similar(self, piece):
+        """
+        @brief  Pieces with the same side types as a piece, up to rotation.
+
+        Args:
+            piece: A Regular piece.
+
+        Returns:
+            matches: List of (piece key, rotation) turning the indexed piece into
+                     the given one.
+        """
+
+        return list(self.table.get(EdgeIndex.signature(piece), []))
+
+    def mates(self, piece, direction):
+        """
+        @brief  Pieces that can interlock with a side of a piece.
+
+        Args:
+            piece: A Regular piece.
+            direction: The EdgeDirection (or its value) of the side.
+
+        Returns:
+            matches: List of (piece key, rotation) such that, once rotated, the
+                     piece has the complementary side facing the given one.
+        """
+
+        direction = getattr(direction, 'value', direction)
+        etype = EdgeIndex.COMPLEMENT.get(
+                    int(getattr(piece.edge[direction].etype, 'value', piece.edge[direction].etype)))
+        if etype is None:
+            return []
+
+        pattern = [None] * 4
+        pattern[(EdgeIndex.CYCLE.index(direction) + 2) % 4] = etype
+        return self.lookup(pattern)
+
 #
 # ================================ puzzle.piece.edge ================================
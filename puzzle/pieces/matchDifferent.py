@@ -30,6 +30,7 @@ import math
 from puzzle.pieces.matcher import MatchDifferent
 from puzzle.pieces.matcher import CfgDifferent
 from puzzle.piece import Template
+from puzzle.utils.shapeProcessing import moment_frame
 
 
 
@@ -472,8 +473,8 @@ class PCA(MatchDifferent):
     @param[out]  The rotation of the main vector.
     """
     if issubclass(type(piece), Template):
-      yfeature = PCA.getEig(piece.y.contour)
-      theta = np.arctan2(yfeature['v1'][1], yfeature['v1'][0])
+      # The piece keeps its moment frame, no need to recompute it.
+      theta = np.deg2rad(piece.orientation())
 
       return theta
     else:
@@ -513,19 +514,18 @@ class PCA(MatchDifferent):
     y, x = np.nonzero(img)
     x = x - np.mean(x)
     y = y - np.mean(y)
-    coords = np.vstack([x, y])
-    cov = np.cov(coords)
-    evals, evecs = np.linalg.eig(cov)
-    sort_indices = np.argsort(evals)[::-1]
-    v1 = evecs[:, sort_indices[0]]  # Eigenvector with largest eigenvalue
-    v2 = evecs[:, sort_indices[1]]
+
+    # Axes in closed form from the image moments.
+    _, axes = moment_frame(img)
+    if axes is None:
+      axes = np.eye(2)
 
     dict = {
-            'x': x,
-            'y': y,
-            'v1': v1,
-            'v2': v2,
-        }
+      'x': x,
+      'y': y,
+      'v1': axes[:, 0],
+      'v2': axes[:, 1],
+    }
 
     return dict
 
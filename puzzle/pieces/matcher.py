@@ -122,42 +122,22 @@ class Matcher:
 
         @return ``(center, frame)`` where ``center`` is the global pixel centroid
                 and ``frame`` is a 2x2 right-handed rotation matrix whose first
-                column is the major PCA axis.
+                column is the major PCA axis.  The major axis direction is fixed
+                by the shape's third moment, or by its dominant coordinate when
+                that moment is symmetric.
         """
         if not isinstance(piece, Template):
             raise TypeError("piece must be a puzzle.piece.Template instance.")
 
-        local_points = np.asarray(piece.y.rcoords, dtype=np.float64).T
-        if local_points.ndim != 2 or local_points.shape[1] != 2 or len(local_points) < 3:
+        if np.size(piece.y.rcoords) < 6:
             raise ValueError("piece must contain at least three foreground pixel coordinates.")
 
-        points       = local_points + np.asarray(piece.rLoc, dtype=np.float64)
-        center       = points.mean(axis=0)
-        centered     = points - center
-        covariance   = centered.T @ centered / len(centered)
-        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
-
-        if eigenvalues[-1] <= np.finfo(float).eps:
+        # Closed form from the mask moments, computed once per piece (see moment_frame).
+        center, frame = piece.pcaFrame()
+        if frame is None:
             raise ValueError("Cannot estimate a PCA frame from a degenerate puzzle piece.")
 
-        major_axis = eigenvectors[:, np.argmax(eigenvalues)]
-
-        # Eigenvectors are sign-ambiguous.  Give the major axis a repeatable
-        # direction using the shape's third moment; fall back to its dominant
-        # coordinate for shapes whose third moment is symmetric.  Perfectly
-        # symmetric shapes retain an unavoidable 180-degree ambiguity.
-        projections = centered @ major_axis
-        skewness = float(np.mean(projections ** 3))
-        if abs(skewness) > np.finfo(float).eps:
-            if skewness < 0:
-                major_axis *= -1
-        else:
-            dominant_coordinate = int(np.argmax(np.abs(major_axis)))
-            if major_axis[dominant_coordinate] < 0:
-                major_axis *= -1
-
-        minor_axis = np.array([-major_axis[1], major_axis[0]])
-        return center, np.column_stack((major_axis, minor_axis))
+        return center, frame
 
     #========================= estimateAffineMatch ======================
     #
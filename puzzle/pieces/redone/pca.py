@@ -18,6 +18,7 @@ import numpy as np
 
 from puzzle.piece.matchDifferent import MatchDifferent
 from puzzle.piece.template import Template
+from puzzle.utils.shapeProcessing import moment_frame
 
 
 #
@@ -88,18 +89,17 @@ class PCA(MatchDifferent):
         y, x = np.nonzero(img)
         x = x - np.mean(x)
         y = y - np.mean(y)
-        coords = np.vstack([x, y])
-        cov = np.cov(coords)
-        evals, evecs = np.linalg.eig(cov)
-        sort_indices = np.argsort(evals)[::-1]
-        v1 = evecs[:, sort_indices[0]]  # Eigenvector with largest eigenvalue
-        v2 = evecs[:, sort_indices[1]]
+
+        # Axes in closed form from the image moments.
+        _, axes = moment_frame(img)
+        if axes is None:
+            axes = np.eye(2)
 
         dict = {
             'x': x,
             'y': y,
-            'v1': v1,
-            'v2': v2,
+            'v1': axes[:, 0],
+            'v2': axes[:, 1],
         }
 
         return dict
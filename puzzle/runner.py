@@ -36,7 +36,7 @@ from puzzle.clusters.byColor import ByColor, ParamColorCluster
 from puzzle.manager import Manager, ManagerParms
 from puzzle.utils.dataProcessing import closestNumber, kmeans_id_2d, agglomerativeclustering_id_2d
 from puzzle.utils.imageProcessing import preprocess_real_puzzle
-from puzzle.utils.puzzleProcessing import calibrate_real_puzzle
+from puzzle.utils.puzzleProcessing import FrameDiffCalibrator
 from puzzle.solver.simple import Simple
 from puzzle.simulator.planner import Planner, ParamPlanner
 
@@ -63,6 +63,7 @@ class ParamRunner(ParamPlanner):
     solution_area: np.array = np.array([0,0,0,0])
     solution_area_center: np.array = np.array([0,0])
     solution_area_size: float = 0.0
+    tileSize: int = None # Tile size for the multi-threaded mask preprocessing (None: full frame)
 
     # Params for clustering (currently all for byColor)
     cluster_mode: str = 'number' # 'number' or 'threshold'
@@ -92,8 +93,8 @@ class RealSolver:
         self.bClusterImage = None
 
         # Mainly for calibration of the solution board
-        self.theCalibrated = Board()
-        self.thePrevImage = None
+        self.theCalibrator = FrameDiffCalibrator(self.params, tileSize=self.params.tileSize)
+        self.theCalibrated = self.theCalibrator.theCalibrated
 
         # Clustering
         self.theClusterBoard = None
@@ -113,7 +114,9 @@ class RealSolver:
 
         # Only work when hand is not present
         if hTracker_BEV is None:
-            self.thePrevImage, self.theCalibrated = calibrate_real_puzzle(theImageMea, self.thePrevImage, self.theCalibrated, params=self.params, option=option)
+            # Full frame (process() may have restricted it to the solution area).
+            self.theCalibrator.setROI(None)
+            self.theCalibrator.process(theImageMea, option=option, verbose=verbose)
 
     def setSolBoard(self, img_input, input=None):
         """
@@ -324,9 +327,6 @@ class RealSolver:
         # We will adopt the frame difference idea in the solution area to get the pieces later, here we crop the solution area out first
         mask_working = np.ones(theImageMea.shape[:2],dtype='uint8')
         mask_working[self.params.solution_area[1]:self.params.solution_area[3], self.params.solution_area[0]:self.params.solution_area[2]] = 0
-        mask_solution = 1 - mask_working
-
-        theImageMea_solutionArea = cv2.bitwise_and(theImageMea, theImageMea, mask=mask_solution)
 
         theImageMea_work = cv2.bitwise_and(theImageMea, theImageMea, mask=mask_working)
 
@@ -335,7 +335,7 @@ class RealSolver:
         theMaskMea_work = preprocess_real_puzzle(theImageMea_work, areaThresholdLower=self.params.areaThresholdLower,
                                                 areaThresholdUpper=self.params.areaThresholdUpper,
                                             BoudingboxThresh=self.params.BoudingboxThresh, WITH_AREA_THRESH=True,
-                                            verbose=False)
+                                            verbose=False, tileSize=self.params.tileSize)
 
         # Create an Interlocking instance.
         theInterMea_work = Interlocking.buildFrom_ImageAndMask(theImageMea_work, theMaskMea_work, self.params)
@@ -346,9 +346,9 @@ class RealSolver:
         if hTracker_BEV is None or \
                 np.linalg.norm(hTracker_BEV.reshape(2, -1) - self.params.solution_area_center.reshape(2, -1)) > self.params.hand_radius + self.params.solution_area_size + 50:
 
-            self.thePrevImage, self.theCalibrated = calibrate_real_puzzle(theImageMea_solutionArea, self.thePrevImage, self.theCalibrated,
-                                                                       params=self.params,
-                                                                       option=0, verbose=verbose)
+            # The calibrator only works on the solution area crop and keeps its own background.
+            self.theCalibrator.setROI(self.params.solution_area)
+            self.theCalibrator.process(theImageMea, option=0, verbose=verbose)
 
             # Combination of the pieces from the solution area and other working area
             # In fact we usually have only one piece added here (frame difference idea)
@@ -361,6 +361,7 @@ class RealSolver:
         if verbose:
             print("Showing the debug info of the puzzle solver before the planning. Press any key on the last window to continue...")
             cv2.imshow("The work space measured pieces", theImageMea_work[:,:,::-1])
+            theImageMea_solutionArea = cv2.bitwise_and(theImageMea, theImageMea, mask=1 - mask_working)
             cv2.imshow("The solution space measured pieces", theImageMea_solutionArea[:,:,::-1])
             cv2.imshow("The work space puzzle mask", theMaskMea_work)
             cv2.imshow("The work space board", theInterMea_work_img[:,:,::-1])
@@ -385,6 +386,33 @@ class RealSolver:
         # Return action plan
         return plan
 
+    def snapshot(self, plan):
+        """
+        @brief Capture the outputs of the last process call that are meant for publication.
+               The history lists are shallow-copied so that the next process call can keep
+               appending to them while the snapshot is being serialized elsewhere.
+
+        Args:
+            plan: The action plan returned by process.
+
+        Returns:
+            info: A dict of the plan, progress, histories and rendered board images.
+        """
+
+        info = {
+            'plan': plan,
+            'solution_board_size': self.theManager.solution.size(),
+            'progress': self.progress(USE_MEASURED=False),  # Use the tracked board
+            'cluster_score': self.clusterScore() if self.theClusterBoard is not None else None,
+            'status_history': {k: list(v) for k, v in self.thePlanner.status_history.items()},
+            'loc_history': {k: list(v) for k, v in self.thePlanner.loc_history.items()},
+            'bMeasImage': self.bMeasImage,
+            'bTrackImage': self.bTrackImage,
+            'bTrackImage_SolID': self.bTrackImage_SolID,
+        }
+
+        return info
+
     def getMeaBoard(self):
         return self.meaBoard
     
@@ -0,0 +1,266 @@
+#!/usr/bin/python3
+# ============================= puzzle.runnerAsync =============================
+#
+# @package    puzzle.runnerAsync
+#
+# @brief    An asyncio front end for RealSolver and RealSolverROS.
+#
+#           Frames are awaited as they arrive, the solver stage runs on its own
+#           worker thread, and publication runs concurrently on a second worker
+#           thread.  A slow publication never holds up the next frame: if a
+#           publication is still in flight when a new result is ready, the
+#           newer result replaces any result that was waiting to be published.
+#
+# ============================= puzzle.runnerAsync =============================
+#
+# @file     runnerAsync.py
+#
+# ============================= puzzle.runnerAsync =============================
+
+
+# ==[0] Prep environment
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import time
+
+
+# ===== Helper Elements
+#
+
+@dataclass
+class ParamRunnerAsync:
+    frame_queue_size: int = 1       # @< Frames waiting to be processed. Oldest is dropped when full.
+    run_solver: bool = True         # @< Passed on to RealSolver.process.
+    planOnTrack: bool = False       # @< Passed on to RealSolver.process.
+
+
+class LocalPublisher:
+    """
+    @brief  Stand-in for the ROS publishers of RealSolverROS.  Keeps the last snapshot
+            and can emulate a slow publication with a fixed delay.
+    """
+
+    def __init__(self, delay=0.0):
+        """
+        @brief  Constructor.
+
+        Args:
+            delay: Time (in seconds) each publication takes.
+        """
+
+        self.delay = delay
+        self.last = None
+        self.count = 0
+
+    def publish(self, info):
+        """
+        @brief  Publish a snapshot (see RealSolver.snapshot).
+
+        Args:
+            info: The snapshot to publish.
+        """
+
+        if self.delay > 0:
+            time.sleep(self.delay)
+
+        self.last = info
+        self.count += 1
+
+
+class RealSolverAsync:
+    """
+    @brief  Asyncio driver wrapping a RealSolver (or RealSolverROS) instance.
+
+    The solver itself is not thread-safe, so all calls into it run on one dedicated
+    worker thread.  The publisher is any callable accepting a snapshot; when not given
+    it defaults to RealSolverROS.publish_ROS if the solver has it.
+    """
+
+    def __init__(self, theSolver, publisher=None, theParams=ParamRunnerAsync()):
+        """
+        @brief  Constructor.
+
+        Args:
+            theSolver: A RealSolver or RealSolverROS instance.
+            publisher: Callable taking a snapshot dict. None means publish_ROS if available.
+            theParams: ParamRunnerAsync settings.
+        """
+
+        self.solver = theSolver
+        self.params = theParams
+
+        if publisher is None and hasattr(theSolver, 'publish_ROS'):
+            publisher = theSolver.publish_ROS
+        self.publisher = publisher
+
+        self.plan = []
+
+        self._solveExec = ThreadPoolExecutor(max_workers=1, thread_name_prefix='puzzleSolve')
+        self._pubExec = ThreadPoolExecutor(max_workers=1, thread_name_prefix='puzzlePublish')
+
+        self._loop = None
+        self._frames = None
+        self._pending = None            # @< Latest snapshot waiting for publication.
+        self._pubTask = None            # @< Publication task, if one is in flight.
+        self._stopRequested = False
+
+        # Counters, mainly for debug
+        self.nProcessed = 0
+        self.nPublished = 0
+        self.nDropped = 0               # @< Frames or snapshots replaced before being used.
+
+    def _bind(self):
+        """
+        @brief  Bind to the running event loop and create the frame queue on first use.
+        """
+
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._frames = asyncio.Queue(maxsize=self.params.frame_queue_size)
+
+    def _enqueue(self, frame):
+        """
+        @brief  Put a frame into the queue, dropping the oldest one when full.
+        """
+
+        if self._frames.full():
+            self._frames.get_nowait()
+            self.nDropped += 1
+        self._frames.put_nowait(frame)
+
+    async def put(self, theImageMea, visibleMask, hTracker_BEV):
+        """
+        @brief  Hand a new frame to the driver (from a coroutine).
+
+        Args:
+            theImageMea: The input image (from the surveillance system).
+            visibleMask: The mask image of the visible area (no hand/robot).
+            hTracker_BEV: The location of the hand in the BEV.
+        """
+
+        self._bind()
+        self._enqueue((theImageMea, visibleMask, hTracker_BEV))
+
+    def submit(self, theImageMea, visibleMask, hTracker_BEV):
+        """
+        @brief  Hand a new frame to the driver from another thread (e.g., a ROS callback).
+                Requires run to have been started.
+        """
+
+        assert self._loop is not None, 'The driver is not running yet.'
+        self._loop.call_soon_threadsafe(self._enqueue, (theImageMea, visibleMask, hTracker_BEV))
+
+    def stop(self):
+        """
+        @brief  Ask run to return once the frames already queued are processed.
+                Safe to call from another thread.
+        """
+
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._requestStop)
+
+    def _requestStop(self):
+        """
+        @brief  Flag the stop and wake up run if it is waiting on an empty queue.
+        """
+
+        self._stopRequested = True
+        if self._frames.empty():
+            self._frames.put_nowait(None)
+
+    def _solve(self, frame):
+        """
+        @brief  Solver stage. Runs on the solver worker thread.
+        """
+
+        theImageMea, visibleMask, hTracker_BEV = frame
+        plan = self.solver.process(theImageMea, visibleMask, hTracker_BEV,
+                                   run_solver=self.params.run_solver,
+                                   planOnTrack=self.params.planOnTrack)
+
+        # Snapshot on the same thread, before the next frame can alter solver state.
+        info = self.solver.snapshot(plan) if self.publisher is not None else None
+
+        return plan, info
+
+    async def process(self, theImageMea, visibleMask, hTracker_BEV):
+        """
+        @brief  Process a single frame and schedule its publication without waiting for it.
+
+        Args:
+            theImageMea: The input image (from the surveillance system).
+            visibleMask: The mask image of the visible area (no hand/robot).
+            hTracker_BEV: The location of the hand in the BEV.
+
+        Returns:
+            plan: The action plan.
+        """
+
+        self._bind()
+        plan, info = await self._loop.run_in_executor(self._solveExec, self._solve,
+                                                      (theImageMea, visibleMask, hTracker_BEV))
+        self.plan = plan
+        self.nProcessed += 1
+
+        if info is not None:
+            self._schedulePublish(info)
+
+        return plan
+
+    def _schedulePublish(self, info):
+        """
+        @brief  Queue a snapshot for publication.  Only the latest snapshot is kept.
+        """
+
+        if self._pending is not None:
+            self.nDropped += 1
+        self._pending = info
+
+        if self._pubTask is None or self._pubTask.done():
+            self._pubTask = self._loop.create_task(self._publishLoop())
+
+    async def _publishLoop(self):
+        """
+        @brief  Publish pending snapshots until none is left.
+        """
+
+        while self._pending is not None:
+            info = self._pending
+            self._pending = None
+            await self._loop.run_in_executor(self._pubExec, self.publisher, info)
+            self.nPublished += 1
+
+    async def run(self):
+        """
+        @brief  Process frames as they arrive until stop is called.
+        """
+
+        self._bind()
+        self._stopRequested = False
+        while not (self._stopRequested and self._frames.empty()):
+            frame = await self._frames.get()
+            if frame is None:
+                continue
+            await self.process(*frame)
+
+        await self.flush()
+
+    async def flush(self):
+        """
+        @brief  Wait for the publication in flight (if any) to complete.
+        """
+
+        if self._pubTask is not None:
+            await self._pubTask
+
+    def shutdown(self):
+        """
+        @brief  Release the worker threads.
+        """
+
+        self._solveExec.shutdown(wait=True)
+        self._pubExec.shutdown(wait=True)
+
+#
+# ========================== puzzle.runnerAsync =========================
@@ -97,14 +97,21 @@ class RealSolverROS(RealSolver):
         # ROS support
         self.publish_ROS()
 
-    def publish_ROS(self):
+    def publish_ROS(self, info=None):
         """
         @brief Publish the ROS message for the runner.
+
+        Args:
+            info: A snapshot from RealSolver.snapshot. If None, the current state is captured.
+                  Passing a snapshot lets the publication run off the processing thread.
         """
 
+        if info is None:
+            info = self.snapshot(self.plan)
+
         # Have to process the saved information first for json
         plan_processed = []
-        for command in self.plan:
+        for command in info['plan']:
             if command:
                 plan_processed.append([command[0], command[1], command[2], command[3].tolist()])
             else:
@@ -113,7 +120,7 @@ class RealSolverROS(RealSolver):
         # status_history  e.g., k: [PieceStatus(Enum), PieceStatus(Enum), ...]
         status_history_processed = {}
         status_pulse_processed = {}
-        for k, v in self.thePlanner.status_history.items():
+        for k, v in info['status_history'].items():
             status_history_processed[k] = [x.value for x in v]
             if len(v) > 0:
                 status_pulse_processed[k] = v[-1].value
@@ -123,7 +130,7 @@ class RealSolverROS(RealSolver):
         # loc_history  e.g., k: [array([x1, y1]), array([x2, y2]), ...]
         loc_history_processed = {}
         loc_pulse_processed = {}
-        for k, v in self.thePlanner.loc_history.items():
+        for k, v in info['loc_history'].items():
             loc_history_processed[k] = [x.tolist() for x in v]
             if len(v) > 0:
                 loc_pulse_processed[k] = v[-1].tolist()
@@ -133,9 +140,9 @@ class RealSolverROS(RealSolver):
         # Wrap the board into a dictionary
         info_dict ={
             'plan': plan_processed,
-            'solution_board_size': self.theManager.solution.size(),
-            'progress': self.progress(USE_MEASURED=False), # Use the tracked board
-            'cluster_score': self.clusterScore(),
+            'solution_board_size': info['solution_board_size'],
+            'progress': info['progress'],
+            'cluster_score': info['cluster_score'],
         }
 
         # Publish the messages
@@ -148,9 +155,9 @@ class RealSolverROS(RealSolver):
         self.loc_pulse_pub.publish(convert_dict2ROS(loc_pulse_processed))
 
         # Publish the board images (mainly for demo for now)
-        self.bMeasImage_pub.pub(self.bMeasImage)
-        self.bTrackImage_pub.pub(self.bTrackImage)
-        self.bTrackImage_SolID_pub.pub(self.bTrackImage_SolID)
+        self.bMeasImage_pub.pub(info['bMeasImage'])
+        self.bTrackImage_pub.pub(info['bTrackImage'])
+        self.bTrackImage_SolID_pub.pub(info['bTrackImage_SolID'])
 
 #
 # ========================== puzzle.runnerROS =========================
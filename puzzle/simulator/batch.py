@@ -0,0 +1,180 @@
+# ========================= puzzle.simulator.batch ========================
+#
+# @brief    Monte Carlo runs of the headless simulator.
+#           Independent episodes (random seeds, planners, occlusion settings)
+#           are spread over a process pool and their statistics gathered
+#           into columns, one entry per episode.
+#
+# ========================= puzzle.simulator.batch ========================
+#
+# @file     batch.py
+#
+# ========================= puzzle.simulator.batch ========================
+
+import contextlib
+import io
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from functools import partial
+
+import numpy as np
+
+# ========================= puzzle.simulator.batch ========================
+
+@dataclass
+class EpisodeSpec:
+    seed: int = 0  # @< Seed of the python and numpy generators (e.g., for Gridded.shuffle).
+    planner: str = 'default'  # @< Planner label, interpreted by the episode builder.
+    occlusion: bool = True  # @< Hand occlusion setting, interpreted by the episode builder.
+
+
+def runEpisode(builder, spec, verbose=False):
+    """
+    @brief  Build and run a single episode.
+
+    The generators are seeded before calling the builder so that the random
+    puzzle it creates only depends on the spec. Exceptions are caught and
+    reported in the 'error' entry so that one bad episode does not stop a batch.
+
+    Args:
+        builder: Callable taking the spec and returning a SimHeadless instance.
+                 Has to be picklable (module level) when running in a pool.
+        spec: An EpisodeSpec (or a dataclass extending it).
+        verbose: Keep the printouts of the planners and the hand or not.
+
+    Returns:
+        result: A dict of the spec fields and the episode statistics.
+    """
+
+    random.seed(spec.seed)
+    np.random.seed(spec.seed)
+
+    result = asdict(spec)
+    result['error'] = ''
+
+    tStart = time.time()
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        try:
+            theSim = builder(spec)
+            result.update(theSim.run())
+        except Exception as e:
+            result['error'] = f'{type(e).__name__}: {e}'
+    result['wall_time'] = time.time() - tStart
+
+    return result
+
+
+def toColumns(results):
+    """
+    @brief  Turn a list of per-episode dicts into columns.
+
+    Missing entries (e.g., statistics of a failed episode) are filled with nan
+    for numeric columns and with an empty string otherwise.
+
+    Args:
+        results: List of dicts.
+
+    Returns:
+        columns: Dict of column name -> np.ndarray.
+    """
+
+    keys = []
+    for result in results:
+        keys += [key for key in result if key not in keys]
+
+    columns = {}
+    for key in keys:
+        values = [result.get(key) for result in results]
+        known = [value for value in values if value is not None]
+        if all(isinstance(value, (bool, np.bool_)) for value in known) and len(known) == len(values):
+            columns[key] = np.array(values, dtype=bool)
+        elif all(isinstance(value, (int, float, np.number)) for value in known):
+            columns[key] = np.array([np.nan if value is None else value for value in values], dtype=float)
+        else:
+            columns[key] = np.array(['' if value is None else str(value) for value in values])
+
+    return columns
+
+
+def saveResults(fileName, columns):
+    """
+    @brief  Save the columns into a npz file.
+
+    Args:
+        fileName: The file name.
+        columns: Dict of column name -> np.ndarray.
+    """
+
+    np.savez_compressed(fileName, **columns)
+
+
+def loadResults(fileName):
+    """
+    @brief  Load the columns saved by saveResults.
+
+    Args:
+        fileName: The file name.
+
+    Returns:
+        columns: Dict of column name -> np.ndarray.
+    """
+
+    with np.load(fileName) as data:
+        return {key: data[key] for key in data.files}
+
+
+def runBatch(builder, specs, workers=None, fileName=None, chunksize=1, verbose=False):
+    """
+    @brief  Run the episodes over a process pool.
+
+    Args:
+        builder: Callable taking a spec and returning a SimHeadless instance (picklable).
+        specs: List of EpisodeSpec.
+        workers: Number of processes. None uses all the cores, 1 (or less) runs in-process.
+        fileName: Where to save the results (npz). None does not save.
+        chunksize: Episodes sent to a worker at a time.
+        verbose: Keep the printouts of the episodes or not.
+
+    Returns:
+        columns: Dict of column name -> np.ndarray, one entry per spec (same order).
+    """
+
+    theRun = partial(runEpisode, builder, verbose=verbose)
+
+    if workers is not None and workers <= 1:
+        results = [theRun(spec) for spec in specs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(theRun, specs, chunksize=chunksize))
+
+    columns = toColumns(results)
+
+    if fileName is not None:
+        saveResults(fileName, columns)
+
+    return columns
+
+
+def buildSpecs(seeds, planners=('default',), occlusions=(True,), theSpec=EpisodeSpec):
+    """
+    @brief  All the combinations of the given seeds, planners and occlusion settings.
+
+    Args:
+        seeds: Iterable of seeds.
+        planners: Iterable of planner labels.
+        occlusions: Iterable of occlusion settings.
+        theSpec: The spec dataclass to build.
+
+    Returns:
+        specs: List of specs.
+    """
+
+    return [theSpec(seed=seed, planner=planner, occlusion=occlusion)
+            for planner in planners for occlusion in occlusions for seed in seeds]
+
+#
+# ========================= puzzle.simulator.batch ========================
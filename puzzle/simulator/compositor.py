@@ -0,0 +1,125 @@
+# ======================= puzzle.simulator.compositor ======================
+#
+# @class    puzzle.simulator.compositor
+#
+# @brief    Dirty-rectangle compositing of the simulator frames.
+#           The board without the moving sprites is rendered once into a
+#           static layer.  Each frame only the rectangles covered by the
+#           moving sprites (hand, arm) in the previous frame are restored
+#           from the static layer before the sprites are drawn again.
+#
+# ======================= puzzle.simulator.compositor ======================
+#
+# @file     compositor.py
+#
+# ======================= puzzle.simulator.compositor ======================
+
+import numpy as np
+
+from puzzle.board import Board
+
+# ======================= puzzle.simulator.compositor ======================
+
+class Compositor:
+
+    def __init__(self):
+        """
+        @brief  Compositor keeping a static layer and the frame built on it.
+        """
+
+        self.static = None  # @< The static layer (board only).
+        self.frame = None   # @< The composed frame, reused between frames.
+        self.key = None     # @< Key of the board state the static layer was rendered from.
+        self.dirty = []     # @< Rectangles (x0, y0, x1, y1) drawn over the static layer.
+
+    @staticmethod
+    def boardKey(theBoard, *options):
+        """
+        @brief  A key that changes when pieces are added, removed, moved or have
+                their source data replaced.  Compare keys with sameKey.
+
+        Args:
+            theBoard: The puzzle board.
+            options: Render options that also affect the static layer.
+
+        Returns:
+            key: The key (options, sources, locations).
+        """
+
+        pieces = list(theBoard.pieces.values())
+        rLocs = tuple(tuple(np.asarray(piece.rLoc).reshape(-1).tolist()) for piece in pieces)
+
+        return (options, Board.renderSources(pieces), rLocs)
+
+    @staticmethod
+    def sameKey(keyA, keyB):
+        """
+        @brief  Whether two board keys are of the same board state.
+
+        The sources are compared by identity, see Board.sameSources.
+        """
+
+        if keyA is None or keyB is None:
+            return False
+
+        return keyA[0] == keyB[0] and keyA[2] == keyB[2] and Board.sameSources(keyA[1], keyB[1])
+
+    def setStatic(self, theImage, key=None):
+        """
+        @brief  Set a newly rendered static layer.
+
+        Args:
+            theImage: The static layer image.
+            key: The board key it was rendered from.
+        """
+
+        self.static = theImage
+        self.frame = theImage.copy()
+        self.key = key
+        self.dirty = []
+
+    def update(self, theBoard, render, *options):
+        """
+        @brief  Re-render the static layer if the board changed since the last render.
+
+        Args:
+            theBoard: The puzzle board.
+            render: Callable returning the static layer image.
+            options: Render options that also affect the static layer.
+
+        Returns:
+            changed: Whether the static layer was re-rendered.
+        """
+
+        key = Compositor.boardKey(theBoard, *options)
+        if self.static is not None and Compositor.sameKey(key, self.key):
+            return False
+
+        self.setStatic(render(), key)
+        return True
+
+    def compose(self, draw):
+        """
+        @brief  Compose a frame: restore the previous dirty rectangles, then draw.
+
+        Args:
+            draw: Callable drawing the moving sprites into the given image in place,
+                  returning the rectangles (x0, y0, x1, y1) it wrote to (None: unknown).
+
+        Returns:
+            frame: The composed frame. It is reused by the next compose call.
+        """
+
+        for x0, y0, x1, y1 in self.dirty:
+            self.frame[y0:y1, x0:x1] = self.static[y0:y1, x0:x1]
+
+        rects = draw(self.frame)
+        if rects is None:
+            # Unknown extent, restore everything next time.
+            rects = [(0, 0, self.frame.shape[1], self.frame.shape[0])]
+        self.dirty = list(rects)
+
+        return self.frame
+
+#
+# ======================= puzzle.simulator.compositor ======================
@@ -56,10 +56,10 @@ class Hand:
             targetLoc = param
             offset = False
 
-        self.app.setPlacement(targetLoc, offset=offset)
+        self.app.setPlacement(targetLoc, isOffset=offset)
 
         if self.cache_piece is not None:
-            self.cache_piece.setPlacement(targetLoc, offset=offset)
+            self.cache_piece.setPlacement(targetLoc, isOffset=offset)
 
         return (True, None)
 
@@ -181,135 +181,57 @@ class Hand:
         """
         @brief  Insert the hand into the image in the original location.
 
+        The hand and the arm are clipped to the image and written in place, only
+        within the rectangles they cover.
+
         Args:
             img: The source image to put puzzle piece into.
             offset: The offset list.
+
+        Returns:
+            rects: The image rectangles (x0, y0, x1, y1) written to.
         """
 
         # Note that tl & br are for hand not arm
+        H, W = img.shape[:2]
 
         # Top left corner
-        tl = np.array(offset) + self.app.rLoc
+        tl = (np.array(offset) + self.app.rLoc).astype(int)
 
         # Bottom right corner
-        br = np.array([self.app.y.image.shape[1] + tl[0], self.app.y.image.shape[0] + tl[1]])
-
-        # Todo: We assume the hand cannot pass the top border
-
-        # The enlarged (x,y)
-        enlarge = [0, 0]
-        if br[1] > img.shape[0]:
-            enlarge[1] = br[1] - img.shape[0]
-        elif tl[1] < 0:
-            enlarge[1] = tl[1]
-
-        # The hand has a small width so it can not cover the whole image width
-        if br[0] > img.shape[1]:
-            enlarge[0] = br[0] - img.shape[1]
-        elif tl[0] < 0:
-            enlarge[0] = tl[0]
-
-
-        img_enlarged = np.zeros((img.shape[0] + abs(enlarge[1]), img.shape[1] + abs(enlarge[0]), 3),
-                                     dtype='uint8')
-
-        rcoords = np.array(offset).reshape(-1, 1) + self.app.rLoc.reshape(-1, 1) + self.app.y.rcoords
+        br = np.array([self.app.y.imshape[1] + tl[0], self.app.y.imshape[0] + tl[1]])
 
-        if enlarge[0] >= 0 and enlarge[1] >= 0:
-            # Bottom right region
+        rects = []
 
-            img_enlarged[:img.shape[0], :img.shape[1], :] = img
-            img_enlarged[rcoords[1], rcoords[0], :] = self.app.y.appear
+        # Hand pixels, clipped to the image.
+        rcoords = tl.reshape(-1, 1) + self.app.y.rcoords
+        inside = (rcoords[0] >= 0) & (rcoords[0] < W) & (rcoords[1] >= 0) & (rcoords[1] < H)
+        img[rcoords[1, inside], rcoords[0, inside], :] = self.app.y.appear[inside]
 
-            if self.arm_image is not None and self.arm_image is not None and img_enlarged.shape[0] > br[1]:
-                set_height = img_enlarged.shape[0] - br[1]
+        x0, y0 = max(tl[0], 0), max(tl[1], 0)
+        x1, y1 = min(br[0], W), min(br[1], H)
+        if x0 < x1 and y0 < y1:
+            rects.append((x0, y0, x1, y1))
 
-                self.arm_image = cv2.resize(self.arm_image,(self.arm_image.shape[1],set_height))
-                self.arm_mask = cv2.resize(self.arm_mask,(self.arm_mask.shape[1], set_height))
-
-                # Todo: The images are not perfectly aligned, have to be manually adjusted
-                left = int(br[0] / 2 + tl[0] / 2 - self.arm_image.shape[1] / 2)-11
-                img_enlarged[br[1]:img_enlarged.shape[0],left:left+self.arm_image.shape[1],:] = self.arm_image
-
-                # Todo: Need double-check
-                # tl, br
-                self.arm_region = [ (min(left, img.shape[1]), min(br[1], img.shape[0])),(min(left+self.arm_image.shape[1], img.shape[1]), img.shape[0])]
-
-            img[:, :, :] = img_enlarged[:img.shape[0], :img.shape[1], :]
-
-        elif enlarge[0] < 0 and enlarge[1] >= 0:
-            # Bottom left region
-
-            img_enlarged[:img.shape[0], abs(enlarge[0]):img.shape[1] + abs(enlarge[0]), :] = img
-            img_enlarged[rcoords[1], rcoords[0] + abs(enlarge[0]), :] = self.app.y.appear
-
-            if self.arm_image is not None and self.arm_image is not None and img_enlarged.shape[0] > br[1]:
-                set_height = img_enlarged.shape[0] - br[1]
+        # Arm from the bottom of the hand down to the bottom of the image.
+        if self.arm_image is not None and self.arm_mask is not None and br[1] < H:
+            set_height = H - br[1]
 
+            if self.arm_image.shape[0] != set_height:
                 self.arm_image = cv2.resize(self.arm_image, (self.arm_image.shape[1], set_height))
                 self.arm_mask = cv2.resize(self.arm_mask, (self.arm_mask.shape[1], set_height))
 
-                # Todo: The images are not perfectly aligned, have to be manually adjusted
-                left = int(br[0] / 2 + tl[0] / 2 - self.arm_image.shape[1] / 2) - 11 + abs(enlarge[0])
-                img_enlarged[br[1]:img_enlarged.shape[0], left:left + self.arm_image.shape[1], :] = self.arm_image
-
-                # Todo: Need double-check
-                # tl, br
-                self.arm_region = [(max(left-abs(enlarge[0]),0), min(br[1],img.shape[0])), (max(left+self.arm_image.shape[1]-abs(enlarge[0]), 0), img.shape[0])]
-
-            # cv2.imshow('debug',img_enlarged)
-            # cv2.waitKey()
-
-            img[:, :, :] = img_enlarged[:img.shape[0],
-                                abs(enlarge[0]):img.shape[1] + abs(enlarge[0]), :]
-
-        elif enlarge[0] >= 0 and enlarge[1] < 0:
-            # Top right region
-
-            img_enlarged[abs(enlarge[1]):img.shape[0] + abs(enlarge[1]), :img.shape[1], :] = img
-            img_enlarged[rcoords[1], rcoords[0], :] = self.app.y.appear
-            # Add arm image if it is needed
-            if self.arm_image is not None and self.arm_image is not None and img_enlarged.shape[0] > br[1]:
-                set_height = img_enlarged.shape[0] - br[1]
-
-                self.arm_image = cv2.resize(self.arm_image, (self.arm_image.shape[1], set_height))
-                self.arm_mask = cv2.resize(self.arm_mask, (self.arm_mask.shape[1], set_height))
-
-                # Todo: The images are not perfectly aligned, have to be manually adjusted
-                left = int(br[0] / 2 + tl[0] / 2 - self.arm_image.shape[1] / 2) - 11
-                img_enlarged[br[1]:img_enlarged.shape[0], left:left + self.arm_image.shape[1], :] = self.arm_image
-
-                # Todo: Need double-check
-                # tl, br
-                self.arm_region = [ (min(left, img.shape[1]), min(br[1]-abs(enlarge[1]), 0)),(min(left+self.arm_image.shape[1]-abs(enlarge[0]), 0), img.shape[0])]
-
-            img[:, :, :] = img_enlarged[abs(enlarge[1]):img.shape[0] + abs(enlarge[1]),
-                                :img.shape[1], :]
-        else:
-            # top left region
-
-            img_enlarged[abs(enlarge[1]):img.shape[0] + abs(enlarge[1]),
-            abs(enlarge[0]):img.shape[1] + abs(enlarge[0]), :] = img
-            img_enlarged[rcoords[1], rcoords[0], :] = self.app.y.appear
-            # Add arm image if it is needed
-            if self.arm_image is not None and self.arm_image is not None and img_enlarged.shape[0] > br[1]:
-                set_height = img_enlarged.shape[0] - br[1]
-
-                self.arm_image = cv2.resize(self.arm_image, (self.arm_image.shape[1], set_height))
-                self.arm_mask = cv2.resize(self.arm_mask, (self.arm_mask.shape[1], set_height))
-
-                # Todo: The images are not perfectly aligned, have to be manually adjusted
-                left = int(br[0] / 2 + tl[0] / 2 - self.arm_image.shape[1] / 2) - 11
-                img_enlarged[br[1]:img_enlarged.shape[0], left:left + self.arm_image.shape[1], :] = self.arm_image
-
-                # Todo: Need double-check
-                # tl, br
-                self.arm_region = [ (min(left-abs(enlarge[0]), 0), min(br[1]-abs(enlarge[1]), 0)),(min(left+self.arm_image.shape[1], img.shape[1]), img.shape[0])]
-
-            img[:, :, :] = img_enlarged[abs(enlarge[1]):img.shape[0] + abs(enlarge[1]),
-                                abs(enlarge[0]):img.shape[1] + abs(enlarge[0]), :]
+            # Todo: The images are not perfectly aligned, have to be manually adjusted
+            left = int(br[0] / 2 + tl[0] / 2 - self.arm_image.shape[1] / 2) - 11
 
+            x0, y0 = max(left, 0), max(br[1], 0)
+            x1 = min(left + self.arm_image.shape[1], W)
+            if x0 < x1:
+                img[y0:H, x0:x1, :] = self.arm_image[y0 - br[1]:, x0 - left:x1 - left]
+                rects.append((x0, y0, x1, H))
 
+            # tl, br
+            self.arm_region = [(min(x0, W), min(y0, H)), (max(x1, x0), H)]
 
         # # 0. pixel check too slow
         # rcoords = np.array(offset).reshape(-1, 1) + self.app.rLoc.reshape(-1, 1) + self.app.y.rcoords
@@ -335,6 +257,8 @@ class Hand:
         # outImage = outImage.astype('uint8')
         # img[:,:,:] = outImage[:,:,:]
 
+        return rects
+
 
     @staticmethod
     def buildSphereAgent(radius, color, rLoc=None):
@@ -146,7 +146,8 @@ class Planner:
                     meaBoard_filtered.addPiece(piece)
 
             # Yunzhi: with the new update, it does not matter much if it is simple Board instance or an Interlocking instance or more.
-            meaBoard = Interlocking(meaBoard_filtered)
+            # The adjacency is only computed if used.
+            meaBoard = Interlocking(meaBoard_filtered, lazy=True)
 
         # manager processes the measured board to establish the association
         # NOTE: it is now using the meaBoard to assemble the puzzle pieces
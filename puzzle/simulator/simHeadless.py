@@ -0,0 +1,199 @@
+# ========================= puzzle.simulator.simHeadless ========================
+#
+# @class    puzzle.simulator.SimHeadless
+#
+# @brief    The simulator without any display, meant for running many
+#           episodes quickly (see puzzle.simulator.batch).
+#           The hand jumps to its target in a single step and the elapsed
+#           time is accumulated analytically from the travelled distance,
+#           instead of stepping the movement by delta_t as SimTime does.
+#
+# ========================= puzzle.simulator.simHeadless ========================
+#
+# @file     simHeadless.py
+#
+# ========================= puzzle.simulator.simHeadless ========================
+
+import numpy as np
+from dataclasses import dataclass
+
+from puzzle.simulator.basic import Basic, ParamBasic
+
+
+@dataclass
+class ParamSimHeadless(ParamBasic):
+    speed: float = 100  # @< Unit: pixel/s. The speed of the agent movement.
+    static_duration: float = 0.1  # @< Unit: s. The duration of the static actions.
+    HAND_OCCLUSION: bool = True  # @< The flag of enabling hand occlusion or not (only if not shared).
+    COMPLETE_PLAN: bool = True  # @< Passed on to the hand planner.
+    max_actions: int = 1000  # @< Upper bound on the executed actions of an episode.
+
+class SimHeadless(Basic):
+    def __init__(self, thePuzzle, theHand, thePlannerHand, thePlanner=None, shareFlag=True,
+                 theParams=ParamSimHeadless()):
+        """
+        @brief  Headless simulator driving the hand with its planner until no action is left.
+
+        Args:
+            thePuzzle: The puzzle board.
+            theHand: The hand instance.
+            thePlannerHand: The planner for the hand.
+            thePlanner: The planner, only needed if the board is not shared.
+            shareFlag: Whether the planner shares the board with the simulator.
+            theParams: ParamSimHeadless settings.
+        """
+
+        if thePlanner is None:
+            thePlanner = thePlannerHand
+
+        super(SimHeadless, self).__init__(thePuzzle=thePuzzle, thePlanner=thePlanner, shareFlag=shareFlag,
+                                          theParams=theParams)
+
+        self.hand = theHand
+        self.plannerHand = thePlannerHand
+
+        self.stats = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        @brief  Reset the episode statistics.
+        """
+
+        self.stats = {'time': 0., 'distance': 0., 'moves': 0, 'picks': 0, 'places': 0, 'rotates': 0,
+                      'failures': 0, 'actions': 0, 'plans': 0, 'finished': False}
+
+    def _move(self, param):
+        """
+        @brief  Move the hand to the target location in one go.
+
+        Args:
+            param: The target location, or a tuple (offset, True) relative to the hand.
+
+        Returns:
+            opParam: The operation parameters.
+        """
+
+        if isinstance(param, tuple):
+            if param[1] is True:
+                targetLoc = np.array(param[0]) + self.hand.app.rLoc
+            else:
+                targetLoc = param[0]
+        else:
+            targetLoc = param
+
+        targetLoc = np.array(targetLoc).astype(int)
+
+        distance = float(np.linalg.norm(targetLoc - self.hand.app.rLoc))
+        self.stats['distance'] += distance
+        self.stats['time'] += distance / self.params.speed
+        self.stats['moves'] += 1
+
+        return self.hand.execute(self.puzzle, "move", targetLoc)
+
+    def _pause(self, action):
+        """
+        @brief  Execute a static action (pick, place, rotate, pause).
+
+        Args:
+            action: The input action.
+
+        Returns:
+            opParam: The operation parameters.
+        """
+
+        if self.shareFlag == False and action[0] == "pick":
+            action[1] = self.translateAction(self.plannerHand.manager.pAssignments, action[1])
+
+        opParam = self.hand.execute(self.puzzle, action[0], action[1])
+
+        self.stats['time'] += self.params.static_duration
+        if action[0] == "pick":
+            self.stats['picks'] += 1
+        elif action[0] == "place":
+            self.stats['places'] += 1
+        elif action[0] == "rotate":
+            self.stats['rotates'] += 1
+
+        # Same bookkeeping as SimTime.simulate_step_small
+        if action[0] == "place" and opParam[0] == True and not self.shareFlag:
+            temp = self.matchSimulator[opParam[1]]
+            del self.matchSimulator[opParam[1]]
+            self.matchSimulator[self.puzzle.id_count - 1] = temp
+
+        return opParam
+
+    def execute(self, action):
+        """
+        @brief  Execute a single hand action.
+
+        Args:
+            action: A list [action type, argument].
+        """
+
+        if action[0] == "move":
+            opParam = self._move(action[1])
+        else:
+            opParam = self._pause(action)
+
+        if opParam is not None and opParam[0] is False:
+            self.stats['failures'] += 1
+
+        self.stats['actions'] += 1
+
+    def observe(self):
+        """
+        @brief  What the hand planner gets to see.
+
+        The board itself when shared. Otherwise the board has to be rendered,
+        with the hand & arm masked out if HAND_OCCLUSION is set.
+
+        Returns:
+            The board or the rendered image.
+        """
+
+        if self.shareFlag == True:
+            return self.puzzle
+
+        theMask = None
+        if self.params.HAND_OCCLUSION == True:
+            theMask = np.zeros((self.canvas.shape[:2])).astype('bool')
+            theMask = self.hand.app.getMask(theMask)
+
+            if self.hand.arm_region is not None:
+                theMask[self.hand.arm_region[0][1]:self.hand.arm_region[1][1],
+                        self.hand.arm_region[0][0]:self.hand.arm_region[1][0]] = 1
+
+            theMask = np.invert(theMask)
+
+        return self.toImage(theImage=np.zeros_like(self.canvas), theMask=theMask, ID_DISPLAY=False,
+                            CONTOUR_DISPLAY=False, BOUNDING_BOX=False)
+
+    def run(self):
+        """
+        @brief  Plan and execute until the hand planner has nothing left to do
+                or max_actions is reached.
+
+        Returns:
+            stats: The episode statistics.
+        """
+
+        self.reset_stats()
+
+        while self.stats['actions'] < self.params.max_actions:
+            plan = self.plannerHand.process(self.observe(), self.hand, COMPLETE_PLAN=self.params.COMPLETE_PLAN)
+            self.stats['plans'] += 1
+
+            if len(plan) == 0 or plan[0] is None:
+                self.stats['finished'] = True
+                break
+
+            for action in plan:
+                if action is None or self.stats['actions'] >= self.params.max_actions:
+                    break
+                self.execute(action)
+
+        return self.stats
+
+#
+# ========================= puzzle.simulator.simHeadless ========================
@@ -3,9 +3,10 @@
 # @class    puzzle.simulator.SimTime
 #
 # @brief    The simulator that also simulates the time effect.
-#           Each simulation step will have a fixed time length,
-#           and the speed of the agent movement and the length
-#           of the agent's pause will be simulated.
+#           Each action gets an analytic completion time from the speed
+#           of the agent movement and the length of the agent's pause.
+#           Intermediate states are only produced for the displayed frames,
+#           one every delta_t, otherwise time jumps from event to event.
 #
 # ========================= puzzle.simulator.simTime ========================
 #
@@ -19,9 +20,7 @@
 #
 # ========================= puzzle.simulator.simTime ========================
 
-import math
 import sys
-from copy import deepcopy
 import cv2
 import matplotlib.pyplot as plt
 import numpy as np
@@ -35,7 +34,7 @@ from puzzle.utils.pygameProcessing import multiLineSurface
 
 @dataclass
 class ParamST(ParamSTL):
-    delta_t: float = 0.1  # @< Unit: s. The time length for a simulation step.
+    delta_t: float = 0.1  # @< Unit: s. The simulation time between two displayed frames.
     speed: float = 100  # @< Unit: pixel/s. The speed of the agent movement.
     static_duration: float = 0.1  # @< Unit: s. The duration of the static actions.
     FPS: int = 60  # @< Flash rate for the simulator.
@@ -66,7 +65,8 @@ class SimTime(SimTimeLess):
         super(SimTime, self).__init__(thePuzzle, theHand, thePlanner=thePlanner, thePlannerHand=thePlannerHand,
                                       theFig=theFig, shareFlag=shareFlag, theParams=theParams)
 
-        self.timer = self.params.static_duration  # The timer
+        self.sim_time = 0.  # @< Unit: s. The simulation clock.
+        self.event = None  # @< The action being executed, with its start & completion times.
 
         # Setting up FPS
         self.FPS = self.params.FPS
@@ -80,94 +80,77 @@ class SimTime(SimTimeLess):
 
         self.cluster_piece_dict = dict()
 
-    def _move_step(self, param):
+    def _start_event(self, action):
         """
-        @brief  Move a step given the target location.
-                Note that the target location might not be reachable within a step's time length.
-        Args:
-            param: The input params.
+        @brief  Start executing an action, which becomes the current event.
+                Its completion time is known analytically: distance / speed for
+                a move, static_duration for the static actions.
 
-        Returns:
-            finishFlag: Indicator of whether the target location has been reached
+        Args:
+            action: The input action.
         """
 
-        opParam = (False, None)
+        event = {'action': action, 't_start': self.sim_time, 'opParam': (False, None)}
 
-        # offset has been adjusted in advance
-        if isinstance(param, tuple):
-            targetLoc = param[0]
-        elif isinstance(param, list) or isinstance(param, np.ndarray):
-            targetLoc = param
+        if action[0] == "move":
+            param = action[1]
 
-        delta_x = targetLoc[0] - self.hand.app.rLoc[0]
-        delta_y = targetLoc[1] - self.hand.app.rLoc[1]
+            # offset has been adjusted in advance
+            if isinstance(param, tuple):
+                targetLoc = param[0]
+            elif isinstance(param, list) or isinstance(param, np.ndarray):
+                targetLoc = param
 
-        distance = math.sqrt(delta_x ** 2 + delta_y ** 2)
+            event['loc_start'] = np.array(self.hand.app.rLoc)
+            event['loc_end'] = np.array(targetLoc)
 
-        # determine where to end up
-        step_loc = np.array([-1, -1])
-        if distance >= self.params.delta_t * self.params.speed:
-            x_step = delta_x * (self.params.delta_t * self.params.speed) / distance
-            y_step = delta_y * (self.params.delta_t * self.params.speed) / distance
-            step_loc[0] = self.hand.app.rLoc[0] + x_step
-            step_loc[1] = self.hand.app.rLoc[1] + y_step
-            finishFlag = False
-        else:
-            step_loc[0] = targetLoc[0]
-            step_loc[1] = targetLoc[1]
-            finishFlag = True
-
-        # Todo: May update the bounds later. Could be slightly off.
-        # if step_loc[0] < 0 or step_loc[1] < 0 \
-        #         or step_loc[0] + self.hand.app.size()[0] >= self.canvas.shape[1] \
-        #         or step_loc[1] + self.hand.app.size()[1] >= self.canvas.shape[0]:
-        if step_loc[1] < 0:
-            print('Out of the bounds!')
-            finishFlag = True
+            distance = np.linalg.norm(event['loc_end'] - event['loc_start'])
+            event['t_end'] = self.sim_time + distance / self.params.speed
         else:
-            # Execute
-            opParam = self.hand.execute(self.puzzle, "move", step_loc)
+            # Static actions are executed first, then paused on
+            if self.shareFlag == False and action[0] == "pick":
+                piece_id = self.translateAction(self.plannerHand.manager.pAssignments, action[1])
+                action[1] = piece_id
+                event['opParam'] = self.hand.execute(self.puzzle, action[0], piece_id)
+            else:
+                event['opParam'] = self.hand.execute(self.puzzle, action[0], action[1])
 
-        # self.hand.execute(self.puzzle, "move", step_loc)
+            event['t_end'] = self.sim_time + self.params.static_duration
 
-        return finishFlag, opParam
+        self.event = event
 
-    def _pause_step(self, action):
+    def _advance(self, t):
         """
-        @brief Create the simulation for the pause action.
+        @brief  Advance the current event to the time t (capped at its completion).
+                For a move, the hand is placed at its interpolated location once.
 
         Args:
-            action: The input action.
+            t: The simulation time to advance to.
 
         Returns:
-            finishFlag: The flag of finish.
+            finishFlag: Whether the event has completed.
             opParam: The operation parameters.
         """
 
-        # Have to be pick or place for now
-        assert action[0] != "move"
+        event = self.event
 
-        opParam = (False, None)
+        self.sim_time = min(t, event['t_end'])
+        finishFlag = self.sim_time >= event['t_end']
 
-        # If have not been executed, then execute first before pause there
-        if abs(self.timer - self.params.static_duration) < 1e-04:
-            if self.shareFlag == False and action[0] == "pick":
-                piece_id = self.translateAction(self.plannerHand.manager.pAssignments, action[1])
-                action[1] = piece_id
-                opParam = self.hand.execute(self.puzzle, action[0], piece_id)
-            else:
-                opParam = self.hand.execute(self.puzzle, action[0], action[1])
+        if event['action'][0] == "move":
+            duration = event['t_end'] - event['t_start']
+            ratio = 1. if finishFlag or duration <= 0 else (self.sim_time - event['t_start']) / duration
 
-        # Continue to run the timer
-        self.timer -= self.params.delta_t
+            step_loc = (event['loc_start'] + ratio * (event['loc_end'] - event['loc_start'])).astype(int)
 
-        # If timer is below zero, then it is up!
-        if self.timer < 0:
-            finishFlag = True
-        else:
-            finishFlag = False
+            # Todo: May update the bounds later. Could be slightly off.
+            if step_loc[1] < 0:
+                print('Out of the bounds!')
+                finishFlag = True
+            else:
+                event['opParam'] = self.hand.execute(self.puzzle, "move", step_loc)
 
-        return finishFlag, opParam
+        return finishFlag, event['opParam']
 
     def reset_cache(self):
         """
@@ -175,7 +158,7 @@ class SimTime(SimTimeLess):
         """
 
         self.cache_action = []
-        self.timer = self.params.static_duration
+        self.event = None
 
     def simulate_step(self, robot_only=False, ID_DISPLAY=True, CONTOUR_DISPLAY=True):
         """
@@ -187,21 +170,24 @@ class SimTime(SimTimeLess):
             CONTOUR_DISPLAY: Display the contours of the puzzle pieces or not.
         """
 
-        cache_image = self.puzzle.toImage(theImage=np.zeros_like(self.canvas), ID_DISPLAY=ID_DISPLAY,
-                                          BOUNDING_BOX=False)
+        def render():
+            return self.puzzle.toImage(theImage=np.zeros_like(self.canvas), ID_DISPLAY=ID_DISPLAY,
+                                       BOUNDING_BOX=False)
+
+        self.compositor.update(self.puzzle, render, ID_DISPLAY)
 
         while 1:
 
             # Only related to the hand movement
-            finish_flag = self.simulate_step_small()
+            finish_flag = self.simulate_step_small(self.params.delta_t)
 
             if finish_flag is not None or robot_only:
-                if finish_flag is True or robot_only:
-                    cache_image = self.puzzle.toImage(theImage=np.zeros_like(self.canvas), ID_DISPLAY=ID_DISPLAY,
-                                                      BOUNDING_BOX=False)
+                # Re-rendered only if a piece was picked, placed or moved.
+                self.compositor.update(self.puzzle, render, ID_DISPLAY)
 
-                theImage = deepcopy(cache_image)
-                self.hand.placeInImage(theImage, CONTOUR_DISPLAY=CONTOUR_DISPLAY)
+                # Only the hand/arm rectangles of the last frame get redrawn.
+                theImage = self.compositor.compose(
+                    lambda img: self.hand.placeInImage(img, CONTOUR_DISPLAY=CONTOUR_DISPLAY))
 
                 # pygame APIs to update the figure
                 theImage_demo = cv2.resize(theImage, (0, 0), fx=self.params.fx, fy=self.params.fy)
@@ -343,35 +329,43 @@ class SimTime(SimTimeLess):
 
             print(self.cluster_piece_dict)
 
-    def simulate_step_small(self):
+    def simulate_step_small(self, dt=None):
         """
-        Overwrite the simulate_step function
+        @brief  Advance the first cached action.
+
+        Args:
+            dt: Time to advance by (e.g., delta_t for a displayed frame).
+                None jumps straight to the completion of the action.
+
+        Returns:
+            finishFlag: Whether the action has completed, None if there is no cached action.
         """
 
-        if len(self.cache_action) > 0:
+        if len(self.cache_action) == 0:
+            return None
+
+        if self.event is None:
             action = self.cache_action[0]
 
-            if action[0] == "move":
+            if action[0] == "move" and isinstance(action[1], tuple) and action[1][1] is True:
+                # We have to recompute & reset the action for offset case
+                self.cache_action[0][1] = action[1][0] + self.hand.app.rLoc
 
-                if isinstance(action[1], tuple) and action[1][1] is True:
-                    # We have to recompute & reset the action for offset case
-                    self.cache_action[0][1] = action[1][0] + self.hand.app.rLoc
-                    action = self.cache_action[0]
+            self._start_event(self.cache_action[0])
 
-                finishFlag, opParam = self._move_step(action[1])
-            else:
-                finishFlag, opParam = self._pause_step(action)
-        else:
-            return None
+        action = self.event['action']
 
-        # If the cached action is finishFlag, reset the cache and the timer
-        if finishFlag:  # < Whether the current cached action has been finishFlag
+        t = self.event['t_end'] if dt is None else self.sim_time + dt
+        finishFlag, opParam = self._advance(t)
+
+        # If the cached action is finished, move on to the next one
+        if finishFlag:
             self.cache_action.pop(0)
-            self.reset_cache()
+            self.event = None
 
-        # Todo: Maybe too slow, have to be updated later
-        # finishFlag is only about the animation, opParam is about the implementation
-        if action[0] == "place" and opParam[0] == True and not self.shareFlag:
+        # finishFlag is only about the animation, opParam is about the implementation.
+        # The static actions are executed when starting, so opParam is checked once.
+        if action[0] == "place" and opParam[0] == True and not self.shareFlag and finishFlag:
             # Update self.matchSimulator
 
             # Remove the old association
@@ -384,6 +378,20 @@ class SimTime(SimTimeLess):
 
         return finishFlag
 
+    def fast_forward(self):
+        """
+        @brief  Execute all the cached actions without display, jumping from
+                one completion time to the next.
+
+        Returns:
+            sim_time: The simulation time once done.
+        """
+
+        while self.simulate_step_small() is not None:
+            pass
+
+        return self.sim_time
+
     def display(self, ID_DISPLAY=True, CONTOUR_DISPLAY=True):
         """
         @brief  Displays the current puzzle board.
@@ -19,12 +19,12 @@
 # ========================= puzzle.simulator.simTimeless ========================
 
 import sys
-from copy import deepcopy
 from dataclasses import dataclass
 import matplotlib.pyplot as plt
 import numpy as np
 
 from puzzle.simulator.basic import Basic, ParamBasic
+from puzzle.simulator.compositor import Compositor
 
 
 @dataclass
@@ -77,6 +77,9 @@ class SimTimeLess(Basic):
         # For display
         self.im = None
 
+        # Static board layer plus the hand on top, see Compositor.
+        self.compositor = Compositor()
+
     def simulate_step(self, ID_DISPLAY=True, CONTOUR_DISPLAY=True):
         """
         @brief Create the simulation.
@@ -112,11 +115,14 @@ class SimTimeLess(Basic):
             else:
                 self.hand.execute(self.puzzle, action[0], action[1])
 
-        cache_image = self.puzzle.toImage(theImage=np.zeros_like(self.canvas), ID_DISPLAY=ID_DISPLAY,
-                                          BOUNDING_BOX=False)
+        # The board is only re-rendered when it changed, the hand is composited on top.
+        self.compositor.update(self.puzzle,
+                               lambda: self.puzzle.toImage(theImage=np.zeros_like(self.canvas),
+                                                           ID_DISPLAY=ID_DISPLAY, BOUNDING_BOX=False),
+                               ID_DISPLAY)
 
-        theImage = deepcopy(cache_image)
-        self.hand.placeInImage(theImage, CONTOUR_DISPLAY=CONTOUR_DISPLAY)
+        theImage = self.compositor.compose(
+            lambda img: self.hand.placeInImage(img, CONTOUR_DISPLAY=CONTOUR_DISPLAY))
         plt.pause(0.001)
 
         self.im.set_data(theImage)
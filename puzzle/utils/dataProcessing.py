@@ -215,11 +215,48 @@ def partition_even(data_list, partition_num, order="ascend"):
     # get the partition data and labels
     part_results = np.array(np.split(data_sort, partition_num))
     labels = np.zeros_like(data_list, dtype=int)
-    for i in range(labels_sort.size):
-        labels[idx_sort[i]] = labels_sort[i] 
+    labels[idx_sort] = labels_sort
 
     return labels, part_results
 
+def partition_gap(data_list, spacing=None, gap_ratio=0.5, min_gap=0.):
+    """Partition a list of numbers into groups separated by large gaps, e.g., the
+    corner coordinates of the pieces of a grid into rows (or columns).
+    e.g. data = [4, 11, 14, 3, 32, 35] -> labels = [0, 0, 0, 0, 1, 1]
+
+    The values are sorted and a new group starts wherever two consecutive values
+    are further apart than gap_ratio times the spacing between groups.  When not
+    given, the spacing is estimated as the median of the gaps larger than half of
+    the largest one, which is robust to the jitter within a group as long as that
+    jitter stays below the spacing.  Gaps up to min_gap never separate groups (this
+    keeps a single group with jitter from being split).  O(N log N).
+
+    Args:
+        data_list ((N, )):              The list of data
+        spacing (float):                The expected spacing between groups (None: estimated)
+        gap_ratio (float):              Fraction of the spacing above which a gap separates groups
+        min_gap (float):                Gaps up to this value never separate groups
+    Returns:
+        labels ((N, )):                 The group labels, in ascending order of the values
+        num (int):                      The number of groups
+    """
+    data_list = np.array(data_list, dtype=float).reshape(-1)
+    if data_list.size == 0:
+        return np.zeros(0, dtype=int), 0
+
+    idx_sort = np.argsort(data_list, kind='stable')
+    gaps = np.diff(data_list[idx_sort])
+
+    if spacing is None:
+        big = gaps[gaps > min_gap]
+        spacing = np.median(big[big > 0.5 * big.max()]) if big.size > 0 else np.inf
+
+    labels_sort = np.concatenate(([0], np.cumsum(gaps > max(gap_ratio * spacing, min_gap))))
+    labels = np.empty(data_list.size, dtype=int)
+    labels[idx_sort] = labels_sort
+
+    return labels, int(labels_sort[-1]) + 1
+
 def kmeans_id_2d(dict_id_2d, kmeans_num):
     """
     @brief  Kmeans clustering for a dict of id: 2D data.
@@ -17,12 +17,16 @@
 #============================== Dependencies =============================
 
 import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import improcessor.basic as improcessor
 import numpy as np
 
 from scipy.ndimage import rotate as rotate_image
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 
 from puzzle.utils.shapeProcessing import bb_intersection_over_union
 
@@ -100,6 +104,71 @@ def rotate_nd(image, angle, mask=None):
 
     
 
+#============================= rotate_sparse =============================
+#
+def rotate_sparse(rcoords, appear, size, angle):
+    """!
+    @brief Rotate a sparse sprite (pixel coordinates and their colors).
+
+    Same geometry as rotate_nd (rotation about the image center, output grid of
+    the enlarged image), but only the pixels of the sprite's rotated bounding box
+    are visited.  Each is inverse mapped to the source and nearest-neighbor
+    sampled, so no padded dense image is created and the cost scales with the
+    piece area.  The output is cropped tight to the rotated sprite.
+
+    @param[in]   rcoords    Sprite pixel coordinates, 2 (x;y) x N.
+    @param[in]   appear     Sprite pixel colors, N x C.
+    @param[in]   size       Source image size (width, height).
+    @param[in]   angle      Rotation angle (in degrees).
+
+    @return      rcoords    Rotated pixel coordinates in the tight box, 2 (x;y) x M.
+    @return      appear     Rotated pixel colors, M x C.
+    @return      mask       Tight binary mask of the rotated sprite.
+    """
+
+    width, height = int(size[0]), int(size[1])
+
+    theta = np.deg2rad(angle)
+    c, s = np.cos(theta), np.sin(theta)
+    rot = np.array([[c, s], [-s, c]])          # Source (x,y) to output (x,y).
+
+    # Output grid of the enlarged image, as scipy.ndimage.rotate computes it.
+    corners = rot @ np.array([[0, width, 0, width], [0, 0, height, height]])
+    outSize = (np.ptp(corners, axis=1) + 0.5).astype(int)
+    inCenter = (np.array([width, height]) - 1) / 2
+    outCenter = (outSize - 1) / 2
+
+    # Lookup of the sprite pixel index at each source location (-1 if none).
+    index = np.full((height, width), -1, dtype=np.int64)
+    index[rcoords[1], rcoords[0]] = np.arange(rcoords.shape[1])
+
+    # Output box covering the forward mapped sprite pixels, with a pixel of margin.
+    fwd = rot @ (rcoords - inCenter.reshape(2, 1)) + outCenter.reshape(2, 1)
+    lo = np.floor(fwd.min(axis=1)).astype(int) - 1
+    hi = np.ceil(fwd.max(axis=1)).astype(int) + 1
+
+    gx, gy = np.meshgrid(np.arange(lo[0], hi[0] + 1), np.arange(lo[1], hi[1] + 1))
+    outPts = np.vstack((gx.ravel(), gy.ravel()))
+
+    # Inverse map (rot is orthonormal) and sample the nearest source pixel.
+    src = np.rint(rot.T @ (outPts - outCenter.reshape(2, 1)) + inCenter.reshape(2, 1)).astype(int)
+    inside = (src[0] >= 0) & (src[0] < width) & (src[1] >= 0) & (src[1] < height)
+
+    hit = np.zeros(outPts.shape[1], dtype=np.int64) - 1
+    hit[inside] = index[src[1, inside], src[0, inside]]
+    keep = hit >= 0
+
+    if not np.any(keep):
+        return np.zeros((2, 0), dtype=int), appear[:0], np.zeros((0, 0), dtype=bool)
+
+    outPts = outPts[:, keep]
+    outPts = outPts - outPts.min(axis=1, keepdims=True)
+
+    mask = np.zeros((outPts[1].max() + 1, outPts[0].max() + 1), dtype=bool)
+    mask[outPts[1], outPts[0]] = True
+
+    return outPts, appear[hit[keep]], mask
+
 #=============================== rotate_im ===============================
 #
 def rotate_im(image, angle, mask=None):
@@ -253,7 +322,8 @@ def extract_region(img, verbose=False):
 def preprocess_real_puzzle(img, mask=None, areaThresholdLower=1000, 
                                            areaThresholdUpper=8000, \
                            BoudingboxThresh = (30,80), cannyThresh=(30, 60), \
-                           WITH_AREA_THRESH=False ,verbose=False, ret_thresh_mask = False):
+                           WITH_AREA_THRESH=False ,verbose=False, ret_thresh_mask = False,
+                           tileSize=None, numWorkers=None):
     """!
     @brief Preprocess the RGB image of a segmented puzzle piece in a circle
             area to obtain a mask.  Note that the threshold is very
@@ -277,10 +347,18 @@ def preprocess_real_puzzle(img, mask=None, areaThresholdLower=1000,
     @param[in] WITH_AREA_THRESH     Mainly for previous codes which have not
                                     set the BoudingboxThresh properly.
     @param[in] verbose  Debug verbosity lag.
+    @param[in] tileSize     If given, process in square tiles of this size on a thread
+                            pool.  See preprocess_real_puzzle_tiled.
+    @param[in] numWorkers   Thread count for the tiled version (default: CPU count).
 
     @return seg_img_combined    The mask region list.
     """
 
+    if tileSize is not None and not verbose:
+        return preprocess_real_puzzle_tiled(img, mask, cannyThresh=cannyThresh,
+                                            tileSize=tileSize, numWorkers=numWorkers,
+                                            ret_thresh_mask=ret_thresh_mask)
+
     # Manually add a black bounding box on the edges,
     # Otherwise, the region connected to the border will be removed
     # Create dilation kernel. Then ready to rock and roll.
@@ -388,6 +466,170 @@ def preprocess_real_puzzle(img, mask=None, areaThresholdLower=1000,
         return im_floodfill
 
 
+#====================== preprocess_real_puzzle_tiled =====================
+#
+
+## Halo (in pixels) around each tile.  Covers Canny (2), the closings (2 and 4)
+#  and the 3-iteration mask dilation (3), with ample margin for the hysteresis step.
+TILE_HALO = 32
+
+def _tile_grid(shape, tileSize):
+    """!
+    @brief  Split an image extent into non-overlapping tiles.
+
+    @param[in]  shape       Image shape (rows, cols, ...).
+    @param[in]  tileSize    Tile side length.
+
+    @return     tiles       List of (y0, y1, x0, x1) tile extents.
+    """
+
+    rows = range(0, shape[0], tileSize)
+    cols = range(0, shape[1], tileSize)
+    return [(y0, min(y0 + tileSize, shape[0]), x0, min(x0 + tileSize, shape[1]))
+            for y0 in rows for x0 in cols]
+
+def _real_puzzle_edges(img, mask, cannyThresh, out, outMask, tile, halo):
+    """!
+    @brief  Tile worker for preprocess_real_puzzle_tiled.  Runs the local operations of
+            preprocess_real_puzzle (threshold mask, Canny, closings) on a tile plus halo
+            and writes the tile core into the output arrays.
+    """
+
+    y0, y1, x0, x1 = tile
+    hy0, hy1 = max(y0 - halo, 0), min(y1 + halo, img.shape[0])
+    hx0, hx1 = max(x0 - halo, 0), min(x1 + halo, img.shape[1])
+
+    kernel = np.ones((3, 3), np.uint8)
+    gray = cv2.cvtColor(img[hy0:hy1, hx0:hx1], cv2.COLOR_BGR2GRAY)
+
+    if mask is None:
+        _, tMask = cv2.threshold(gray, 50, 255, cv2.THRESH_BINARY)
+        tMask = cv2.dilate(tMask, kernel, iterations=3)
+    else:
+        tMask = mask[hy0:hy1, hx0:hx1]
+
+    # Single closing here: in the serial improcessor chain the trailing 2 lands in the
+    # dst slot of morphologyEx, so only one iteration is applied there.
+    edges = cv2.Canny(gray, cannyThresh[0], cannyThresh[1], None, 3, True)
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
+    edges = np.logical_and(edges, tMask).astype('uint8')
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel, iterations=2)
+
+    out[y0:y1, x0:x1] = edges[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0]
+    outMask[y0:y1, x0:x1] = tMask[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0] > 0
+
+def _tile_components(free, labels, tile):
+    """!
+    @brief  Tile worker labeling the 4-connected free (non-edge) regions of a tile.
+
+    @return nLabels     Number of labels in the tile (background label 0 included).
+    """
+
+    y0, y1, x0, x1 = tile
+    nLabels, labels[y0:y1, x0:x1] = cv2.connectedComponents(free[y0:y1, x0:x1],
+                                                            connectivity=4, ltype=cv2.CV_32S)
+    return nLabels
+
+def fill_holes_tiled(edges, tiles, pool):
+    """!
+    @brief  Fill the regions enclosed by a binary edge map, i.e., everything not reachable
+            from pixel (0,0) through non-edge pixels.  Same outcome as a flood fill from
+            (0,0), but computed as per-tile connected components stitched along the seams.
+
+    @param[in]  edges   Binary edge map (uint8, non-zero = edge).
+    @param[in]  tiles   Tile extents from _tile_grid.
+    @param[in]  pool    Executor to run the tile labeling on.
+
+    @return     filled  Boolean mask of edges plus enclosed regions.
+    """
+
+    if edges[0, 0]:
+        # Flood fill would start on an edge pixel. Rare, so defer to it directly.
+        filled = edges.copy()
+        cv2.floodFill(filled, None, (0, 0), 255)
+        return filled < 255
+
+    free = (edges == 0).astype('uint8')
+    labels = np.empty(edges.shape, dtype=np.int32)
+    counts = list(pool.map(lambda t: _tile_components(free, labels, t), tiles))
+
+    # Make tile labels globally unique (label 0 stays 0 = edge pixel).
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    for tile, offset in zip(tiles, offsets[:-1]):
+        y0, y1, x0, x1 = tile
+        core = labels[y0:y1, x0:x1]
+        np.add(core, offset, out=core, where=core > 0)
+
+    # Link labels of free pixels facing each other across the tile seams.
+    seamA, seamB = [], []
+    for cut in np.unique([t[2] for t in tiles])[1:]:
+        seamA.append(labels[:, cut - 1])
+        seamB.append(labels[:, cut])
+    for cut in np.unique([t[0] for t in tiles])[1:]:
+        seamA.append(labels[cut - 1, :])
+        seamB.append(labels[cut, :])
+
+    nTotal = int(offsets[-1])
+    if seamA:
+        seamA = np.concatenate(seamA)
+        seamB = np.concatenate(seamB)
+        linked = (seamA > 0) & (seamB > 0)
+        seamA, seamB = seamA[linked], seamB[linked]
+    else:
+        seamA = seamB = np.zeros(0, dtype=np.int32)
+
+    graph = coo_matrix((np.ones(seamA.size, dtype=np.uint8), (seamA, seamB)),
+                       shape=(nTotal, nTotal))
+    _, group = connected_components(graph, directed=False)
+
+    return group[labels] != group[labels[0, 0]]
+
+def preprocess_real_puzzle_tiled(img, mask=None, cannyThresh=(30, 60), tileSize=512,
+                                 numWorkers=None, ret_thresh_mask=False):
+    """!
+    @brief  Tiled, multi-threaded version of preprocess_real_puzzle.
+
+    The local operations run per tile with a halo of TILE_HALO pixels on a thread pool
+    (OpenCV releases the GIL).  The flood fill is replaced by a connected component
+    hole fill stitched across tile seams, see fill_holes_tiled.  Canny hysteresis is the
+    only non-local step; weak edge chains longer than the halo that cross a tile seam
+    may differ from the full-frame outcome.
+
+    @param[in] img              RGB image input.
+    @param[in] mask             Mask image input.
+    @param[in] cannyThresh      Threshold for canny.
+    @param[in] tileSize         Tile side length (pixels).
+    @param[in] numWorkers       Thread count (default: CPU count).
+    @param[in] ret_thresh_mask  Return the threshold mask instead of the final one.
+
+    @return im_floodfill    Binary mask of the puzzle pieces.
+    """
+
+    img_black_border = np.zeros_like(img, 'uint8')
+    img_black_border[2:-2,2:-2,:] = img[2:-2,2:-2,:]
+
+    if mask is not None:
+        mask = mask.astype('uint8')
+
+    tiles = _tile_grid(img.shape, tileSize)
+    edges = np.empty(img.shape[:2], dtype='uint8')
+    tMask = np.empty(img.shape[:2], dtype=bool)
+
+    with ThreadPoolExecutor(max_workers=numWorkers or os.cpu_count()) as pool:
+        list(pool.map(lambda t: _real_puzzle_edges(img_black_border, mask, cannyThresh,
+                                                   edges, tMask, t, TILE_HALO), tiles))
+
+        if ret_thresh_mask:
+            return tMask
+
+        im_floodfill = fill_holes_tiled(edges, tiles, pool)
+
+    #   Dilate by a little to get boundary neighbors that may be useful. Binarize.
+    im_floodfill = cv2.dilate(im_floodfill.astype('uint8'), np.ones((3, 3), np.uint8))
+
+    return im_floodfill > 0
+
+
 #====================== preprocess_synthetic_puzzle ======================
 #
 def preprocess_synthetic_puzzle(img, mask=None, areaThresholdLower=1000, 
@@ -571,5 +813,125 @@ def find_nonzero_mask(mask):
 
     return rcoords
 
+#=============================== grasp_point =============================
+#
+def grasp_point(mask, kernel=10):
+    """!
+    @brief Most interior point of a mask where a gripper footprint fits.
+
+    The footprint coverage is a box filter (integral image) for a square
+    footprint, or a correlation with the given footprint shape.  Among the
+    points with the best coverage, the one farthest from the mask boundary
+    (distance transform) is picked, and remaining ties go to the point closest
+    to the mask image center.
+
+    @param[in]  mask    Binary mask image.
+    @param[in]  kernel  Square footprint size, or a binary footprint image.
+
+    @return     loc     Grasp location (row, col) in mask coordinates.
+    """
+
+    mask = (np.asarray(mask) > 0).astype(np.float32)
+
+    if np.isscalar(kernel):
+        coverage = cv2.boxFilter(mask, -1, (int(kernel), int(kernel)), normalize=False,
+                                 borderType=cv2.BORDER_CONSTANT)
+    else:
+        footprint = (np.asarray(kernel) > 0).astype(np.float32)
+        coverage = cv2.filter2D(mask, -1, footprint, borderType=cv2.BORDER_CONSTANT)
+
+    # Rounding absorbs the float summation error of the filters.
+    coverage = np.rint(coverage)
+    best = coverage == coverage.max()
+
+    # Zero padded, so that the image border counts as outside of the mask.
+    dist = cv2.distanceTransform(np.pad(mask, 1).astype(np.uint8), cv2.DIST_L2, 5)[1:-1, 1:-1]
+    dist = np.where(best, dist, -1)
+    candidates = np.argwhere(dist == dist.max())
+
+    center = np.array([mask.shape[0] / 2, mask.shape[1] / 2])
+    return candidates[np.argmin(np.linalg.norm(candidates - center, axis=1))]
+
+#============================== mask2regions =============================
+#
+def mask2regions(I, M, areaThresholdLower=20, areaThresholdUpper=float('inf'),
+                 removeBlack=True, darkThresh=50, iouThresh=0.5):
+    """!
+    @brief Convert a selection mask into a list of regions, based on connected
+           components.
+
+    Replaces the contour based extraction.  The mask is labeled once; hole filling,
+    the area test, the dark region test and the IoU de-duplication are all done within
+    each region's bounding box, so the cost no longer grows with regions x frame size.
+    Regions enclosing two or more holes (e.g., a frame around other pieces) are dropped,
+    unless nothing else is left.
+
+    @param[in]  I                   RGB image.
+    @param[in]  M                   Mask image.
+    @param[in]  areaThresholdLower  Regions with a (hole filled) area below are dropped.
+    @param[in]  areaThresholdUpper  Regions with a bounding box area above are dropped.
+    @param[in]  removeBlack         Drop regions with no pixel brighter than darkThresh.
+    @param[in]  darkThresh          Gray level for the dark region check.
+    @param[in]  iouThresh           Regions whose bounding box overlaps an earlier one by
+                                    more than this IoU are dropped.
+
+    @return     regions             List of regions (mask, segmented image, location in
+                                    source image, bounding box [x0, y0, x1, y1]).
+    """
+
+    mask = (np.asarray(M) > 0).astype('uint8')
+    nLabels, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8,
+                                                                 ltype=cv2.CV_32S)
+
+    candidates = []
+    enclosures = []
+    for i in range(1, nLabels):
+        x, y, w, h = (int(v) for v in stats[i, :4])
+
+        # The filled area is at most w*h, so these tests need no pixel work.
+        if w * h <= areaThresholdLower or w * h > areaThresholdUpper:
+            continue
+
+        # Fill the holes on a 1 pixel padded copy of the ROI.
+        padded = np.zeros((h + 2, w + 2), np.uint8)
+        padded[1:-1, 1:-1] = labels[y:y + h, x:x + w] == i
+        inv = 1 - padded
+
+        # Labels of the inverted ROI: 0 is the region itself, 1 the outside, rest holes.
+        nBack, _ = cv2.connectedComponents(inv, connectivity=4)
+
+        cv2.floodFill(inv, None, (0, 0), 0)
+        seg = ((padded | inv)[1:-1, 1:-1] * 255).astype('uint8')
+
+        if cv2.countNonZero(seg) <= areaThresholdLower:
+            continue
+
+        if nBack - 2 >= 2:
+            enclosures.append((seg, x, y, w, h))
+        else:
+            candidates.append((seg, x, y, w, h))
+
+    if len(candidates) == 0:
+        candidates = enclosures
+
+    regions = []
+    for seg, x, y, w, h in candidates:
+        theImage = I[y:y + h, x:x + w, :]
+
+        # Todo: A tricky solution to skip regions of all black, which is for our real scene
+        if removeBlack:
+            roi = theImage if theImage.dtype == np.uint8 else theImage.astype('float32')
+            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+            if not np.any(gray[seg > 0] > darkThresh):
+                continue
+
+        bbox = [x, y, x + w, y + h]
+        if any(bb_intersection_over_union(region[3], bbox) > iouThresh for region in regions):
+            continue
+
+        regions.append((seg, theImage, [x, y], bbox))
+
+    return regions
+
 #
 # ====================== puzzle.utils.imageProcessing ======================
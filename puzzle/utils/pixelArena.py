@@ -0,0 +1,242 @@
+#========================= puzzle.utils.pixelArena ========================
+# @file     pixelArena.py
+# @brief    A contiguous store of the pixels of all the pieces of a board.
+#
+# The coordinates and appearances of every piece are concatenated into one
+# coordinate buffer and one appearance buffer, with an offsets table giving
+# where each piece starts.  Pieces can be bound to views into the buffers,
+# the buffers can be placed in shared memory and attached to by another
+# process, and the whole arena pickles as a handful of arrays.
+#
+#========================= puzzle.utils.pixelArena ========================
+#
+# NOTE
+#   100 columns viewing. 4 space indent.
+#
+#========================= puzzle.utils.pixelArena ========================
+
+#============================== Dependencies =============================
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+#=============================== PixelArena ==============================
+#
+class PixelArena:
+    """!
+    @brief  Board-level pixel buffers with per-piece views.
+
+    Arrays:
+        keys        (P,)    Board keys of the pieces.
+        offsets     (P+1,)  Start of each piece in coords/appear (last entry = total).
+        coords      (2, N)  Piece relative pixel coordinates (x;y), int32.
+        appear      (N, C)  Pixel appearances.
+        rLocs       (P, 2)  Placement of each piece.
+        imshapes    (P, 2)  Template image height, width of each piece.
+    """
+
+    _fields = ('keys', 'offsets', 'coords', 'appear', 'rLocs', 'imshapes')
+
+    def __init__(self, keys, offsets, coords, appear, rLocs, imshapes, shm=None):
+        self.keys = keys
+        self.offsets = offsets
+        self.coords = coords
+        self.appear = appear
+        self.rLocs = rLocs
+        self.imshapes = imshapes
+
+        self._shm = shm             # @< SharedMemory backing the arrays, if any.
+
+    #=============================== fromBoard ===============================
+    #
+    @staticmethod
+    def fromBoard(theBoard, bind=True):
+        """!
+        @brief  Gather the pixels of all the pieces of a board.
+
+        @param[in]  theBoard    The board.
+        @param[in]  bind        Rebind the pieces' rcoords/appear to views into the arena.
+
+        @return     theArena    The arena.
+        """
+
+        pieces = list(theBoard.pieces.values())
+
+        counts = np.array([piece.y.rcoords.shape[1] for piece in pieces], dtype=np.int64)
+        offsets = np.zeros(len(pieces) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        if len(pieces) > 0:
+            coords = np.concatenate([piece.y.rcoords for piece in pieces], axis=1).astype(np.int32)
+            appear = np.concatenate([piece.y.appear for piece in pieces], axis=0)
+        else:
+            coords = np.zeros((2, 0), dtype=np.int32)
+            appear = np.zeros((0, 3), dtype=np.uint8)
+
+        theArena = PixelArena(
+            keys=np.array(list(theBoard.pieces.keys()), dtype=np.int64),
+            offsets=offsets,
+            coords=coords,
+            appear=appear,
+            rLocs=np.array([np.asarray(piece.rLoc).reshape(-1)[:2] for piece in pieces],
+                           dtype=np.int64).reshape(-1, 2),
+            imshapes=np.array([tuple(piece.y.imshape) for piece in pieces],
+                              dtype=np.int64).reshape(-1, 2))
+
+        if bind:
+            theArena.bind(theBoard)
+
+        return theArena
+
+    #================================= bind ==================================
+    #
+    def bind(self, theBoard):
+        """!
+        @brief  Point the pieces' rcoords/appear at views into the arena buffers.
+
+        Writes into the arena are then seen by the pieces, and the other way around.
+        Pieces absent from the arena are left alone.
+
+        @param[in]  theBoard    The board the arena was built from.
+        """
+
+        for ii, key in enumerate(self.keys.tolist()):
+            piece = theBoard.pieces.get(key)
+            if piece is not None:
+                piece.y.rcoords, piece.y.appear = self.view(ii)
+
+    #================================= view ==================================
+    #
+    def view(self, ii):
+        """!
+        @brief  Pixel data of the ii-th piece, as views into the arena.
+
+        @param[in]  ii      Index of the piece in the arena (not its board key).
+
+        @return     coords  (2, n) coordinates.
+        @return     appear  (n, C) appearances.
+        """
+
+        s, e = self.offsets[ii], self.offsets[ii + 1]
+        return self.coords[:, s:e], self.appear[s:e]
+
+    #================================= size ==================================
+    #
+    def size(self):
+        """!
+        @brief  Number of pieces in the arena.
+        """
+
+        return self.keys.size
+
+    #================================= paint =================================
+    #
+    def paint(self, theImage, offset=(0, 0)):
+        """!
+        @brief  Paint all the pieces at their rLocs into the image, in arena order.
+
+        Pixels falling outside of the image are dropped.
+
+        @param[in]  theImage    The image to paint into (in place).
+        @param[in]  offset      Offset (dx, dy) applied to all pieces.
+
+        @return     theImage    The image.
+        """
+
+        counts = np.diff(self.offsets)
+        pos = np.repeat(self.rLocs + np.asarray(offset), counts, axis=0).T + self.coords
+
+        H, W = theImage.shape[:2]
+        inside = (pos[0] >= 0) & (pos[0] < W) & (pos[1] >= 0) & (pos[1] < H)
+        theImage[pos[1, inside], pos[0, inside]] = self.appear[inside]
+
+        return theImage
+
+    #============================== __getstate__ =============================
+    #
+    def __getstate__(self):
+        # Only the arrays travel, never the shared memory handle.
+        return {field: np.ascontiguousarray(getattr(self, field)) for field in PixelArena._fields}
+
+    def __setstate__(self, state):
+        for field in PixelArena._fields:
+            setattr(self, field, state[field])
+        self._shm = None
+
+    #================================ toShared ===============================
+    #
+    def toShared(self, name=None):
+        """!
+        @brief  Copy the arena into a single shared memory block.
+
+        The returned handle is a small picklable tuple; another process gets a
+        zero-copy arena from it with PixelArena.attach.  The creator owns the block
+        and should unlink it when done.
+
+        @param[in]  name        Name of the shared memory block (None: generated).
+
+        @return     theArena    Arena backed by the shared memory.
+        @return     handle      (name, layout) to attach to it.
+        """
+
+        layout = []
+        nbytes = 0
+        for field in PixelArena._fields:
+            arr = getattr(self, field)
+            layout.append((field, arr.dtype.str, arr.shape, nbytes))
+            nbytes += -(-arr.nbytes // 64) * 64         # 64 byte aligned.
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(nbytes, 1))
+        theArena = PixelArena._fromLayout(shm, layout)
+        for field in PixelArena._fields:
+            getattr(theArena, field)[...] = getattr(self, field)
+
+        return theArena, (shm.name, tuple(layout))
+
+    #================================= attach ================================
+    #
+    @staticmethod
+    def attach(handle):
+        """!
+        @brief  Attach to an arena placed in shared memory by toShared.
+
+        @param[in]  handle      The handle returned by toShared.
+
+        @return     theArena    Arena whose arrays view the shared memory.
+        """
+
+        name, layout = handle
+        return PixelArena._fromLayout(shared_memory.SharedMemory(name=name), layout)
+
+    @staticmethod
+    def _fromLayout(shm, layout):
+        arrays = {field: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+                  for field, dtype, shape, offset in layout}
+        return PixelArena(shm=shm, **arrays)
+
+    #================================= close =================================
+    #
+    def close(self, unlink=False):
+        """!
+        @brief  Release the shared memory backing the arena, if any.
+
+        The arrays (and any piece bound to them) must not be used afterwards.
+
+        @param[in]  unlink      Also destroy the block (creator side).
+        """
+
+        if self._shm is None:
+            return
+
+        for field in PixelArena._fields:
+            setattr(self, field, None)
+
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+        self._shm = None
+
+#
+#========================= puzzle.utils.pixelArena ========================
@@ -0,0 +1,343 @@
+# ====================== puzzle.utils.puzzleGenerator ======================
+#
+# @brief    Procedural puzzles of arbitrary size from any source image.
+#
+#           The image is cut into a grid of interlocking (tabbed) or
+#           rectangular pieces.  The solution board is built straight from the
+#           known cut, without segmentation, and a measurement is made by
+#           scattering the pieces (shuffled, rotated, exploded, jittered) into a
+#           new image with its mask.  Meant for exercising the solver pipeline
+#           at realistic scales (hundreds to thousands of pieces).
+#
+# ====================== puzzle.utils.puzzleGenerator ======================
+#
+# @file     puzzleGenerator.py
+#
+# ====================== puzzle.utils.puzzleGenerator ======================
+
+
+# ============================== Dependencies =============================
+
+from copy import deepcopy
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from puzzle.board import Board
+from puzzle.builder.gridded import Gridded, CfgGridded
+from puzzle.builder.matrix import Matrix, CfgMatrix
+from puzzle.piece import Template
+from puzzle.utils.pixelArena import PixelArena
+
+
+# ====================== puzzle.utils.puzzleGenerator ======================
+
+@dataclass
+class ParamGenerator:
+    psize: tuple = (10, 10)  # @< Puzzle size (columns, rows).
+    style: str = 'interlocking'  # @< Piece cut, 'interlocking' or 'rectangular'.
+    cellSize: int = None  # @< Resize the image so cells are this many pixels wide (None: as is).
+    tabSize: float = 0.15  # @< Tab radius relative to the smaller cell side (at most 0.15).
+    explode: float = 0.5  # @< Free space between scattered pieces, relative to their extent.
+    jitter: float = 0.  # @< Random offset of scattered pieces, fraction of the free space (0 to 1).
+    rotate: float = 0.  # @< Scattered pieces are rotated uniformly in [-rotate, rotate] degrees.
+    shuffle: bool = True  # @< Permute the scattered pieces or keep the solution order.
+    margin: int = 20  # @< Border of the measurement image (pixels).
+    seed: int = None  # @< Seed of the generator, for reproducible puzzles.
+
+
+@dataclass
+class SyntheticPuzzle:
+    solution: Board  # @< The solution board (Gridded or Matrix).
+    measured: Board  # @< The scattered pieces.
+    image: np.ndarray  # @< Image of the scattered pieces.
+    mask: np.ndarray  # @< Mask of the scattered pieces.
+    assignment: dict  # @< Ground truth, measured piece key -> solution piece key.
+    rotation: np.ndarray  # @< Rotation (degrees) applied to each measured piece.
+
+
+def prepare_image(theImage, psize, cellSize=None):
+    """
+    @brief  Get the source image ready to be cut into the puzzle grid.
+
+    Gray images are turned to RGB.  The image is resized if a cell size is
+    given, then cropped to a multiple of the grid size.
+
+    Args:
+        theImage: The source image.
+        psize: The puzzle size (columns, rows).
+        cellSize: Width of the cells after resizing (pixels). None keeps the size.
+
+    Returns:
+        theImage: The prepared image.
+        csize: The cell size (width, height).
+    """
+
+    if theImage.ndim == 2:
+        theImage = cv2.cvtColor(theImage, cv2.COLOR_GRAY2RGB)
+
+    if cellSize is not None:
+        fact = cellSize * psize[0] / theImage.shape[1]
+        theImage = cv2.resize(theImage, (int(cellSize * psize[0]),
+                                         int(round(theImage.shape[0] * fact))))
+
+    csize = (theImage.shape[1] // psize[0], theImage.shape[0] // psize[1])
+    if min(csize) < 1:
+        raise ValueError('Image too small for a {}x{} puzzle.'.format(*psize))
+
+    return theImage[:csize[1] * psize[1], :csize[0] * psize[0]], csize
+
+
+def interlocking_labels(psize, csize, tabSize=0.15, rng=None):
+    """
+    @brief  Label image of an interlocking cut of the puzzle grid.
+
+    Every inner side gets a round tab, protruding from one of the two cells
+    into the other with random direction, position along the side and radius.
+    The sizes are bounded so that tabs never reach each other or the cell
+    corners: a tab spans at most 1.6 radii across its side and a radius plus
+    the offset along it, and 2.6 * 1.1 * 0.15 + 0.05 < 0.5 keeps the tabs of
+    the row and column sides meeting at a corner apart.  Every label is thus
+    a single connected region.  Labels are row-major cell indices.
+
+    Args:
+        psize: The puzzle size (columns, rows).
+        csize: The cell size (width, height).
+        tabSize: Tab radius relative to the smaller cell side (clipped to 0.15).
+        rng: The numpy random generator.
+
+    Returns:
+        theLabels: Label image (int32), of size psize * csize.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    ncols, nrows = psize
+    dc, dr = csize
+    radius = min(max(tabSize, 0.), 0.15) * min(dc, dr)
+
+    xs = np.arange(ncols * dc)
+    ys = np.arange(nrows * dr)
+    col = xs // dc
+    row = ys // dr
+
+    theLabels = (row[:, None] * ncols + col[None, :]).astype(np.int32)
+    if radius < 1:
+        return theLabels
+
+    # Tabs of one orientation of sides.  Along is the side direction, across the other.
+    # Each side gets (direction, offset along the side, radius).
+    def addTabs(nAlong, nAcross, dAlong, dAcross, along, across, toLabel):
+        shape = (nAlong, nAcross - 1)
+        sign = rng.choice([-1, 1], size=shape)
+        offset = rng.uniform(-0.05, 0.05, size=shape) * dAlong
+        tabR = radius * rng.uniform(0.9, 1.1, size=shape)
+
+        # Nearest side of each pixel, and its tab.
+        iAlong = (along // dAlong)[:, None]
+        iSide = np.clip(np.round(across / dAcross).astype(int) - 1, 0, nAcross - 2)[None, :]
+
+        cAcross = (iSide + 1) * dAcross + sign[iAlong, iSide] * 0.6 * tabR[iAlong, iSide]
+        cAlong = (iAlong + 0.5) * dAlong + offset[iAlong, iSide]
+        inside = ((across[None, :] - cAcross) ** 2 + (along[:, None] - cAlong) ** 2
+                  < tabR[iAlong, iSide] ** 2)
+
+        # A tab belongs to the cell it protrudes from.
+        iCell = np.where(sign[iAlong, iSide] > 0, iSide, iSide + 1)
+        theTabs = toLabel(np.broadcast_to(iAlong, inside.shape), iCell)
+        return inside, theTabs
+
+    if ncols > 1:
+        inside, theTabs = addTabs(nrows, ncols, dr, dc, ys, xs, lambda r, c: r * ncols + c)
+        theLabels[inside] = theTabs[inside]
+
+    if nrows > 1:
+        inside, theTabs = addTabs(ncols, nrows, dc, dr, xs, ys, lambda c, r: r * ncols + c)
+        theLabels[inside.T] = theTabs.T[inside.T]
+
+    return theLabels
+
+
+def build_solution(theImage, theLabels, psize, csize, theParams=None):
+    """
+    @brief  Gridded solution board of a labelled cut of the image.
+
+    Pieces are created from the label image directly, in row-major order.  The
+    grid coordinates are known and set directly.  The adjacency is processed from
+    the pieces, as for a parsed board: tabs bring some pieces two cells apart
+    within tauAdj, so it is not that of the grid cells.
+
+    Args:
+        theImage: The source image, of the same size as the labels.
+        theLabels: Row-major cell labels (see interlocking_labels).
+        psize: The puzzle size (columns, rows).
+        csize: The cell size (width, height).
+        theParams: The Gridded configuration (default CfgGridded).
+
+    Returns:
+        theSol: The Gridded solution board.
+    """
+
+    if theParams is None:
+        theParams = CfgGridded()
+
+    ncols, nrows = psize
+    dc, dr = csize
+    pad = int(np.ceil(0.5 * min(dc, dr)))   # Tabs cannot reach further than that.
+
+    theBoard = Board()
+    for ri in range(nrows):
+        for ci in range(ncols):
+            r0, c0 = max(ri * dr - pad, 0), max(ci * dc - pad, 0)
+            pMask = theLabels[r0:(ri + 1) * dr + pad, c0:(ci + 1) * dc + pad] == ri * ncols + ci
+
+            # Tight box, as the parser would give.
+            rows = np.flatnonzero(pMask.any(axis=1))
+            cols = np.flatnonzero(pMask.any(axis=0))
+            pMask = pMask[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+            pCorn = np.array([c0 + cols[0], r0 + rows[0]])
+            pImage = theImage[pCorn[1]:pCorn[1] + pMask.shape[0], pCorn[0]:pCorn[0] + pMask.shape[1]]
+
+            my, mx = np.nonzero(pMask)
+            pCent = np.round([np.mean(mx), np.mean(my)]).astype(int) + pCorn
+
+            thePiece = Template.buildFromMaskAndImage(pMask, pImage, pCorn, centroidLoc=pCent)
+
+            # As Board.addPiece, less the deep copy.
+            thePiece.id = theBoard.id_count + 1
+            theBoard.pieces[theBoard.id_count] = thePiece
+            theBoard.id_count += 1
+
+    theSol = Gridded(theBoard, theParams)
+    theSol.gc = np.vstack((np.tile(np.arange(ncols), nrows), np.repeat(np.arange(nrows), ncols)))
+    theSol.pshape = [ncols, nrows]
+
+    return theSol
+
+
+def scatter_pieces(theSol, theParams, rng=None):
+    """
+    @brief  Scatter the pieces of a solution board into a measurement.
+
+    The pieces are (optionally) shuffled and rotated, then laid out on a grid of
+    the puzzle size whose pitch is the largest piece extent plus the explode
+    spacing.  Each piece is centered in its slot, then offset by the jitter.
+
+    Args:
+        theSol: The solution board.
+        theParams: ParamGenerator settings.
+        rng: The numpy random generator.
+
+    Returns:
+        theMea: The measurement board.
+        assignment: Dict of measured piece key -> solution piece key.
+        rotation: Rotation (degrees) applied to each measured piece.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    solKeys = list(theSol.pieces.keys())
+    N = len(solKeys)
+
+    order = rng.permutation(N) if theParams.shuffle else np.arange(N)
+    if theParams.rotate > 0:
+        rotation = rng.uniform(-theParams.rotate, theParams.rotate, size=N)
+    else:
+        rotation = np.zeros(N)
+
+    pieces = []
+    for idx, angle in zip(order, rotation):
+        thePiece = theSol.pieces[solKeys[idx]]
+        if angle != 0:
+            thePiece = thePiece.rotatePiece(angle)
+        else:
+            thePiece = deepcopy(thePiece)
+        pieces.append(thePiece)
+
+    # Slots of the scattered layout, as many as in the solution grid.
+    extents = np.array([piece.y.imshape[::-1] for piece in pieces]).reshape(-1, 2)
+    pitch = np.ceil(extents.max(axis=0) * (1 + theParams.explode)).astype(int)
+    free = (pitch - extents) / 2
+
+    ncols = int(theParams.psize[0])
+    slots = np.column_stack((np.arange(N) % ncols, np.arange(N) // ncols))
+
+    offsets = rng.uniform(-1, 1, size=(N, 2)) * theParams.jitter * free
+    rLocs = theParams.margin + slots * pitch + np.floor(free + offsets).astype(int)
+
+    theMea = Board()
+    assignment = {}
+    for ii, thePiece in enumerate(pieces):
+        thePiece.setPlacement(rLocs[ii])
+        thePiece.id = theMea.id_count + 1
+        theMea.pieces[theMea.id_count] = thePiece
+        assignment[theMea.id_count] = solKeys[order[ii]]
+        theMea.id_count += 1
+
+    return theMea, assignment, rotation
+
+
+def render_pieces(theBoard, margin=0):
+    """
+    @brief  Image and mask of a board, in a single pass over all the pieces.
+
+    Args:
+        theBoard: The board.
+        margin: Border added below/right of the pieces (pixels).
+
+    Returns:
+        theImage: The rendered image (black background).
+        theMask: The mask of the pieces (uint8, 0 or 255).
+    """
+
+    theArena = PixelArena.fromBoard(theBoard, bind=False)
+
+    bottomRight = (theArena.rLocs + theArena.imshapes[:, ::-1]).max(axis=0, initial=0)
+    H, W = int(bottomRight[1] + margin), int(bottomRight[0] + margin)
+
+    theImage = theArena.paint(np.zeros((H, W, theArena.appear.shape[1]), dtype=theArena.appear.dtype))
+
+    theArena.appear = np.full((theArena.coords.shape[1], 1), 255, dtype=np.uint8)
+    theMask = theArena.paint(np.zeros((H, W, 1), dtype=np.uint8))[:, :, 0]
+
+    return theImage, theMask
+
+
+def generate_puzzle(theImage, theParams=ParamGenerator()):
+    """
+    @brief  Create a synthetic solution board and its scattered measurement.
+
+    Args:
+        theImage: The source image (RGB or gray).
+        theParams: ParamGenerator settings.
+
+    Returns:
+        thePuzzle: A SyntheticPuzzle.
+    """
+
+    rng = np.random.default_rng(theParams.seed)
+    psize = (int(theParams.psize[0]), int(theParams.psize[1]))
+
+    theImage, csize = prepare_image(theImage, psize, theParams.cellSize)
+
+    if theParams.style == 'rectangular':
+        cfgSol = CfgMatrix()
+        cfgSol.psize = list(psize)
+        theSol = Matrix.buildFrom_ImageAndGrid(theImage, cfgSol)
+    elif theParams.style == 'interlocking':
+        theLabels = interlocking_labels(psize, csize, theParams.tabSize, rng)
+        theSol = build_solution(theImage, theLabels, psize, csize)
+    else:
+        raise ValueError('Unknown puzzle style: {}'.format(theParams.style))
+
+    theMea, assignment, rotation = scatter_pieces(theSol, theParams, rng)
+    theImageMea, theMaskMea = render_pieces(theMea, theParams.margin)
+
+    return SyntheticPuzzle(solution=theSol, measured=theMea, image=theImageMea, mask=theMaskMea,
+                           assignment=assignment, rotation=rotation)
+
+#
+# ====================== puzzle.utils.puzzleGenerator ======================
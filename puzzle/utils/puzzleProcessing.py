@@ -16,6 +16,9 @@
 # ============================== Dependencies =============================
 import glob
 import os
+import queue
+import threading
+from dataclasses import dataclass
 
 import cv2
 import improcessor.basic as improcessor
@@ -36,7 +39,8 @@ cpath = fpath.rsplit('/', 1)[0]
 # ====================== puzzle.utils.puzzleProcessing ======================
 
 
-def calibrate_real_puzzle(theImageMea, thePrevImage=None, theCalibrated = None, params=ParamPuzzle, option=1, verbose=False):
+def calibrate_real_puzzle(theImageMea, thePrevImage=None, theCalibrated = None, params=ParamPuzzle, option=1, verbose=False,
+                          tileSize=None):
     """
     @brief  To obtain the solution board or the pieces in the solution area.
 
@@ -47,6 +51,7 @@ def calibrate_real_puzzle(theImageMea, thePrevImage=None, theCalibrated = None,
         params: Parameter settings to extract the pieces.
         option: The option 0 is to assemble the puzzle while option 1 is to disassemble the puzzle
         verbose: Whether to debug
+        tileSize: Tile size for a tiled preprocess_real_puzzle (None: full frame).
 
     Returns:
         thePrevImage: The updated previous image.
@@ -65,15 +70,15 @@ def calibrate_real_puzzle(theImageMea, thePrevImage=None, theCalibrated = None,
                                cv2.dilate, (np.ones((3, 3), np.uint8),)
                                )
 
-    if thePrevImage is None:
-        thePrevImage = theImageMea.copy()
-        thePrevMask = preprocess_real_puzzle(thePrevImage, verbose=False)
-        thePrevImage = cv2.bitwise_and(thePrevImage, thePrevImage, mask=thePrevMask)
-
     # Step 1: preprocess real imgs
     theCurImage = theImageMea.copy()
-    theCurMask = preprocess_real_puzzle(theCurImage, verbose=False)
-    theCurImage = cv2.bitwise_and(theCurImage, theCurImage, mask=theCurMask)
+    theCurMask = preprocess_real_puzzle(theCurImage, verbose=False, tileSize=tileSize)
+    theCurImage = cv2.bitwise_and(theCurImage, theCurImage, mask=theCurMask.astype('uint8'))
+
+    # The previous frame is the current one on the first call. Its mask is the same,
+    # so reuse the masked image rather than preprocessing the frame twice.
+    if thePrevImage is None:
+        thePrevImage = theCurImage
 
     if verbose:
         cv2.imshow('theCurMask', cv2.resize(theCurMask, (0, 0), fx=0.5, fy=0.5))
@@ -115,15 +120,17 @@ def calibrate_real_puzzle(theImageMea, thePrevImage=None, theCalibrated = None,
     return thePrevImage, theCalibrated
 
 
-def calibrate_real_puzzle_sequence(img_folder, option, fsize=1, verbose=False):
+def calibrate_real_puzzle_sequence(img_folder, option, fsize=1, verbose=False, tileSize=None):
     """
     @brief  To obtain the solution board from an image sequence for calibration.
+            Images are read ahead on a background thread, see FrameDiffCalibrator.processSequence.
 
     Args:
         img_folder: The path to the image folder. We assume the image name like XX_0.png
         option: The option 0 is to assemble the puzzle while option 1 is to disassemble the puzzle
         fsize: The scale to resize the input image.
         verbose: Whether to debug
+        tileSize: Tile size for a tiled preprocess_real_puzzle (None: full frame).
 
     Returns:
         theCalibrated: A board of calibrated pieces
@@ -132,72 +139,227 @@ def calibrate_real_puzzle_sequence(img_folder, option, fsize=1, verbose=False):
     img_path_list = glob.glob(os.path.join(cpath + '/../testing/' + img_folder, '*.png'))
     img_path_list.sort()
 
-    theCalibrated = Board()
-
-    improc = improcessor.basic(cv2.cvtColor, (cv2.COLOR_RGB2GRAY,),
-                               improcessor.basic.thresh, ((10, 255, cv2.THRESH_BINARY),),
-                               cv2.erode, (np.ones((3, 3), np.uint8),),
-                               cv2.dilate, (np.ones((3, 3), np.uint8),)
-                               )
-
-    for i in range(1, len(img_path_list)):
-
-        # if i==6:
-        #     verbose=True
+    theCalibrator = FrameDiffCalibrator(ParamPuzzle(areaThresholdLower=1000), tileSize=tileSize)
 
-        if i == 1:
-            thePrevImage = cv2.imread(img_path_list[i - 1])
+    return theCalibrator.processSequence(img_path_list, option, fsize=fsize, verbose=verbose)
 
-            if fsize != 1:
-                thePrevImage = cv2.resize(thePrevImage, (0, 0), fx=fsize, fy=fsize)
-
-            thePrevImage = cv2.cvtColor(thePrevImage, cv2.COLOR_BGR2RGB)
-            thePrevMask = preprocess_real_puzzle(thePrevImage, verbose=False)
-            thePrevImage = cv2.bitwise_and(thePrevImage, thePrevImage, mask=thePrevMask)
-        else:
-            thePrevImage = theCurImage
 
-        # Step 1: preprocess real imgs
-        theCurImage = cv2.imread(img_path_list[i])
-
-        if fsize !=1:
-            theCurImage = cv2.resize(theCurImage, (0,0), fx=fsize, fy=fsize)
-
-        theCurImage = cv2.cvtColor(theCurImage, cv2.COLOR_BGR2RGB)
+# ============================ FrameDiffCalibrator ============================
+#
 
-        theCurMask = preprocess_real_puzzle(theCurImage, verbose=False)
-        theCurImage = cv2.bitwise_and(theCurImage, theCurImage, mask=theCurMask)
+@dataclass
+class ParamCalibrator:
+    diffThresh: int = 30        # @< Gray level difference for a pixel to count as changed.
+    changeThresh: int = 500     # @< Changed pixel count needed before pieces are extracted.
+    bgShift: int = 4            # @< Background drift rate below changeThresh, as 2^-bgShift.
+    queueSize: int = 4          # @< Images read ahead by the batch mode reader thread.
 
-        if verbose:
-            cv2.imshow('theCurMask', theCurMask)
-            cv2.waitKey()
 
-        # Step 2: frame difference
-        diff = cv2.absdiff(theCurImage, thePrevImage)
-        mask = cv2.cvtColor(diff, cv2.COLOR_RGB2GRAY)
+class FrameDiffCalibrator:
+    """
+    @brief  Stateful version of calibrate_real_puzzle.
 
-        th = 30
-        imask = mask > th
+    Keeps a background model of the (masked) solution area and the last frame's mask.
+    Each frame is masked once, differenced against the background with integer image
+    operations restricted to the region of interest, and pieces are only extracted once
+    enough pixels changed.  Below that, the background drifts towards the frame to absorb
+    lighting changes.
+    """
 
+    def __init__(self, params=ParamPuzzle, theParams=ParamCalibrator(), theCalibrated=None,
+                 roi=None, tileSize=None):
+        """
+        @brief  Constructor.
+
+        Args:
+            params: Parameter settings to extract the pieces.
+            theParams: ParamCalibrator settings.
+            theCalibrated: Board to add the calibrated pieces to (default: new board).
+            roi: Region of interest [x0, y0, x1, y1] (None: full frame, empty: nothing).
+            tileSize: Tile size for a tiled preprocess_real_puzzle (None: full frame).
+        """
+
+        self.params = params
+        self.cfg = theParams
+        self.tileSize = tileSize
+
+        if theCalibrated is None:
+            theCalibrated = Board()
+        self.theCalibrated = theCalibrated
+
+        self.roi = None
+        self.background = None      # @< Masked image of the last committed state (ROI only).
+        self.lastMask = None        # @< Mask of the last processed frame (ROI only).
+        self.nChanged = 0           # @< Changed pixel count of the last processed frame.
+
+        self.setROI(roi)
+
+        self.improc = improcessor.basic(cv2.cvtColor, (cv2.COLOR_RGB2GRAY,),
+                                        improcessor.basic.thresh, ((10, 255, cv2.THRESH_BINARY),),
+                                        cv2.erode, (np.ones((3, 3), np.uint8),),
+                                        cv2.dilate, (np.ones((3, 3), np.uint8),)
+                                        )
+
+    def setROI(self, roi):
+        """
+        @brief  Set the region of interest. The background is reset if it changes.
+
+        An empty or degenerate region means there is nothing to process, only None
+        stands for the full frame.
+
+        Args:
+            roi: Region of interest [x0, y0, x1, y1] (None: full frame, empty: nothing).
+        """
+
+        if roi is not None:
+            roi = [int(v) for v in roi]
+            if len(roi) != 4 or roi[2] <= roi[0] or roi[3] <= roi[1]:
+                roi = []
+
+        if roi != self.roi:
+            self.roi = roi
+            self.reset()
+
+    def reset(self):
+        """
+        @brief  Forget the background model. The next frame becomes the background.
+        """
+
+        self.background = None
+        self.lastMask = None
+
+    def _crop(self, theImage):
+        """
+        @brief  Return the ROI view of an image and the ROI corner (x, y).
+        """
+
+        if self.roi is None:
+            return theImage, np.array([0, 0])
+
+        x0, y0, x1, y1 = self.roi
+        return theImage[y0:y1, x0:x1], np.array([x0, y0])
+
+    def process(self, theImageMea, option=1, verbose=False):
+        """
+        @brief  Process a frame.
+
+        Args:
+            theImageMea: The input image (full frame).
+            option: The option 0 is to assemble the puzzle while option 1 is to disassemble the puzzle
+            verbose: Whether to debug
+
+        Returns:
+            nAdded: Number of pieces added to the calibrated board (0 or 1).
+        """
+
+        if self.roi == []:
+            self.nChanged = 0
+            return 0
+
+        theImage, corner = self._crop(theImageMea)
+
+        self.lastMask = preprocess_real_puzzle(theImage, verbose=False,
+                                               tileSize=self.tileSize).astype('uint8')
+        theCurImage = cv2.bitwise_and(theImage, theImage, mask=self.lastMask)
+
+        if self.background is None:
+            self.background = theCurImage
+            self.nChanged = 0
+            return 0
+
+        # Step 1: integer frame difference against the background.
+        diff = cv2.cvtColor(cv2.absdiff(theCurImage, self.background), cv2.COLOR_RGB2GRAY)
+        _, changed = cv2.threshold(diff, self.cfg.diffThresh, 255, cv2.THRESH_BINARY)
+        self.nChanged = cv2.countNonZero(changed)
+
+        if self.nChanged < self.cfg.changeThresh:
+            # Let the background drift towards the frame: bg += (cur - bg) / 2^bgShift,
+            # rounded symmetrically (a plain shift rounds towards -inf and biases it down).
+            bg = self.background.astype(np.int16)
+            d = theCurImage.astype(np.int16) - bg
+            shift = self.cfg.bgShift
+            if shift > 0:
+                bg += np.sign(d) * ((np.abs(d) + (1 << (shift - 1))) >> shift)
+            else:
+                bg += d
+            self.background = bg.astype(np.uint8)
+            return 0
+
+        # Step 2: canvas with the changed pixels only.
         canvas = np.ones_like(theCurImage, np.uint8)
-
+        imask = changed > 0
         if option == 0:
             canvas[imask] = theCurImage[imask]
         else:
-            canvas[imask] = thePrevImage[imask]
+            canvas[imask] = self.background[imask]
 
         # Step 3: threshold
-        theMaskMea = improc.apply(canvas)
+        theMaskMea = self.improc.apply(canvas)
 
         if verbose:
             cv2.imshow('theMaskMea', theMaskMea)
             cv2.waitKey()
-        theBoard_single = Arrangement.buildFrom_ImageAndMask(canvas, theMaskMea,
-                                                             theParams=ParamPuzzle(areaThresholdLower=1000))
 
-        theCalibrated.addPiece(theBoard_single.pieces[0])
+        theBoard_single = Arrangement.buildFrom_ImageAndMask(canvas, theMaskMea, self.params)
+
+        self.background = theCurImage
+
+        if theBoard_single.size() == 0:
+            print('No new piece is detected.')
+            return 0
+
+        thePiece = theBoard_single.pieces[0]
+        thePiece.setPlacement(corner, isOffset=True)
+        self.theCalibrated.addPiece(thePiece)
+        print(f'Add a new piece. Current calibrated pieces number: {self.theCalibrated.size()}')
+
+        return 1
+
+    def processSequence(self, img_path_list, option, fsize=1, verbose=False):
+        """
+        @brief  Batch mode. Process a list of image files, reading them ahead on a
+                background thread.
+
+        Args:
+            img_path_list: Ordered list of image paths.
+            option: The option 0 is to assemble the puzzle while option 1 is to disassemble the puzzle
+            fsize: The scale to resize the input image.
+            verbose: Whether to debug
+
+        Returns:
+            theCalibrated: A board of calibrated pieces
+        """
+
+        imQueue = queue.Queue(maxsize=self.cfg.queueSize)
+        readErrors = []
+
+        def reader():
+            try:
+                for img_path in img_path_list:
+                    theImage = cv2.imread(img_path)
+                    if fsize != 1:
+                        theImage = cv2.resize(theImage, (0, 0), fx=fsize, fy=fsize)
+                    imQueue.put(cv2.cvtColor(theImage, cv2.COLOR_BGR2RGB))
+            except Exception as e:
+                readErrors.append(e)
+            finally:
+                imQueue.put(None)
+
+        theReader = threading.Thread(target=reader, daemon=True)
+        theReader.start()
+
+        while True:
+            theImage = imQueue.get()
+            if theImage is None:
+                break
+            self.process(theImage, option=option, verbose=verbose)
+
+        theReader.join()
+        if readErrors:
+            raise readErrors[0]
+
+        return self.theCalibrated
 
-    return theCalibrated
 
 def create_synthetic_puzzle(theImageSol, theMaskSol_src, explodeDis=(200,200), moveDis=(2000,100), rotateRange=70, ROTATION_ENABLED=True,verbose=False):
     """
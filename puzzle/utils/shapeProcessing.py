@@ -15,6 +15,9 @@
 
 # ============================== Dependencies =============================
 
+import cv2
+import numpy as np
+
 # ====================== puzzle.utils.shapeProcessing ======================
 
 def bb_intersection_over_union(boxA, boxB):
@@ -59,5 +62,191 @@ def bb_intersection_over_union(boxA, boxB):
     # Return the intersection over union value
     return iou
 
+def moment_frame(mask):
+    """
+    @brief  Centroid and signed principal axes of a binary blob, in closed form
+            from its image moments (no eigen-decomposition).
+
+    The major axis angle is 0.5 * atan2(2 mu11, mu20 - mu02).  Its direction is
+    made repeatable with the third moment along it (skewness), falling back to
+    its dominant coordinate being positive for shapes with a symmetric third
+    moment.  Perfectly symmetric shapes keep a 180 degree ambiguity.
+
+    Args:
+        mask: The binary mask image (nonzero is foreground).
+
+    Returns:
+        centroid: The centroid (x, y) in mask coordinates, None if degenerate.
+        axes: A 2x2 right-handed rotation matrix with the major axis as first column,
+              None if degenerate (less than three pixels or no spread).
+    """
+
+    mask = np.asarray(mask)
+    if mask.dtype == bool:
+        mask = mask.astype(np.uint8)
+
+    M = cv2.moments(mask, binaryImage=True)
+    m00 = M['m00']
+    spread = M['mu20'] + M['mu02']
+    if m00 < 3 or spread <= np.finfo(float).eps * m00:
+        return None, None
+
+    centroid = np.array([M['m10'] / m00, M['m01'] / m00])
+
+    phi = 0.5 * np.arctan2(2 * M['mu11'], M['mu20'] - M['mu02'])
+    a, b = np.cos(phi), np.sin(phi)
+
+    # Mean of the cubed projections on the major axis.
+    skewness = (a ** 3 * M['mu30'] + 3 * a ** 2 * b * M['mu21'] + 3 * a * b ** 2 * M['mu12']
+                + b ** 3 * M['mu03']) / m00
+    sigma = np.sqrt(spread / m00)
+
+    if abs(skewness) > 1e-9 * sigma ** 3:
+        if skewness < 0:
+            a, b = -a, -b
+    elif (a if abs(a) >= abs(b) else b) < 0:
+        a, b = -a, -b
+
+    axes = np.array([[a, -b], [b, a]])
+
+    return centroid, axes
+
+def side_signatures(class_image, length=64, n_sides=4, gap=0.05):
+    """
+    @brief  Fixed-length signatures of the sides of a piece from its side class image.
+
+    The outer contour of the labelled pixels is traced once, and each side is the
+    longest stretch of the contour labelled with it (stretches interrupted by less
+    than gap of the contour are joined).  Each side is resampled to length points
+    evenly spaced by arc length, then moved to its own frame: origin at the middle
+    of the chord joining its end points, chord along +x.  Since all the sides are
+    traversed in the same direction, the piece interior is on the same side of
+    every signature.  Units stay in pixels.
+
+    Args:
+        class_image: Image labelling the contour pixels of side k with k + 1 (0 elsewhere).
+        length: Number of points of a signature.
+        n_sides: Number of sides.
+        gap: Largest interruption of a side, as a fraction of the contour length.
+
+    Returns:
+        sigs: The (n_sides, length, 2) signatures (x, y), nan for a side not found.
+    """
+
+    class_image = np.asarray(class_image)
+    sigs = np.full((n_sides, length, 2), np.nan)
+
+    cnts, _ = cv2.findContours((class_image > 0).astype(np.uint8), cv2.RETR_EXTERNAL,
+                               cv2.CHAIN_APPROX_NONE)
+    if len(cnts) == 0:
+        return sigs
+
+    contour = max(cnts, key=len).reshape(-1, 2)
+    labels = class_image[contour[:, 1], contour[:, 0]]
+    M = len(contour)
+
+    for k in range(n_sides):
+        idx = np.flatnonzero(labels == k + 1)
+        if idx.size < 2:
+            continue
+
+        # Stretches of the side along the (cyclic) contour, keep the longest.
+        steps = np.diff(np.append(idx, idx[0] + M))
+        breaks = np.flatnonzero(steps > max(gap * M, 1))
+        if breaks.size == 0:
+            start, stop = idx[0], idx[-1]
+        else:
+            counts = (breaks - np.roll(breaks, 1)) % idx.size
+            counts[counts == 0] = idx.size
+            r = np.argmax(counts)
+            start, stop = idx[(breaks[r - 1] + 1) % idx.size], idx[breaks[r]]
+
+        run = np.arange(start, stop + 1 if stop >= start else stop + M + 1) % M
+        pts = contour[run].astype(float)
+
+        # Resample by arc length.
+        s = np.concatenate(([0.], np.cumsum(np.hypot(*np.diff(pts, axis=0).T))))
+        chord = pts[-1] - pts[0]
+        if s[-1] == 0 or not np.any(chord):
+            continue
+
+        t = np.linspace(0, s[-1], length)
+        pts = np.column_stack((np.interp(t, s, pts[:, 0]), np.interp(t, s, pts[:, 1])))
+
+        c, sn = chord / np.linalg.norm(chord)
+        sigs[k] = (pts - 0.5 * (pts[0] + pts[-1])) @ np.array([[c, -sn], [sn, c]])
+
+    return sigs
+
+def signature_distances(sigA, sigB=None, mate=True, band=None):
+    """
+    @brief  Distances between all the sides of two sets of pieces, in one go.
+
+    With mate set, sides are compared for fitting together: the second side is
+    traversed backwards and turned by 180 degrees (its interior being on the other
+    side of the shared curve), so that a tab matches the corresponding blank.
+    Otherwise they are compared as is, for similarity.
+
+    The distance is the root mean square distance between aligned signature points,
+    or, with band given, the dynamic time warping cost (point distance, warping
+    limited to band samples) divided by the signature length.
+
+    Args:
+        sigA: The (NA, S, L, 2) side signatures of the first set (see side_signatures).
+        sigB: The (NB, S, L, 2) side signatures of the second set (None: sigA).
+        mate: Compare for fit (True) or for similarity (False).
+        band: The DTW band half-width in samples (None: no warping).
+
+    Returns:
+        dist: The (NA, NB, S, S) distances, dist[i, j, a, b] between side a of piece i
+              and side b of piece j.  Missing sides give inf.
+    """
+
+    sigA = np.asarray(sigA, dtype=float)
+    sigB = sigA if sigB is None else np.asarray(sigB, dtype=float)
+    if mate:
+        sigB = -sigB[:, :, ::-1]
+
+    NA, S, L, _ = sigA.shape
+    NB = sigB.shape[0]
+    A = sigA.reshape(NA * S, L, 2)
+    B = sigB.reshape(NB * S, L, 2)
+
+    if band is None:
+        a = A.reshape(NA * S, -1)
+        b = B.reshape(NB * S, -1)
+        sq = (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] - 2 * a @ b.T
+        dist = np.sqrt(np.maximum(sq, 0) / L)
+    else:
+        w = int(band)
+        prev = np.full((NA * S, NB * S, 2 * w + 1), np.inf)
+        for i in range(L):
+            cur = np.full_like(prev, np.inf)
+            for d in range(-w, w + 1):
+                j = i + d
+                if j < 0 or j >= L:
+                    continue
+
+                cost = np.linalg.norm(A[:, None, i] - B[None, :, j], axis=-1)
+                if i == 0 and j == 0:
+                    cur[..., d + w] = cost
+                    continue
+
+                best = np.full(cost.shape, np.inf)
+                if i > 0 and d < w:
+                    best = np.minimum(best, prev[..., d + w + 1])      # (i - 1, j)
+                if j > 0 and d > -w:
+                    best = np.minimum(best, cur[..., d + w - 1])       # (i, j - 1)
+                if i > 0 and j > 0:
+                    best = np.minimum(best, prev[..., d + w])          # (i - 1, j - 1)
+                cur[..., d + w] = cost + best
+            prev = cur
+
+        dist = prev[..., w] / L
+
+    dist = np.where(np.isnan(dist), np.inf, dist)
+
+    return dist.reshape(NA, S, NB, S).transpose(0, 2, 1, 3)
+
 #
 # ====================== puzzle.utils.shapeProcessing ======================
@@ -515,7 +515,7 @@ def cluster_lines(lines):
 
 #================================= get_corners =================================
 #
-def get_corners(dst, neighborhood_size=5, score_factor=0.2, minmax_factor=0.2):
+def get_corners(dst, neighborhood_size=5, score_factor=0.2, minmax_factor=0.2, return_scores=False):
     """
     @brief  Given the input Harris image (where in each pixel the Harris function is
             computed), extract discrete corners satisfying detection constraints.
@@ -525,7 +525,10 @@ def get_corners(dst, neighborhood_size=5, score_factor=0.2, minmax_factor=0.2):
     @param[in]  score_threshold
     @param[in]  minmax_threshold
 
+    @param[in]  return_scores   Also return the Harris response of each corner.
+
     @param[out] xy ??
+    @param[out] scores  Peak Harris response of each corner (if return_scores).
     """
 
     # @note Not documented, so unsure if processing is optimal / uses libraries well.
@@ -581,174 +584,122 @@ def get_corners(dst, neighborhood_size=5, score_factor=0.2, minmax_factor=0.2):
     #print(np.sum(maxima))
     #print(yx)
 
+    if return_scores:
+        scores = np.array(ndimage.maximum(data, labeled, range(1, num_objects + 1)))
+        return xy, scores
+
     return xy
 
 
-def get_best_fitting_rect_coords(xy, d_threshold=30, perp_angle_thresh=20, verbose=0):
+def get_best_fitting_rect_coords(xy, d_threshold=30, perp_angle_thresh=20, verbose=0,
+                                 scores=None, max_corners=None):
     """
     Since we expect the 4 puzzle corners to be the corners of a rectangle, here we take
     all detected Harris corners and we find the best corresponding rectangle.
-    We perform a recursive search with max depth = 2:
-    - At depth 0 we take one of the input point as the first corner of the rectangle
-    - At depth 1 we select another input point (with distance from the first point greater
-    than d_threshold) as the second point
-    - At depth 2 and 3 we take the other points. However, the lines 01-12 and 12-23 should be
-    as perpendicular as possible. If the angle formed by these lines is too much far from the
-    right angle, we discard the choice.
-    - At depth 3, if a valid candidate (4 points that form an almost perpendicular rectangle) is found,
-    we add it to the list of candidates.
+    The search goes over ordered quadruples (0, 1, 2, 3) of input points:
+    - Point 0 is any of the input points.
+    - Point 1 is to the right of point 0, with distance greater than d_threshold.
+    - Points 2 and 3 are such that the lines 01-12, 12-23 and 23-30 are as perpendicular
+    as possible. If the angle formed by these lines is too far from the right angle,
+    the choice is discarded.
+    Each valid quadruple (4 points that form an almost perpendicular rectangle) is a candidate,
+    the same set of points being kept only once (the first one found).
+
+    The quadruples are enumerated level by level with boolean index arrays rather than
+    a recursion, in the same order as the depth-first search they replace.
 
     Given a list of candidate rectangles, we then select the best one by taking the candidate that maximizes
     the function: area * Gaussian(rectangularness)
     - area: it is the area of the candidate shape. We expect that the puzzle corners will form the maximum area
     - rectangularness: it is the mse of the candidate shape's angles compared to a 90 degree angles. The smaller
             this value, the most the shape is similar toa rectangle.
-    """
-    N = len(xy)
-
-    distances = scipy.spatial.distance.cdist(xy, xy)
-    distances[distances < d_threshold] = 0
-
-    def compute_angles(xy):
-
-        angles = np.zeros((N, N))
-
-        for i in range(N):
-            for j in range(i + 1, N):
-
-                point_i, point_j = xy[i], xy[j]
-                if point_i[0] == point_j[0]:
-                    angle = 90
-                else:
-                    angle = np.arctan2(point_j[1] - point_i[1], point_j[0] - point_i[0]) * 180 / np.pi
-
-                angles[i, j] = angle
-                angles[j, i] = angle
-
-        return angles
-
-    angles = compute_angles(xy)
-    possible_rectangles = []
-
-    def search_for_possible_rectangle(idx, prev_points=[]):
-
-        curr_point = xy[idx]
-        depth = len(prev_points)
-
-        if depth == 0:
-            right_points_idx = np.nonzero(np.logical_and(xy[:, 0] > curr_point[0], distances[idx] > 0))[0]
 
-            if verbose >= 2:
-                print('point', idx, curr_point)
+    Args:
+        xy: The (N, 2) candidate corners.
+        d_threshold: Minimal distance between two corners of a rectangle.
+        perp_angle_thresh: Tolerance (degrees) on the right angles.
+        verbose: Verbosity level.
+        scores: Corner responses (N,), used to rank the corners when capping them.
+        max_corners: Keep only this many corners, the ones with the highest scores.
 
-            for right_point_idx in right_points_idx:
-                search_for_possible_rectangle(right_point_idx, [idx])
-
-            if verbose >= 2:
-                print('')
-
-            return
-
-        last_angle = angles[idx, prev_points[-1]]
-        perp_angle = last_angle - 90
-        if perp_angle < 0:
-            perp_angle += 180
-
-        if depth in (1, 2):
-
-            if verbose >= 2:
-                print('\t' * depth, 'point', idx, '- last angle', last_angle, '- perp angle', perp_angle)
+    Returns:
+        The (4, 2) corners of the best rectangle, None if there is none.
+    """
 
-            diff0 = np.abs(angles[idx] - perp_angle) <= perp_angle_thresh
-            diff180_0 = np.abs(angles[idx] - (perp_angle + 180)) <= perp_angle_thresh
-            diff180_1 = np.abs(angles[idx] - (perp_angle - 180)) <= perp_angle_thresh
-            all_diffs = np.logical_or(diff0, np.logical_or(diff180_0, diff180_1))
+    xy = np.asarray(xy)
 
-            diff_to_explore = np.nonzero(np.logical_and(all_diffs, distances[idx] > 0))[0]
+    if max_corners is not None and len(xy) > max_corners:
+        if scores is None:
+            keep = np.arange(max_corners)
+        else:
+            keep = np.sort(np.argsort(-np.asarray(scores), kind='stable')[:max_corners])
+        xy = xy[keep]
 
-            if verbose >= 2:
-                print('\t' * depth, 'diff0:', np.nonzero(diff0)[0], 'diff180:', np.nonzero(diff180_0)[0],
-                      'diff_to_explore:', diff_to_explore)
+    N = len(xy)
+    if N < 4:
+        return None
 
-            for dte_idx in diff_to_explore:
-                if dte_idx not in prev_points:  # unlikely to happen but just to be certain
-                    next_points = prev_points[::]
-                    next_points.append(idx)
+    distances = scipy.spatial.distance.cdist(xy, xy)
+    far = (distances >= d_threshold) & (distances > 0)
 
-                    search_for_possible_rectangle(dte_idx, next_points)
+    # Angles of the lines through the point pairs, taken from the lower to the higher index.
+    dx = xy[None, :, 0] - xy[:, None, 0]
+    dy = xy[None, :, 1] - xy[:, None, 1]
+    angles = np.where(dx == 0, 90., np.arctan2(dy, dx) * 180 / np.pi)
+    angles = np.triu(angles, 1)
+    angles = angles + angles.T
 
-        if depth == 3:
-            angle41 = angles[idx, prev_points[0]]
+    # perp[a, b]: the direction perpendicular to line ab, in [0, 180).
+    perp = angles - 90
+    perp[perp < 0] += 180
 
-            diff0 = np.abs(angle41 - perp_angle) <= perp_angle_thresh
-            diff180_0 = np.abs(angle41 - (perp_angle + 180)) <= perp_angle_thresh
-            diff180_1 = np.abs(angle41 - (perp_angle - 180)) <= perp_angle_thresh
-            dist = distances[idx, prev_points[0]] > 0
+    # ok[a, b, c]: line ac is close to perpendicular to line ab, and c is far from a.
+    diff = angles[:, None, :] - perp[:, :, None]
+    ok = (np.abs(diff) <= perp_angle_thresh) | (np.abs(diff - 180) <= perp_angle_thresh) \
+         | (np.abs(diff + 180) <= perp_angle_thresh)
+    ok &= far[:, None, :]
 
-            if dist and (diff0 or diff180_0 or diff180_1):
-                rect_points = prev_points[::]
-                rect_points.append(idx)
+    # Points 0 & 1.
+    pairs = np.logical_and(xy[None, :, 0] > xy[:, None, 0], far)
 
-                if verbose == 2:
-                    print('We have a rectangle:', rect_points)
+    # Point 2, perpendicular at point 1.
+    triples = pairs[:, :, None] & ok.transpose(1, 0, 2)
+    triples[np.arange(N), :, np.arange(N)] = False
+    i, j, k = np.nonzero(triples)
 
-                already_present = False
-                for possible_rectangle in possible_rectangles:
-                    if set(possible_rectangle) == set(rect_points):
-                        already_present = True
-                        break
+    # Point 3, perpendicular at point 2 and closing the rectangle at point 0.
+    quads = ok[k, j, :] & ok[:, k, i].T
+    quads[np.arange(len(i)), i] = False
+    quads[np.arange(len(i)), j] = False
+    t, l = np.nonzero(quads)
 
-                if not already_present:
-                    possible_rectangles.append(rect_points)
+    possible_rectangles = np.stack((i[t], j[t], k[t], l), axis=1)
 
     if verbose >= 2:
         print('Coords', xy)
         print('Distances', distances)
         print('Angles', angles)
 
-    # # Debug only
-    # import time
-    # start = time.time()
-
-    for i in range(N):
-        search_for_possible_rectangle(i)
-
-    # # Debug only
-    # end = time.time()-start
-    # print(end)
-    # if end >5:
-    #     debug_mask = np.zeros((400,400))
-    #     for i in xy:
-    #         cv2.circle(debug_mask,i,5,255,-1)
-    #     cv2.imshow('debug',debug_mask)
-    #     cv2.waitKey()
-
     if len(possible_rectangles) == 0:
         return None
 
-    def PolyArea(x, y):
-        return 0.5 * np.abs(np.dot(x, np.roll(y, 1)) - np.dot(y, np.roll(x, 1)))
-
-    areas = []
-    rectangularness = []
-    diff_angles = []
+    # The same point set only once, keeping its first occurrence.
+    _, first = np.unique(np.sort(possible_rectangles, axis=1), axis=0, return_index=True)
+    possible_rectangles = possible_rectangles[np.sort(first)]
 
-    for r in possible_rectangles:
-        points = xy[r]
-        areas.append(PolyArea(points[:, 0], points[:, 1]))
+    if verbose == 2:
+        print('We have rectangles:', possible_rectangles)
 
-        mse = 0
-        da = []
-        for i1, i2, i3 in [(0, 1, 2), (1, 2, 3), (2, 3, 0), (3, 0, 1)]:
-            diff_angle = abs(angles[r[i1], r[i2]] - angles[r[i2], r[i3]])
-            da.append(abs(diff_angle - 90))
-            mse += (diff_angle - 90) ** 2
+    px = xy[possible_rectangles, 0].astype(float)
+    py = xy[possible_rectangles, 1].astype(float)
+    areas = 0.5 * np.abs(np.sum(px * np.roll(py, 1, axis=1), axis=1)
+                         - np.sum(py * np.roll(px, 1, axis=1), axis=1))
 
-        diff_angles.append(da)
-        rectangularness.append(mse)
-
-    areas = np.array(areas)
-    rectangularness = np.array(rectangularness)
+    r0 = possible_rectangles
+    r1 = np.roll(possible_rectangles, -1, axis=1)
+    r2 = np.roll(possible_rectangles, -2, axis=1)
+    diff_angles = np.abs(angles[r0, r1] - angles[r1, r2])
+    rectangularness = np.sum((diff_angles - 90) ** 2, axis=1)
 
     scores = areas * scipy.stats.norm(0, 150).pdf(rectangularness)
     best_fitting_idxs = possible_rectangles[np.argmax(scores)]
@@ -772,6 +723,7 @@ def get_default_params():
         'corner_score_factor': 0.30,
         'corner_minmax_factor': 0.30, 
         'corner_refine_rect_size': 5,
+        'corner_max': 32,
         'edge_erode_size': 3,
         'shape_classification_distance_threshold': 100,
         'shape_classification_nhs': 5,
@@ -798,6 +750,7 @@ def get_binarymask_params():
         'corner_score_factor': 0.30,
         'corner_minmax_factor': 0.30, 
         'corner_refine_rect_size': 5,
+        'corner_max': 32,
         'edge_erode_size': 3,
         'shape_classification_distance_threshold': 100,
         'shape_classification_nhs': 5,
@@ -900,8 +853,8 @@ def sideExtractor(puzzleTemplate, **kwargs):
     #
     #DEBUG
     #print('--- get corners -->')
-    xy = get_corners(harris, params['corner_nsize'], params['corner_score_factor'],
-                     params['corner_minmax_factor'])
+    xy, xy_scores = get_corners(harris, params['corner_nsize'], params['corner_score_factor'],
+                                params['corner_minmax_factor'], return_scores=True)
     #DEBUG
     #print('--- get corners --|')
     xy = np.round(xy / params['scale_factor']).astype(int)
@@ -930,7 +883,9 @@ def sideExtractor(puzzleTemplate, **kwargs):
     # the four that provide the best rectangle from a puzzle piece perspective.
     #
     intersections = get_best_fitting_rect_coords(xy, d_threshold=params['d_thresh'],
-                                                 perp_angle_thresh=params['perp_angle_thresh'])
+                                                 perp_angle_thresh=params['perp_angle_thresh'],
+                                                 scores=xy_scores,
+                                                 max_corners=params.get('corner_max'))
 
     #DEBUG
     #print(intersections)
@@ -1000,10 +955,10 @@ def sideExtractor(puzzleTemplate, **kwargs):
     else:       # without rotation
         out_dict['rotation_angle'] = 0
 
-        edges = contour_enlarged
-        out_dict['edges'] = edges[10:mask.shape[0] + 10, 10:mask.shape[1] + 10]
+        edges = contour
+        out_dict['edges'] = edges[10:-10, 10:-10]
 
-        yb, xb = compute_barycentre(mask_enlarged)
+        yb, xb = compute_barycentre(mask)
 
         # # Refine the corner detections
         corners = corner_detection(edges, intersections, (xb, yb), params['corner_refine_rect_size'], show=False)
@@ -1013,7 +968,7 @@ def sideExtractor(puzzleTemplate, **kwargs):
         line_params = compute_line_params(corners)
         class_image = shape_classification(edges, line_params, params['shape_classification_distance_threshold'],
                                            params['shape_classification_nhs'])
-        out_dict['class_image'] = class_image[10:mask.shape[0] + 10, 10:mask.shape[1] + 10]
+        out_dict['class_image'] = class_image[10:-10, 10:-10]
 
 
     inout = compute_inout(class_image, line_params, (xb, yb), params['inout_distance_threshold'])
@@ -0,0 +1,120 @@
+#========================= puzzle.utils.spatialIndex ========================
+# @file     spatialIndex.py
+# @brief    A uniform grid over axis aligned boxes.
+#
+# Boxes are registered under a key in every grid cell they overlap, so the
+# boxes near a given one are found by visiting a few cells instead of all the
+# boxes.  Meant for the piece bounding boxes of a board, where insertions,
+# removals and moves are frequent and cheap to apply.
+#
+#========================= puzzle.utils.spatialIndex ========================
+#
+# NOTE
+#   100 columns viewing. 4 space indent.
+#
+#========================= puzzle.utils.spatialIndex ========================
+
+#============================== Dependencies =============================
+
+import numpy as np
+
+
+#=============================== SpatialGrid =============================
+#
+class SpatialGrid:
+    """!
+    @brief  Uniform grid hashing of keyed boxes [[min x, min y], [max x, max y]].
+
+    The cell size should be on the order of the box sizes: much smaller and boxes
+    span many cells, much larger and the cells hold many boxes.
+    """
+
+    def __init__(self, cellSize=64.):
+        self.cellSize = float(cellSize)     # @< Side length of the grid cells.
+
+        self.cells = {}                     # @< Grid cell (i, j) -> set of keys.
+        self.boxes = {}                     # @< Key -> (box, grid cells it is in).
+
+    #================================= _span =================================
+    #
+    def _span(self, box):
+        lo = np.floor(np.asarray(box[0], dtype=float) / self.cellSize).astype(int)
+        hi = np.floor(np.asarray(box[1], dtype=float) / self.cellSize).astype(int)
+        return [(ii, jj) for ii in range(lo[0], hi[0] + 1) for jj in range(lo[1], hi[1] + 1)]
+
+    #================================= insert ================================
+    #
+    def insert(self, key, box):
+        """!
+        @brief  Add a box, or move it if the key is already in.
+
+        @param[in]  key     Key of the box.
+        @param[in]  box     The box [[min x, min y], [max x, max y]].
+        """
+
+        if key in self.boxes:
+            self.remove(key)
+
+        box = np.asarray(box, dtype=float).reshape(2, 2)
+        span = self._span(box)
+        for cell in span:
+            self.cells.setdefault(cell, set()).add(key)
+
+        self.boxes[key] = (box, span)
+
+    update = insert
+
+    #================================= remove ================================
+    #
+    def remove(self, key):
+        """!
+        @brief  Remove a box (no-op if the key is not in).
+
+        @param[in]  key     Key of the box.
+        """
+
+        entry = self.boxes.pop(key, None)
+        if entry is None:
+            return
+
+        for cell in entry[1]:
+            keys = self.cells[cell]
+            keys.discard(key)
+            if not keys:
+                del self.cells[cell]
+
+    #================================= query =================================
+    #
+    def query(self, box, margin=0.):
+        """!
+        @brief  Keys of the boxes overlapping a box grown by a margin.
+
+        @param[in]  box     The box [[min x, min y], [max x, max y]].
+        @param[in]  margin  Growth of the box on all sides.
+
+        @return     keys    Set of keys.
+        """
+
+        box = np.asarray(box, dtype=float).reshape(2, 2)
+        lo, hi = box[0] - margin, box[1] + margin
+
+        candidates = set()
+        for cell in self._span((lo, hi)):
+            candidates.update(self.cells.get(cell, ()))
+
+        keys = set()
+        for key in candidates:
+            other = self.boxes[key][0]
+            if np.all(other[0] <= hi) and np.all(lo <= other[1]):
+                keys.add(key)
+
+        return keys
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __contains__(self, key):
+        return key in self.boxes
+
+#
+#========================= puzzle.utils.spatialIndex ========================
@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+#============================= realRunner03_async ============================
+##
+# @brief    Replay a saved surveillance sequence through the asyncio front end.
+#
+# Uses a LocalPublisher with an artificial delay in place of the ROS publishers
+# to confirm that slow publication does not throttle the processing rate.
+#
+#  Use the ``--help`` flag to see what the options are.
+#
+#============================= realRunner03_async ============================
+
+#==[0] Prep environment.
+#
+import argparse
+import asyncio
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from puzzle.runner import RealSolver, ParamRunner
+from puzzle.runnerAsync import RealSolverAsync, LocalPublisher
+
+#==[1] Parse command line arguments.
+#
+argparser = argparse.ArgumentParser()
+argparser.add_argument('--folder', type=str,
+                       default='../../Surveillance/Surveillance/deployment/ROS/tangled_1_work',
+                       help='Folder with the saved XXXX_puzzle.png, XXXX_visibleMask.png and '
+                            'XXXX_hTracker.npy files.')
+argparser.add_argument('--solution', type=str,
+                       default='../../Surveillance/Surveillance/deployment/ROS/caliSolBoard.obj',
+                       help='Saved solution board.')
+argparser.add_argument('--delay', type=float, default=0.5,
+                       help='Emulated publication time (seconds).')
+
+opt = argparser.parse_args()
+
+#==[2] Build the solver and the asyncio driver.
+#
+configs_puzzleSolver = ParamRunner(areaThresholdLower=1000, areaThresholdUpper=8000,
+                                   lengthThresholdLower=1000, BoudingboxThresh=(20, 100),
+                                   tauDist=100, hand_radius=200, tracking_life_thresh=15)
+
+puzzleSolver = RealSolver(configs_puzzleSolver)
+thePublisher = LocalPublisher(delay=opt.delay)
+theDriver = RealSolverAsync(puzzleSolver, thePublisher.publish)
+
+npy_file_list = sorted(glob.glob(os.path.join(opt.folder, '*.npy')))
+
+def readFrame(npy_file):
+    call_back_id = int(os.path.basename(npy_file)[:4])
+    postImg = cv2.imread(os.path.join(opt.folder, f'{str(call_back_id).zfill(4)}_puzzle.png'))
+    postImg = cv2.cvtColor(postImg, cv2.COLOR_BGR2RGB)
+    visibleMask = cv2.imread(os.path.join(opt.folder, f'{str(call_back_id).zfill(4)}_visibleMask.png'), -1)
+    hTracker_BEV = np.load(npy_file, allow_pickle=True)
+    if hTracker_BEV.size == 1:
+        hTracker_BEV = None
+    return postImg, visibleMask, hTracker_BEV
+
+#==[3] Replay.  Every frame is processed; publication keeps only the latest result.
+#
+async def replay():
+    for npy_file in npy_file_list:
+        postImg, visibleMask, hTracker_BEV = readFrame(npy_file)
+        if puzzleSolver.theManager.solution is None:
+            puzzleSolver.setSolBoard(postImg, opt.solution)
+        await theDriver.process(postImg, visibleMask, hTracker_BEV)
+    await theDriver.flush()
+
+tStart = time.time()
+asyncio.run(replay())
+theDriver.shutdown()
+
+print(f'Processed {theDriver.nProcessed} frames in {time.time() - tStart:.2f} s.')
+print(f'Published {thePublisher.count} snapshots, dropped {theDriver.nDropped} stale ones.')
+print(f'Last published progress: {thePublisher.last["progress"]}')
+
+#
+#============================= realRunner03_async ============================
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+# ============================ 15pPlanner_batch ===========================
+#
+# @brief    Test script running headless Monte Carlo episodes of the hand
+#           planner over randomly shuffled boards. (15p img)
+#
+#  Use the ``--help`` flag to see what the options are.
+#
+# ============================ 15pPlanner_batch ===========================
+
+#
+# @file     15pPlanner_batch.py
+#
+# ============================ 15pPlanner_batch ===========================
+
+# ==[0] Prep environment
+import argparse
+import os
+
+import cv2
+import improcessor.basic as improcessor
+import numpy as np
+
+from puzzle.builder.gridded import Gridded, ParamGrid
+from puzzle.manager import Manager, ManagerParms
+from puzzle.parser.fromSketch import FromSketch
+from puzzle.piece.sift import Sift
+from puzzle.simulator.batch import runBatch, buildSpecs
+from puzzle.simulator.plannerHand import PlannerHand
+from puzzle.simulator.simHeadless import SimHeadless, ParamSimHeadless
+from puzzle.solver.simple import Simple
+from puzzle.utils.imageProcessing import cropImage
+from puzzle.utils.simProcessing import setHand
+
+fpath = os.path.realpath(__file__)
+cpath = fpath.rsplit('/', 1)[0]
+
+theGridSol = None
+
+# ==[1] The solution board, built once per worker process.
+#
+def getSolution():
+    global theGridSol
+
+    if theGridSol is None:
+        theImageSol = cv2.imread(cpath + '/../../testing/data/balloon.png')
+        theImageSol = cv2.cvtColor(theImageSol, cv2.COLOR_BGR2RGB)
+
+        theMaskSol_src = cv2.imread(cpath + '/../../testing/data/puzzle_15p_123rf.png')
+        theImageSol = cropImage(theImageSol, theMaskSol_src)
+
+        improc = improcessor.basic(cv2.cvtColor, (cv2.COLOR_BGR2GRAY,),
+                                   cv2.GaussianBlur, ((3, 3), 0,),
+                                   cv2.Canny, (30, 200,),
+                                   improcessor.basic.thresh, ((10, 255, cv2.THRESH_BINARY),))
+
+        theDet = FromSketch(improc)
+        theDet.process(theMaskSol_src.copy())
+        theMaskSol = theDet.getState().x
+
+        theGridSol = Gridded.buildFrom_ImageAndMask(theImageSol, theMaskSol,
+                                                    theParams=ParamGrid(areaThresholdLower=5000))
+
+    return theGridSol
+
+# ==[2] An episode: explode & shuffle the solution, then let the hand solve it.
+#       The generators are already seeded with spec.seed.
+#
+def buildEpisode(spec):
+    theGridSol = getSolution()
+
+    _, epBoard = theGridSol.explodedPuzzle(dx=400, dy=400)
+    theGridMea = Gridded(epBoard, ParamGrid(reorder=True))
+    theGridMea.shuffle()
+
+    theManager = Manager(theGridSol, ManagerParms(matcher=Sift()))
+    theSolver = Simple(theGridSol, theGridMea)
+    thePlannerHand = PlannerHand(theSolver, theManager)
+
+    theHand = setHand(init_agent_loc=[600, 1700])
+
+    return SimHeadless(theSolver.current, theHand, thePlannerHand,
+                       theParams=ParamSimHeadless(HAND_OCCLUSION=spec.occlusion))
+
+# ==[3] Run the batch.
+#
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--episodes', type=int, default=20, help='Number of random boards.')
+    argparser.add_argument('--workers', type=int, default=None, help='Number of processes (default: all cores).')
+    argparser.add_argument('--output', type=str, default=cpath + '/data/15pPlanner_batch.npz',
+                           help='Columnar results file.')
+
+    opt = argparser.parse_args()
+
+    specs = buildSpecs(range(opt.episodes))
+    results = runBatch(buildEpisode, specs, workers=opt.workers, fileName=opt.output)
+
+    done = results['finished'] == 1
+    print(f'{np.count_nonzero(done)}/{len(specs)} episodes finished.')
+    if np.any(done):
+        print(f'Completion time: {np.mean(results["time"][done]):.1f} s (mean), '
+              f'moves: {np.mean(results["moves"][done]):.1f}, picks: {np.mean(results["picks"][done]):.1f}')
+    for seed, error in zip(results['seed'], results['error']):
+        if error:
+            print(f'Seed {int(seed)}: {error}')
+
+#
+# ============================ 15pPlanner_batch ===========================
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+#========================== puzzleGenerator01labels ==========================
+##
+# @brief    Checks that the interlocking cut of the puzzle generator gives
+#           pieces made of a single connected region.
+#
+# Generates the label images of interlocking cuts over a range of seeds, cell
+# sizes and tab sizes, and counts the connected (4-connected) regions of every
+# label.  Any label with more than one region is reported.
+#
+#  Use the ``--help`` flag to see what the options are.
+#
+# @ingroup TestUtils
+#
+# @quitf
+#
+#========================== puzzleGenerator01labels ==========================
+
+#==[0] Prep environment.
+#
+import argparse
+
+import cv2
+import numpy as np
+
+from puzzle.utils.puzzleGenerator import interlocking_labels
+
+argparser = argparse.ArgumentParser()
+argparser.add_argument('--psize', type=int, nargs=2, default=[30, 20], help='Puzzle size (columns, rows).')
+argparser.add_argument('--seeds', type=int, default=10, help='Number of seeds per configuration.')
+
+opt = argparser.parse_args()
+
+#==[1] Count the regions of every label.
+#
+csizes = [(20, 20), (32, 32), (40, 40), (32, 40), (60, 36)]
+tabSizes = [0.1, 0.15, 0.3]
+
+nBroken = 0
+for csize in csizes:
+    for tabSize in tabSizes:
+        for seed in range(opt.seeds):
+            theLabels = interlocking_labels(opt.psize, csize, tabSize, np.random.default_rng(seed))
+
+            # Tabs stay within half a cell of their cell, so a crop of that is enough.
+            dc, dr = csize
+            for label in range(opt.psize[0] * opt.psize[1]):
+                row, col = divmod(label, opt.psize[0])
+                r0, c0 = max(row * dr - dr // 2, 0), max(col * dc - dc // 2, 0)
+                theCrop = theLabels[r0:(row + 1) * dr + dr // 2, c0:(col + 1) * dc + dc // 2]
+
+                nRegions, _ = cv2.connectedComponents((theCrop == label).astype(np.uint8),
+                                                      connectivity=4)
+                if nRegions - 1 != 1:
+                    nBroken += 1
+                    print(f'csize {csize}, tabSize {tabSize}, seed {seed}: '
+                          f'label {label} has {nRegions - 1} regions.')
+
+#==[2] Report.
+#
+if nBroken == 0:
+    print('All pieces are single connected regions.')
+else:
+    print(f'{nBroken} broken pieces.')
+
+#
+#========================== puzzleGenerator01labels ==========================